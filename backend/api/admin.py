@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Patient, EyeTrackingTest, MLPrediction
+from .models import (
+    Patient, EyeTrackingTest, GazeRecording, MLPrediction, PatientSummary, ReportJob, BulkExportJob, TestStatistics
+)
 
 
 @admin.register(Patient)
@@ -22,3 +24,37 @@ class MLPredictionAdmin(admin.ModelAdmin):
     list_display = ('test', 'predicted_result', 'confidence_score', 'anomaly_detected')
     list_filter = ('predicted_result', 'anomaly_detected')
     readonly_fields = ('created_at',)
+
+
+@admin.register(GazeRecording)
+class GazeRecordingAdmin(admin.ModelAdmin):
+    list_display = ('test', 'n_samples', 'created_at')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(TestStatistics)
+class TestStatisticsAdmin(admin.ModelAdmin):
+    list_display = ('key', 'total_tests', 'excellent_count', 'good_count', 'acceptable_count', 'poor_count', 'updated_at')
+    search_fields = ('key',)
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(PatientSummary)
+class PatientSummaryAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'tests_count', 'last_test_date', 'latest_result', 'tracking_trend')
+    list_filter = ('latest_result',)
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'patient', 'test', 'status', 'size', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('cache_key', 'created_at', 'started_at', 'finished_at')
+
+
+@admin.register(BulkExportJob)
+class BulkExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'done', 'total', 'from_cache', 'pages_per_second', 'size', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
@@ -5,3 +5,9 @@ class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
     verbose_name = 'API'
+
+    def ready(self):
+        from config.database import connect_signals
+        from . import signals  # noqa: F401
+
+        connect_signals()
@@ -0,0 +1,248 @@
+"""
+Export en masse des rapports patients (cliniques, campagnes de dépistage)
+
+Les rapports sont rendus en parallèle par un pool de processus
+(REPORTS_EXPORT_PROCESSES) : chaque worker n'importe que api.pdf_generator
+(ReportLab, sans Django) et réutilise ses styles d'un rapport à l'autre.
+
+Le processus principal lit les patients par lots, sans raw_data, et
+n'envoie aux workers que les valeurs nécessaires au rendu. Un rapport déjà en
+cache (api.reports) est repris tel quel ; les autres sont écrits dans le cache
+au passage. Les tests des rapports à rendre sont parcourus en flux, patient
+par patient : seuls ceux du patient en cours et des rapports soumis au pool
+sont en mémoire. Chaque PDF est ajouté à l'archive ZIP sur disque dès qu'il est
+prêt : seuls les rapports en cours de rendu sont en mémoire.
+
+La progression (rapports exportés, pages/s) est enregistrée sur le
+BulkExportJob environ une fois par seconde.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from io import BytesIO
+from itertools import groupby
+from operator import itemgetter
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import BulkExportJob, EyeTrackingTest, Patient
+from .pdf_generator import PATIENT_REPORT_TEST_FIELDS, ReportTest, render_report_task
+from .reports import (
+    REPORT_KEY_FIELDS, REPORT_TESTS_CHUNK_SIZE, patient_report_key, report_filename, report_path,
+    store_report, with_report_markers,
+)
+
+logger = logging.getLogger(__name__)
+
+# Patients lus par requête
+EXPORT_CHUNK_SIZE = 200
+# Rapports soumis au pool par processus de rendu (borne la mémoire)
+EXPORT_QUEUE_PER_PROCESS = 4
+# Intervalle (secondes) entre deux enregistrements de la progression
+EXPORT_PROGRESS_INTERVAL = 1.0
+
+PATIENT_FIELDS = ('id', 'age', *REPORT_KEY_FIELDS)
+TEST_FIELDS = ('patient_id', *PATIENT_REPORT_TEST_FIELDS)
+
+
+def export_path(job: BulkExportJob) -> Path:
+    return Path(settings.REPORTS_LOCATION) / 'exports' / f'export-{job.pk}.zip'
+
+
+def export_filename(job: BulkExportJob) -> str:
+    return f'Rapports_{job.created_at.strftime("%d%m%Y")}_{job.pk}.zip'
+
+
+def _patients(job: BulkExportJob):
+    patients = Patient.objects.order_by('id')
+    if job.patient_ids:
+        patients = patients.filter(id__in=job.patient_ids)
+    return patients
+
+
+def _tests_by_patient(patient_ids):
+    """Tests des patients, en une requête parcourue par lots de REPORT_TESTS_CHUNK_SIZE
+
+    Yields:
+        (patient_id, liste de ReportTest du plus récent au plus ancien), par patient_id croissant
+    """
+    rows = EyeTrackingTest.objects.filter(patient_id__in=patient_ids).order_by(
+        'patient_id', '-created_at', '-id'
+    ).values_list(*TEST_FIELDS)
+    for patient_id, group in groupby(rows.iterator(chunk_size=REPORT_TESTS_CHUNK_SIZE), key=itemgetter(0)):
+        yield patient_id, [ReportTest(*row[1:]) for row in group]
+
+
+def _report_data(patient_ids, use_cache=True):
+    """Données de rendu d'un lot de patients
+
+    Les tests ne sont lus que pour les rapports absents du cache, au fil de
+    l'itération (voir _tests_by_patient).
+
+    Yields:
+        (patient, chemin du rapport en cache, tests ou None si le rapport est
+        repris du cache) ; patient et tests sont transmissibles aux workers
+    """
+    patients = []
+    to_render = []
+    rows = with_report_markers(Patient.objects.filter(id__in=patient_ids)).order_by('id')
+    for row in rows.values(*PATIENT_FIELDS):
+        cache_path = report_path(row['id'], None, patient_report_key(row))
+        cached = use_cache and cache_path.exists()
+        patients.append((row, cache_path, cached))
+        if not cached:
+            to_render.append(row['id'])
+
+    tests = _tests_by_patient(to_render) if to_render else iter(())
+    current = next(tests, None)
+    for row, cache_path, cached in patients:
+        patient = SimpleNamespace(
+            id=row['id'],
+            age=row['age'],
+            user=SimpleNamespace(
+                username=row['user__username'],
+                first_name=row['user__first_name'],
+                last_name=row['user__last_name'],
+                email=row['user__email'],
+            ),
+        )
+        if cached:
+            yield patient, cache_path, None
+            continue
+        patient_tests = []
+        if current is not None and current[0] == row['id']:
+            patient_tests = current[1]
+            current = next(tests, None)
+        yield patient, cache_path, patient_tests
+
+
+class _Progress:
+    """Compteurs du job, enregistrés au plus une fois par EXPORT_PROGRESS_INTERVAL"""
+
+    def __init__(self, job: BulkExportJob, on_progress=None):
+        self.job = job
+        self.on_progress = on_progress
+        self.start = time.monotonic()
+        self.last_save = self.start
+
+    def add(self, pages=0, from_cache=False):
+        self.job.done += 1
+        self.job.pages += pages
+        self.job.from_cache += int(from_cache)
+        if time.monotonic() - self.last_save >= EXPORT_PROGRESS_INTERVAL:
+            self.save()
+
+    def save(self):
+        now = time.monotonic()
+        self.last_save = now
+        elapsed = now - self.start
+        self.job.pages_per_second = round(self.job.pages / elapsed, 2) if elapsed > 0 else 0.0
+        self.job.save(update_fields=['done', 'from_cache', 'pages', 'pages_per_second'])
+        if self.on_progress is not None:
+            self.on_progress(self.job)
+
+
+def _export(job: BulkExportJob, archive: zipfile.ZipFile, progress: _Progress, use_cache: bool):
+    # spawn : les workers ne dupliquent ni les connexions à la base ni les
+    # threads du serveur
+    pool = ProcessPoolExecutor(max_workers=job.processes, mp_context=multiprocessing.get_context('spawn'))
+    pending = {}
+
+    def collect(return_when):
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            patient, cache_path = pending.pop(future)
+            data, pages = future.result()
+            archive.writestr(report_filename(patient), data)
+            store_report(cache_path, BytesIO(data))
+            progress.add(pages)
+
+    with pool:
+        patient_ids = list(_patients(job).values_list('id', flat=True))
+        for start in range(0, len(patient_ids), EXPORT_CHUNK_SIZE):
+            chunk = patient_ids[start:start + EXPORT_CHUNK_SIZE]
+            for patient, cache_path, tests in _report_data(chunk, use_cache):
+                if tests is None:
+                    archive.write(cache_path, report_filename(patient))
+                    progress.add(from_cache=True)
+                    continue
+                pending[pool.submit(render_report_task, patient, tests)] = (patient, cache_path)
+                if len(pending) >= job.processes * EXPORT_QUEUE_PER_PROCESS:
+                    collect(FIRST_COMPLETED)
+        if pending:
+            collect(ALL_COMPLETED)
+
+
+def run_bulk_export(job_id: int, use_cache: bool = True, on_progress=None) -> BulkExportJob:
+    """Exporte les rapports du job dans son archive ZIP
+
+    Args:
+        use_cache: reprendre les rapports déjà en cache plutôt que de les rendre
+        on_progress: appelé avec le job à chaque enregistrement de la progression
+    """
+    job = BulkExportJob.objects.get(pk=job_id)
+    job.status = BulkExportJob.RUNNING
+    job.started_at = timezone.now()
+    job.total = _patients(job).count()
+    job.save(update_fields=['status', 'started_at', 'total'])
+
+    path = export_path(job)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    progress = _Progress(job, on_progress)
+    try:
+        # Les PDF sont déjà compressés par ReportLab : archive sans recompression
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+            _export(job, archive, progress, use_cache)
+        os.replace(tmp_path, path)
+        job.size = path.stat().st_size
+        job.status = BulkExportJob.SUCCEEDED
+    except Exception as e:
+        logger.exception("Échec de l'export en masse %s", job.pk)
+        tmp_path.unlink(missing_ok=True)
+        job.status = BulkExportJob.FAILED
+        job.error = str(e)[:1000]
+    progress.save()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'size', 'error', 'finished_at'])
+    return job
+
+
+def start_bulk_export(job: BulkExportJob) -> threading.Thread:
+    """Lance l'export dans un thread d'arrière-plan"""
+    def target():
+        try:
+            run_bulk_export(job.pk)
+        finally:
+            close_old_connections()
+
+    thread = threading.Thread(target=target, name=f'bulk-export-{job.pk}', daemon=True)
+    thread.start()
+    return thread
+
+
+def max_export_processes() -> int:
+    return settings.REPORTS_EXPORT_PROCESSES or os.cpu_count() or 1
+
+
+def request_bulk_export(patient_ids=None, processes: int = None, user=None) -> BulkExportJob:
+    """Crée un export en masse, lancé une fois la transaction validée
+
+    Le nombre de processus demandé est borné par REPORTS_EXPORT_PROCESSES.
+    """
+    with transaction.atomic():
+        job = BulkExportJob.objects.create(
+            patient_ids=sorted(set(patient_ids)) if patient_ids else None,
+            processes=min(processes or max_export_processes(), max_export_processes()),
+            created_by=user if user is not None and user.is_authenticated else None,
+        )
+        transaction.on_commit(lambda: start_bulk_export(job))
+    return job
@@ -0,0 +1,155 @@
+"""
+Ingestion des tests de suivi oculaire
+
+Valeurs d'un nouveau test à partir des données validées par
+EyeTrackingTestCreateSerializer, communes à la création unitaire et à
+l'ingestion en masse (POST /api/tests/bulk/).
+
+En masse, chaque élément est validé séparément : un test invalide est
+signalé par son index sans faire échouer les autres. Les tests valides sont
+insérés par bulk_create en lots, avec leurs historiques du regard et leurs
+features ; bulk_create n'émettant pas les signaux, statistiques, résumés
+patients et cache des réponses sont mis à jour une fois par patient. Le
+scoring ML est planifié une seule fois pour tout le lot.
+"""
+import logging
+from typing import Any, Dict, List, Tuple
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from ml.feature_store import store_features
+from ml.features import split_gaze_history
+from ml.scoring import enqueue_scoring
+from security.fields import encrypt_fields
+
+from . import response_cache, statistics
+from .models import EyeTrackingTest, GazeRecording, Patient
+from .serializers import EyeTrackingTestCreateSerializer
+
+logger = logging.getLogger(__name__)
+
+# Tests insérés par requête INSERT
+BULK_BATCH_SIZE = 200
+# Nombre maximal de tests par requête POST /api/tests/bulk/
+BULK_MAX_TESTS = 1000
+
+
+def test_fields(test_data: Dict[str, Any]):
+    """Valeurs des champs d'un nouveau test, historique du regard séparé de raw_data
+
+    Returns:
+        (champs du test, liste de points du regard, format d'origine)
+    """
+    # L'historique du regard est stocké en binaire compact, hors de raw_data
+    raw_data, gaze_history, gaze_layout = split_gaze_history(test_data.get('raw_data', {}))
+    fields = {
+        # Valeurs fournies par le frontend
+        'duration': test_data.get('duration', 0),
+        'gaze_time': test_data.get('gaze_time', 0),
+        'tracking_percentage': test_data.get('tracking_percentage', 0),
+        'fixation_count': test_data.get('fixation_count', 0),
+        'avg_fixation_duration': test_data.get('avg_fixation_duration', 0),
+        'max_fixation_duration': test_data.get('max_fixation_duration', 0),
+        'min_fixation_duration': test_data.get('min_fixation_duration', 0),
+        'gaze_stability': test_data.get('gaze_stability', 0),
+        'gaze_consistency': test_data.get('gaze_consistency', 0),
+        # Valeurs par défaut, remplacées par le scoring ML
+        'result': 'poor',
+        'clinical_evaluation': 'En attente',
+        'ml_status': EyeTrackingTest.ML_PENDING,
+        'left_eye_open': raw_data.get('eyeStatus', {}).get('leftEyeOpen', False),
+        'right_eye_open': raw_data.get('eyeStatus', {}).get('rightEyeOpen', False),
+        'raw_data': raw_data,
+    }
+    return fields, gaze_history, gaze_layout
+
+
+def _validate(items: List[Any], context) -> Tuple[List[Tuple[int, Dict]], List[Dict]]:
+    """Valide chaque élément séparément avec EyeTrackingTestCreateSerializer(many=True)"""
+    serializer = EyeTrackingTestCreateSerializer(data=items, many=True, context=context)
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, serializer.child.run_validation(item)))
+        except ValidationError as e:
+            errors.append({'index': index, 'errors': e.detail})
+    return valid, errors
+
+
+def _resolve_patients(user, valid: List[Tuple[int, Dict]]):
+    """Associe un patient à chaque élément valide (deux requêtes au plus)
+
+    Returns:
+        ([(index, patient, données)], erreurs)
+    """
+    patient_ids = {data['patient_id'] for _, data in valid if data.get('patient_id')}
+    patients = Patient.objects.in_bulk(patient_ids)
+    own_patient = None
+    if any(not data.get('patient_id') for _, data in valid):
+        own_patient = Patient.objects.filter(user=user).first()
+
+    resolved, errors = [], []
+    for index, data in valid:
+        patient_id = data.get('patient_id')
+        if patient_id:
+            patient = patients.get(patient_id)
+            if patient is None:
+                errors.append({'index': index, 'errors': {'patient_id': ['Patient non trouvé']}})
+                continue
+            # L'utilisateur doit être admin ou être ce patient
+            if not user.is_staff and patient.user_id != user.id:
+                errors.append({'index': index, 'errors': {
+                    'patient_id': ['Vous n\'avez pas la permission de créer un test pour ce patient']
+                }})
+                continue
+        else:
+            # Sinon, le test est créé pour l'utilisateur courant
+            patient = own_patient
+            if patient is None:
+                errors.append({'index': index, 'errors': {'patient_id': ['Profil patient non trouvé']}})
+                continue
+        resolved.append((index, patient, data))
+    return resolved, errors
+
+
+def ingest_tests(items: List[Any], user, context=None):
+    """Crée en masse les tests valides de `items`
+
+    Returns:
+        ([{'index', 'id'}] des tests créés, [{'index', 'errors'}] des éléments rejetés)
+    """
+    valid, errors = _validate(items, context)
+    resolved, patient_errors = _resolve_patients(user, valid)
+    errors = sorted(errors + patient_errors, key=lambda error: error['index'])
+    if not resolved:
+        return [], errors
+
+    tests, recordings = [], []
+    for _, patient, data in resolved:
+        fields, gaze_history, gaze_layout = test_fields(data)
+        test = EyeTrackingTest(patient=patient, **fields)
+        tests.append(test)
+        recordings.append((test, gaze_history, gaze_layout))
+
+    # raw_data chiffré en un seul lot ; le clair reste lisible pour les features
+    encrypt_fields(tests, 'raw_data')
+    with transaction.atomic():
+        EyeTrackingTest.objects.bulk_create(tests, batch_size=BULK_BATCH_SIZE)
+        GazeRecording.bulk_store(recordings, batch_size=BULK_BATCH_SIZE)
+        try:
+            # Point de sauvegarde : sous PostgreSQL, une erreur du feature store
+            # n'invalide pas l'insertion du lot
+            with transaction.atomic():
+                store_features(tests)
+        except Exception:
+            # Le scoring recalculera les features manquantes
+            logger.exception("Erreur lors du calcul des features d'un lot de %d tests", len(tests))
+        statistics.tests_bulk_created(tests)
+        response_cache.invalidate_patients({test.patient_id for test in tests})
+
+        # Un seul réveil du scoring pour tout le lot, une fois la transaction validée
+        transaction.on_commit(enqueue_scoring)
+
+    created = [{'index': index, 'id': test.id} for (index, _, _), test in zip(resolved, tests)]
+    return created, errors
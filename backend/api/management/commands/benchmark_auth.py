@@ -0,0 +1,64 @@
+"""
+Surcoût par requête de l'authentification et du gestionnaire de sécurité Tink.
+
+DRF instancie les classes d'authentification à chaque requête et
+django.contrib.auth les backends à chaque authentification. Deux modes :
+
+- gestionnaire par requête : un TinkSecurityManager construit à chaque
+  instanciation (lecture et analyse des keysets, construction des primitives),
+  comme avant le gestionnaire partagé ;
+- gestionnaire partagé : get_security_manager(), chargé une fois par processus.
+
+Chaque itération authentifie un jeton Bearer avec SecureJWTAuthentication
+puis chiffre et déchiffre un identifiant (DAEAD).
+
+    python manage.py benchmark_auth --requests 500
+"""
+import time
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+
+from security.authentication import SecureJWTAuthentication
+from security.security_manager import TinkSecurityManager, get_security_manager
+
+
+class Command(BaseCommand):
+    help = "Surcoût de l'authentification par requête, avec et sans gestionnaire Tink partagé"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requêtes par mode")
+
+    def handle(self, *args, **options):
+        user = User.objects.order_by('id').first()
+        if user is None:
+            raise CommandError("Aucun utilisateur en base")
+        if get_security_manager() is None:
+            raise CommandError("Keysets Tink indisponibles (voir les logs)")
+
+        token = SecureJWTAuthentication().generate_token(user)
+        request = APIRequestFactory().get('/api/patients/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        modes = [
+            ('gestionnaire par requête', lambda: TinkSecurityManager(settings.TINK_KEYSET_LOCATION)),
+            ('gestionnaire partagé', get_security_manager),
+        ]
+        self.stdout.write(f"  {'mode':<28}{'moyenne':>12}{'p50':>10}{'p95':>10}")
+        for label, manager in modes:
+            timings = []
+            for _ in range(options['requests']):
+                start = time.perf_counter()
+                authentication = SecureJWTAuthentication()
+                authentication.authenticate(request)
+                security_manager = manager()
+                security_manager.decrypt_deterministic(security_manager.encrypt_deterministic(user.username))
+                timings.append(time.perf_counter() - start)
+
+            timings = np.array(timings) * 1e3
+            self.stdout.write(
+                f"  {label:<28}{timings.mean():>9.3f} ms"
+                f"{np.percentile(timings, 50):>7.3f} ms{np.percentile(timings, 95):>7.3f} ms"
+            )
@@ -0,0 +1,95 @@
+"""
+Latence d'une requête API selon la gestion des connexions à la base.
+
+Chaque itération reproduit le cycle d'une requête gunicorn (signaux
+request_started / request_finished, qui ferment les connexions expirées)
+autour de GET /api/tests/ en lecture seule :
+
+- sans persistance (CONN_MAX_AGE=0) : une connexion ouverte par requête ;
+- persistante (CONN_MAX_AGE>0, vérification de santé) : connexion réutilisée.
+
+Pour mesurer le pooling PgBouncer, lancer la commande une fois avec
+DATABASE_URL pointant sur PostgreSQL, puis sur PgBouncer avec DB_POOLER=pgbouncer.
+
+    python manage.py benchmark_db_connections --requests 200
+"""
+import time
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import EyeTrackingTestViewSet
+
+MODES = [
+    # (libellé, CONN_MAX_AGE)
+    ('sans persistance', 0),
+    ('persistante', 600),
+]
+
+
+class Command(BaseCommand):
+    help = "Latence des requêtes API avec et sans connexions persistantes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requêtes par mode")
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        pooler = 'PgBouncer' if settings_dict.get('DISABLE_SERVER_SIDE_CURSORS') else 'aucun'
+        self.stdout.write(
+            f"Base : {connection.vendor} {settings_dict.get('HOST') or settings_dict['NAME']} "
+            f"(pooler : {pooler})"
+        )
+        self.stdout.write(
+            f"  {'mode':<20}{'connexions':>12}{'moyenne':>12}{'p50':>10}{'p95':>10}"
+        )
+
+        initial_max_age = settings_dict.get('CONN_MAX_AGE', 0)
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for label, max_age in MODES:
+                    self._run(label, max_age, options['requests'])
+        finally:
+            settings_dict['CONN_MAX_AGE'] = initial_max_age
+            connection.close()
+
+    def _run(self, label, max_age, n_requests):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count_connection)
+
+        # Administrateur non enregistré : la mesure n'écrit rien en base
+        admin = User(id=0, username='benchmark-admin', is_staff=True)
+        factory = APIRequestFactory()
+        view = EyeTrackingTestViewSet.as_view({'get': 'list'})
+        timings = []
+        try:
+            for _ in range(n_requests):
+                start = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                request = factory.get('/api/tests/')
+                force_authenticate(request, user=admin)
+                response = view(request)
+                response.render()
+                request_finished.send(sender=self.__class__)
+                timings.append(time.perf_counter() - start)
+        finally:
+            connection_created.disconnect(count_connection)
+
+        timings = np.array(timings) * 1e3
+        self.stdout.write(
+            f"  {label:<20}{len(opened):>12}{timings.mean():>9.2f} ms"
+            f"{np.percentile(timings, 50):>7.2f} ms{np.percentile(timings, 95):>7.2f} ms"
+        )
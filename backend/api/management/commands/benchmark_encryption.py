@@ -0,0 +1,109 @@
+"""
+Débit du chiffrement au repos de raw_data (Tink AEAD).
+
+- unitaire : encrypt_data / decrypt_data, un objet par appel, ciphertext en
+  base64 (texte) ;
+- par lot : encrypt_many / decrypt_many, ciphertext binaire, données
+  associées communes ou une par enregistrement (liées à la ligne) ;
+- champ du modèle : déchiffrement de EyeTrackingTest.raw_data à la lecture
+  de chaque attribut, ou en un lot avec decrypt_fields.
+
+Les enregistrements sont générés en mémoire : la mesure n'écrit rien en base.
+Chaque temps est le meilleur de --repeat mesures.
+
+    python manage.py benchmark_encryption --records 10000
+"""
+import gc
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import EyeTrackingTest
+from security.fields import Ciphertext, decrypt_fields
+from security.security_manager import get_security_manager
+
+ASSOCIATED_DATA = b'api.EyeTrackingTest.raw_data'
+
+
+def make_record(i):
+    """raw_data typique d'un test, historique du regard exclu (GazeRecording)"""
+    return {
+        'eyeStatus': {'leftEyeOpen': True, 'rightEyeOpen': i % 7 != 0},
+        'screen': {'width': 1920, 'height': 1080, 'devicePixelRatio': 1.25},
+        'calibration': {'points': 9, 'error': round(0.5 + (i % 100) / 100, 2)},
+        'session': f'session-{i:08d}',
+    }
+
+
+class Command(BaseCommand):
+    help = "Débit du chiffrement de raw_data : unitaire, par lot et via le champ du modèle"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        manager = get_security_manager()
+        if manager is None:
+            raise CommandError("Keysets Tink indisponibles (voir les logs)")
+        n_records = options['records']
+        self.repeat = options['repeat']
+        records = [make_record(i) for i in range(n_records)]
+
+        self.stdout.write(f"{n_records} enregistrements")
+        self.stdout.write(f"  {'mode':<34}{'chiffrement':>14}{'déchiffrement':>16}{'stockage':>12}")
+
+        ad = ASSOCIATED_DATA.decode()
+        texts, encrypt_time = self._best(lambda: [manager.encrypt_data(record, ad) for record in records])
+        _, decrypt_time = self._best(lambda: [manager.decrypt_data(text, ad) for text in texts])
+        self._row('unitaire, base64', n_records, encrypt_time, decrypt_time, sum(len(t) for t in texts))
+
+        ciphertexts, encrypt_time = self._best(lambda: manager.encrypt_many(records, ASSOCIATED_DATA))
+        decrypted, decrypt_time = self._best(lambda: manager.decrypt_many(ciphertexts, ASSOCIATED_DATA))
+        if decrypted != records:
+            raise CommandError("decrypt_many ne restitue pas les enregistrements")
+        self._row('par lot, binaire', n_records, encrypt_time, decrypt_time, sum(len(c) for c in ciphertexts))
+
+        # Données associées de EyeTrackingTest.raw_data : liées à chaque ligne (uuid)
+        field = EyeTrackingTest._meta.get_field('raw_data')
+        tests = [EyeTrackingTest() for _ in records]
+        row_ads = [field.associated_data(test) for test in tests]
+        ciphertexts, encrypt_time = self._best(lambda: manager.encrypt_many(records, row_ads))
+        _, decrypt_time = self._best(lambda: manager.decrypt_many(ciphertexts, row_ads))
+        self._row('par lot, lié à la ligne', n_records, encrypt_time, decrypt_time, None)
+
+        # Instances telles que lues en base : ciphertext non déchiffré
+        def loaded_tests():
+            for test, ciphertext in zip(tests, ciphertexts):
+                test.raw_data = Ciphertext(ciphertext)
+            return tests
+
+        def read_each(tests):
+            return [test.raw_data for test in tests]
+
+        def read_batch(tests):
+            return read_each(decrypt_fields(tests, 'raw_data'))
+
+        _, elapsed = self._best(read_each, loaded_tests)
+        self._row('champ, lecture de chaque attribut', n_records, None, elapsed, None)
+        _, elapsed = self._best(read_batch, loaded_tests)
+        self._row('champ, decrypt_fields', n_records, None, elapsed, None)
+
+    def _best(self, run, setup=None):
+        """(résultat, meilleur temps) de self.repeat exécutions de run(setup())"""
+        best, result = None, None
+        for _ in range(self.repeat):
+            args = (setup(),) if setup is not None else ()
+            gc.collect()
+            start = time.perf_counter()
+            result = run(*args)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best
+
+    def _row(self, label, n_records, encrypt_time, decrypt_time, size):
+        def rate(elapsed):
+            return f"{n_records / elapsed:>9.0f} /s" if elapsed else f"{'-':>11}"
+
+        storage = f"{size / n_records:>7.0f} o/enr" if size else f"{'-':>13}"
+        self.stdout.write(f"  {label:<34}{rate(encrypt_time):>14}{rate(decrypt_time):>16}{storage:>12}")
@@ -0,0 +1,68 @@
+"""
+Compare le stockage de l'historique du regard en JSON (ancien raw_data) au
+format binaire en colonnes de GazeRecording : taille, encodage, décodage.
+
+    python manage.py benchmark_gaze_storage --points 1000
+"""
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from ml.features import GazeSamples
+from ml.management.commands.benchmark_features import make_history
+
+
+def _timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+class Command(BaseCommand):
+    help = "Taille et latence de l'historique du regard : JSON vs colonnes binaires"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, nargs='+', default=[100, 1000],
+                            help="Points par historique")
+        parser.add_argument('--repeat', type=int, default=200, help="Nombre de répétitions")
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        rng = np.random.default_rng(42)
+
+        for n_points in options['points']:
+            history = make_history(n_points, rng)
+            samples = GazeSamples.from_history(history)
+
+            encoded_json, json_encode = _timed(lambda: json.dumps(history).encode(), repeat)
+            _, json_decode = _timed(
+                lambda: GazeSamples.from_history(json.loads(encoded_json)), repeat
+            )
+            packed_raw, raw_encode = _timed(lambda: samples.pack(compress=False), repeat)
+            _, raw_decode = _timed(lambda: GazeSamples.unpack(packed_raw), repeat)
+            packed_zlib, zlib_encode = _timed(lambda: samples.pack(), repeat)
+            _, zlib_decode = _timed(lambda: GazeSamples.unpack(packed_zlib), repeat)
+
+            self.stdout.write(f"Historique de {n_points} points, {repeat} répétitions")
+            self.stdout.write(f"  {'format':<18}{'octets':>10}{'encodage':>12}{'décodage':>12}")
+            for name, data, encode, decode in (
+                ('JSON', encoded_json, json_encode, json_decode),
+                ('colonnes', packed_raw, raw_encode, raw_decode),
+                ('colonnes + zlib', packed_zlib, zlib_encode, zlib_decode),
+            ):
+                self.stdout.write(
+                    f"  {name:<18}{len(data):>10}"
+                    f"{encode * 1e3:>9.3f} ms{decode * 1e3:>9.3f} ms"
+                )
+
+            decoded = GazeSamples.unpack(packed_zlib)
+            diff = max(
+                float(np.max(np.abs(
+                    getattr(decoded, name).astype(np.float64) - getattr(samples, name)
+                ), initial=0))
+                for name in GazeSamples.COLUMNS
+            )
+            self.stdout.write(f"  écart maximal (float32) : {diff:.2e}")
@@ -0,0 +1,120 @@
+"""
+Latence de l'inscription et de la connexion avec un grand nombre d'utilisateurs.
+
+Insère --users utilisateurs fictifs (et leurs index aveugles) dans une
+transaction annulée à la fin, puis mesure :
+
+- la recherche d'un email sur auth_user.email (non indexé : parcours complet),
+  comme le faisait RegisterView ;
+- les recherches par index aveugle (security.identity) de l'email et du nom
+  d'utilisateur ;
+- POST /api/auth/register/ et POST /api/auth/login/ complets, avec un hachage
+  de mot de passe rapide pour ne mesurer que l'accès à la base.
+
+    python manage.py benchmark_identity_lookup --users 1000000
+"""
+import time
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from api.views import LoginView, RegisterView
+from security.identity import email_exists, find_user, index_users
+
+BATCH_SIZE = 5000
+PASSWORD = 'benchmark-password'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Latence de l'inscription et de la connexion à 1M utilisateurs (index aveugles)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=200, help="Mesures par opération")
+
+    def handle(self, *args, **options):
+        try:
+            with override_settings(
+                PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+                ALLOWED_HOSTS=['testserver'],
+            ), transaction.atomic():
+                self._run(options['users'], options['queries'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, n_users, n_queries):
+        start = time.perf_counter()
+        first_id = (User.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        for offset in range(0, n_users, BATCH_SIZE):
+            users = [
+                User(
+                    id=first_id + i,
+                    username=f'benchmark-{i:08d}',
+                    email=f'benchmark-{i:08d}@example.org',
+                    password='!',
+                )
+                for i in range(offset, min(offset + BATCH_SIZE, n_users))
+            ]
+            User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+            index_users(users, batch_size=BATCH_SIZE)
+        self.stdout.write(
+            f"{n_users} utilisateurs insérés en {time.perf_counter() - start:.1f} s "
+            f"({connection.vendor}, transaction annulée à la fin)"
+        )
+
+        rng = np.random.default_rng(0)
+        samples = [int(i) for i in rng.integers(0, n_users, n_queries)]
+        user = User.objects.get(username=f'benchmark-{samples[0]:08d}')
+        user.set_password(PASSWORD)
+        user.save(update_fields=['password'])
+
+        self.stdout.write(f"  {'opération':<44}{'moyenne':>12}{'p50':>11}{'p95':>11}")
+        self._measure('email, auth_user.email (sans index)', samples, lambda i: User.objects.filter(
+            email=f'benchmark-{i:08d}@example.org'
+        ).exists())
+        self._measure('email, index aveugle', samples, lambda i: email_exists(f'benchmark-{i:08d}@example.org'))
+        self._measure('nom d\'utilisateur, index aveugle', samples, lambda i: find_user(f'benchmark-{i:08d}'))
+
+        factory = APIRequestFactory()
+        register = RegisterView.as_view()
+        login = LoginView.as_view()
+
+        def register_request(i):
+            request = factory.post('/api/auth/register/', {
+                'username': f'new-{i:08d}', 'email': f'new-{i:08d}@example.org', 'password': PASSWORD
+            }, format='json')
+            response = register(request)
+            if response.status_code != 201:
+                raise CommandError(f"Inscription en échec : {response.data}")
+
+        def login_request(i):
+            request = factory.post('/api/auth/login/', {
+                'username': user.username, 'password': PASSWORD
+            }, format='json')
+            response = login(request)
+            if response.status_code != 200:
+                raise CommandError(f"Connexion en échec : {response.data}")
+
+        self._measure('POST /api/auth/register/', range(n_queries), register_request)
+        self._measure('POST /api/auth/login/', range(n_queries), login_request)
+
+    def _measure(self, label, samples, operation):
+        timings = []
+        for i in samples:
+            start = time.perf_counter()
+            operation(i)
+            timings.append(time.perf_counter() - start)
+        timings = np.array(timings) * 1e3
+        self.stdout.write(
+            f"  {label:<44}{timings.mean():>9.3f} ms"
+            f"{np.percentile(timings, 50):>8.3f} ms{np.percentile(timings, 95):>8.3f} ms"
+        )
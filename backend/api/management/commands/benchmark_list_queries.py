@@ -0,0 +1,111 @@
+"""
+Vérifie que les endpoints de lecture restent légers quand les historiques du
+regard grossissent : nombre de requêtes SQL, octets lus en base et taille de
+la réponse, avec et sans chargement différé de raw_data.
+
+Les données de mesure sont créées dans une transaction annulée à la fin.
+
+    python manage.py benchmark_list_queries --tests 20 --points 100 1000 5000
+"""
+import json
+import time
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import EyeTrackingTest, GazeRecording, MLPrediction, Patient
+from api.serializers import EyeTrackingTestSerializer
+from api.views import EyeTrackingTestViewSet
+from ml.management.commands.benchmark_features import make_history
+
+
+class Rollback(Exception):
+    pass
+
+
+def fetched_bytes(queries):
+    """Octets renvoyés par la base pour les SELECT capturés (ré-exécutés)"""
+    total = 0
+    with connection.cursor() as cursor:
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            cursor.execute(sql)
+            for row in cursor.fetchall():
+                total += sum(len(str(value)) if value is not None else 0 for value in row)
+    return total
+
+
+class Command(BaseCommand):
+    help = "Requêtes SQL et octets lus par les listes de tests selon la taille des historiques"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tests', type=int, default=20, help="Tests par patient")
+        parser.add_argument('--points', type=int, nargs='+', default=[100, 1000, 5000],
+                            help="Points par historique du regard")
+
+    def handle(self, *args, **options):
+        try:
+            # La pagination par curseur construit ses liens avec build_absolute_uri
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), transaction.atomic():
+                self._run(options['tests'], options['points'])
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _measure(self, label, func):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            body = func()
+            elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"  {label:<24}{len(ctx.captured_queries):>8}{fetched_bytes(ctx.captured_queries):>14}"
+            f"{len(body):>12}{elapsed * 1e3:>10.1f} ms"
+        )
+
+    def _run(self, n_tests, points):
+        rng = np.random.default_rng(0)
+        factory = APIRequestFactory()
+        list_view = EyeTrackingTestViewSet.as_view({'get': 'list'})
+
+        for n_points in points:
+            user = User.objects.create_user(username=f'benchmark-{n_points}')
+            patient = Patient.objects.create(user=user)
+            for _ in range(n_tests):
+                history = make_history(n_points, rng)
+                test = EyeTrackingTest.objects.create(
+                    patient=patient, duration=30, gaze_time=20, tracking_percentage=66,
+                    fixation_count=3, avg_fixation_duration=1, max_fixation_duration=2,
+                    min_fixation_duration=0.5, gaze_stability=0.5, gaze_consistency=0.5,
+                    left_eye_open=True, right_eye_open=True, result='good',
+                    clinical_evaluation='', raw_data={'gazeHistory': history},
+                )
+                MLPrediction.objects.create(
+                    test=test, predicted_result='good', confidence_score=0.9,
+                    features={'gazeHistory': history},
+                )
+                GazeRecording.store(test, history)
+
+            def api_list():
+                request = factory.get('/api/tests/')
+                force_authenticate(request, user=user)
+                response = list_view(request)
+                response.render()
+                return response.content
+
+            def full_rows():
+                tests = EyeTrackingTest.objects.filter(patient=patient)
+                return json.dumps(EyeTrackingTestSerializer(tests, many=True).data, default=str)
+
+            self.stdout.write(f"{n_tests} tests de {n_points} points")
+            self.stdout.write(
+                f"  {'lecture':<24}{'requêtes':>8}{'octets lus':>14}{'réponse':>12}{'durée':>13}"
+            )
+            self._measure('sans defer', full_rows)
+            self._measure('GET /api/tests/', api_list)
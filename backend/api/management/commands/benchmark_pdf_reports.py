@@ -0,0 +1,76 @@
+"""
+Temps de rendu et mémoire du rapport PDF d'un patient selon la longueur de
+son historique, avec l'historique en un seul tableau ou découpé en tableaux
+de TEST_TABLE_ROWS lignes (api.pdf_generator).
+
+Les tests sont générés en mémoire : la mesure ne lit pas la base. La mémoire
+est le pic des allocations Python (tracemalloc) pendant un second rendu.
+
+    python manage.py benchmark_pdf_reports --tests 1000 5000 10000
+    python manage.py benchmark_pdf_reports --tests 10000 --skip-single-above 2000
+"""
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from api.pdf_generator import TEST_TABLE_ROWS, render_patient_report
+
+
+def make_tests(n_tests):
+    start = datetime(2026, 1, 1, 9, 0)
+    results = ('excellent', 'good', 'fair', 'poor')
+    return [
+        SimpleNamespace(
+            created_at=start + timedelta(hours=i),
+            duration=30 + i % 30,
+            gaze_stability=50 + (i * 7) % 50,
+            result=results[i % 4],
+            clinical_evaluation='Suivi normal',
+        )
+        for i in range(n_tests)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Rendu du rapport PDF patient : tableau unique ou tableaux découpés"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tests', type=int, nargs='+', default=[1000, 5000, 10000])
+        parser.add_argument(
+            '--skip-single-above', type=int, default=None,
+            help="Ne pas mesurer le tableau unique au-delà de ce nombre de tests"
+        )
+
+    def handle(self, *args, **options):
+        user = SimpleNamespace(first_name='Benchmark', last_name='Patient', email='benchmark@example.org')
+        patient = SimpleNamespace(user=user, age=42)
+
+        self.stdout.write(
+            f"  {'tests':>7}  {'historique':<22}{'pages':>7}{'taille':>12}{'temps':>10}{'pic mémoire':>14}"
+        )
+        for n_tests in options['tests']:
+            tests = make_tests(n_tests)
+            modes = [(f'tableaux de {TEST_TABLE_ROWS} lignes', TEST_TABLE_ROWS)]
+            if options['skip_single_above'] is None or n_tests <= options['skip_single_above']:
+                modes.insert(0, ('tableau unique', n_tests))
+
+            for label, rows_per_table in modes:
+                start = time.perf_counter()
+                pdf, pages = render_patient_report(patient, tests, rows_per_table=rows_per_table)
+                elapsed = time.perf_counter() - start
+                with pdf:
+                    size = pdf.seek(0, 2)
+
+                tracemalloc.start()
+                pdf, _ = render_patient_report(patient, tests, rows_per_table=rows_per_table)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                pdf.close()
+
+                self.stdout.write(
+                    f"  {n_tests:>7}  {label:<22}{pages:>7}{size / 1024:>9.0f} Ko"
+                    f"{elapsed:>8.2f} s{peak / 2 ** 20:>11.1f} Mo"
+                )
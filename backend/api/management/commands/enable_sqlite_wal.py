@@ -0,0 +1,27 @@
+"""
+Active le journal WAL de la base SQLite (étape de déploiement, une seule fois)
+
+    python manage.py enable_sqlite_wal
+
+Le mode WAL est enregistré dans le fichier de la base : il reste actif pour
+toutes les connexions suivantes. config.database ne l'active pas à chaque
+connexion, pour qu'une simple commande manage.py ne modifie pas la base.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from config.database import SQLITE_JOURNAL_MODE
+
+
+class Command(BaseCommand):
+    help = "Passe la base SQLite en journal WAL (persistant)"
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(f"Base {connection.vendor} : rien à faire (SQLite uniquement)")
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}')
+            mode = cursor.fetchone()[0]
+        if mode.upper() != SQLITE_JOURNAL_MODE:
+            raise CommandError(f"Journal {mode} : WAL non pris en charge pour cette base")
+        self.stdout.write(f"Journal SQLite : {mode}")
@@ -0,0 +1,55 @@
+"""
+Export en masse des rapports patients dans une archive ZIP (au premier plan).
+
+Même traitement que POST /api/report-exports/ ; affiche la progression et le
+débit en pages par seconde. --no-cache force le rendu de tous les rapports,
+pour mesurer le gain du parallélisme selon --processes.
+
+    python manage.py export_reports
+    python manage.py export_reports --patients 1 2 3 --processes 4
+    python manage.py export_reports --no-cache --processes 1
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk_export import export_path, run_bulk_export
+from api.models import BulkExportJob
+
+
+class Command(BaseCommand):
+    help = "Exporte les rapports PDF des patients dans une archive ZIP"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, nargs='+', help="Patients à exporter (tous par défaut)")
+        parser.add_argument(
+            '--processes', type=int, default=settings.REPORTS_EXPORT_PROCESSES, help="Processus de rendu"
+        )
+        parser.add_argument('--no-cache', action='store_true', help="Rendre aussi les rapports déjà en cache")
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1:
+            raise CommandError("--processes doit être positif")
+
+        job = BulkExportJob.objects.create(patient_ids=options['patients'], processes=options['processes'])
+
+        def on_progress(job):
+            self.stdout.write(
+                f"  {job.done}/{job.total} rapports ({job.from_cache} en cache), "
+                f"{job.pages} pages, {job.pages_per_second:.1f} pages/s"
+            )
+
+        start = time.perf_counter()
+        job = run_bulk_export(job.pk, use_cache=not options['no_cache'], on_progress=on_progress)
+        elapsed = time.perf_counter() - start
+        if job.status != BulkExportJob.SUCCEEDED:
+            raise CommandError(f"Export {job.pk} en échec : {job.error}")
+
+        rendered = job.done - job.from_cache
+        self.stdout.write(self.style.SUCCESS(
+            f"Export {job.pk} : {job.done} rapports ({rendered} rendus, {job.from_cache} repris du cache), "
+            f"{job.pages} pages en {elapsed:.2f} s avec {job.processes} processus "
+            f"({job.pages_per_second:.1f} pages/s, {rendered / elapsed:.1f} rapports/s)"
+        ))
+        self.stdout.write(f"Archive : {export_path(job)} ({job.size} octets)")
@@ -0,0 +1,89 @@
+"""
+Mesure le coût d'import (temps et mémoire résidente) de chaque module du
+backend, chacun dans un interpréteur neuf après django.setup().
+
+    python manage.py profile_imports
+    python manage.py profile_imports tensorflow ml.predictor
+"""
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+DEFAULT_MODULES = [
+    'api.views',
+    'api.pdf_generator',
+    'ml.views',
+    'ml.predictor',
+    'security.authentication',
+    'config.wsgi',
+    'numpy',
+    'sklearn.ensemble',
+    'tensorflow',
+    'reportlab.platypus',
+]
+
+# Exécuté dans un sous-processus : mesure django.setup() puis l'import demandé
+PROBE = r'''
+import importlib, json, os, sys, time
+sys.path.insert(0, {base_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+start = time.perf_counter()
+import django
+django.setup()
+setup_seconds = time.perf_counter() - start
+rss_before = rss_mb()
+
+start = time.perf_counter()
+importlib.import_module({module!r})
+print(json.dumps({{
+    'setup_seconds': setup_seconds,
+    'import_seconds': time.perf_counter() - start,
+    'rss_mb': rss_mb() - rss_before,
+    'tensorflow_loaded': 'tensorflow' in sys.modules,
+    'sklearn_loaded': 'sklearn' in sys.modules,
+}}))
+'''
+
+
+class Command(BaseCommand):
+    help = "Rapporte le coût d'import de chaque module (temps, RSS, chargement de TensorFlow/scikit-learn)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', help="Modules à mesurer (défaut: modules clés du backend)")
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or DEFAULT_MODULES
+
+        self.stdout.write(f"{'module':<26} {'import':>9} {'RSS':>9}  TF  sklearn")
+        setup_seconds = []
+        for module in modules:
+            completed = subprocess.run(
+                [sys.executable, '-c', PROBE.format(base_dir=str(settings.BASE_DIR), module=module)],
+                capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'erreur'
+                self.stdout.write(f"{module:<26} {error}")
+                continue
+
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            setup_seconds.append(result['setup_seconds'])
+            self.stdout.write(
+                f"{module:<26} {result['import_seconds'] * 1000:>7.0f}ms {result['rss_mb']:>7.1f}Mo"
+                f"  {'oui' if result['tensorflow_loaded'] else 'non':<3} "
+                f"{'oui' if result['sklearn_loaded'] else 'non'}"
+            )
+
+        if setup_seconds:
+            self.stdout.write(f"django.setup() : {min(setup_seconds) * 1000:.0f}ms (meilleur des essais)")
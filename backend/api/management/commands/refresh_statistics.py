@@ -0,0 +1,19 @@
+"""
+Recalcule les statistiques des tests (TestStatistics) depuis la table des tests
+
+    python manage.py refresh_statistics
+
+Utile après des modifications en masse qui ne passent pas par les signaux
+(QuerySet.update, imports SQL).
+"""
+from django.core.management.base import BaseCommand
+
+from api.statistics import rebuild_all_statistics
+
+
+class Command(BaseCommand):
+    help = "Recalcule les statistiques globales et par patient"
+
+    def handle(self, *args, **options):
+        rows = rebuild_all_statistics()
+        self.stdout.write(f"{rows} ligne(s) de statistiques recalculée(s)")
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.8 on 2026-10-17 02:57
+
+from django.db import migrations, models
+
+
+def mark_existing_scored(apps, schema_editor):
+    """Les tests déjà prédits de manière synchrone sont marqués comme analysés"""
+    EyeTrackingTest = apps.get_model("api", "EyeTrackingTest")
+    EyeTrackingTest.objects.filter(ml_prediction__isnull=False).update(
+        ml_status="scored"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eyetrackingtest",
+            name="ml_claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="eyetrackingtest",
+            name="ml_error",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddField(
+            model_name="eyetrackingtest",
+            name="ml_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "En attente"),
+                    ("processing", "En cours"),
+                    ("scored", "Analysé"),
+                    ("failed", "Échec"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(mark_existing_scored, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 4.2.8 on 2026-10-17 03:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from ml.features import GazeSamples, merge_gaze_history, split_gaze_history
+
+BATCH_SIZE = 200
+
+
+def _in_batches(queryset):
+    ids = list(queryset.values_list("pk", flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield queryset.model.objects.filter(pk__in=ids[start : start + BATCH_SIZE])
+
+
+def move_gaze_history(apps, schema_editor):
+    """Déplace l'historique du regard de raw_data vers GazeRecording (format binaire)"""
+    EyeTrackingTest = apps.get_model("api", "EyeTrackingTest")
+    GazeRecording = apps.get_model("api", "GazeRecording")
+
+    for batch in _in_batches(EyeTrackingTest.objects.all()):
+        recordings = []
+        for test in batch.only("id", "raw_data"):
+            raw_data, gaze_history, layout = split_gaze_history(test.raw_data)
+            if not gaze_history:
+                continue
+            recordings.append(
+                GazeRecording(
+                    test_id=test.pk,
+                    layout=layout,
+                    n_samples=len(gaze_history),
+                    data=GazeSamples.from_history(gaze_history).pack(),
+                )
+            )
+            test.raw_data = raw_data
+            test.save(update_fields=["raw_data"])
+        GazeRecording.objects.bulk_create(recordings)
+
+
+def restore_gaze_history(apps, schema_editor):
+    """Réintègre l'historique du regard dans raw_data"""
+    EyeTrackingTest = apps.get_model("api", "EyeTrackingTest")
+    GazeRecording = apps.get_model("api", "GazeRecording")
+
+    for batch in _in_batches(GazeRecording.objects.all()):
+        for recording in batch:
+            test = EyeTrackingTest.objects.only("id", "raw_data").get(
+                pk=recording.test_id
+            )
+            samples = GazeSamples.unpack(bytes(recording.data))
+            test.raw_data = merge_gaze_history(test.raw_data, samples, recording.layout)
+            test.save(update_fields=["raw_data"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_eyetrackingtest_ml_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GazeRecording",
+            fields=[
+                (
+                    "test",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="gaze_recording",
+                        serialize=False,
+                        to="api.eyetrackingtest",
+                    ),
+                ),
+                (
+                    "layout",
+                    models.CharField(
+                        choices=[
+                            ("history", "gazeHistory"),
+                            ("timestamps", "Points horodatés"),
+                        ],
+                        default="history",
+                        help_text="Format d'origine dans raw_data, restitué par full_raw_data",
+                        max_length=20,
+                    ),
+                ),
+                ("n_samples", models.IntegerField(default=0)),
+                ("data", models.BinaryField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Historique du regard",
+                "verbose_name_plural": "Historiques du regard",
+            },
+        ),
+        migrations.RunPython(move_gaze_history, restore_gaze_history),
+    ]
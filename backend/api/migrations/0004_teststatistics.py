@@ -0,0 +1,51 @@
+# Generated by Django 4.2.8 on 2026-10-17 03:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_gazerecording"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TestStatistics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=32, unique=True)),
+                ("total_tests", models.IntegerField(default=0)),
+                ("excellent_count", models.IntegerField(default=0)),
+                ("good_count", models.IntegerField(default=0)),
+                ("acceptable_count", models.IntegerField(default=0)),
+                ("poor_count", models.IntegerField(default=0)),
+                ("tracking_percentage_sum", models.FloatField(default=0)),
+                ("gaze_stability_sum", models.FloatField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "patient",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="statistics",
+                        to="api.patient",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Statistiques des tests",
+                "verbose_name_plural": "Statistiques des tests",
+            },
+        ),
+    ]
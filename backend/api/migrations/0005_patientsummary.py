@@ -0,0 +1,91 @@
+# Generated by Django 4.2.8 on 2026-10-17 03:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from api.statistics import SUMMARY_FIELDS, SUMMARY_WINDOW, summarize
+
+
+def build_summaries(apps, schema_editor):
+    """Matérialise le résumé des patients ayant déjà des tests"""
+    EyeTrackingTest = apps.get_model("api", "EyeTrackingTest")
+    PatientSummary = apps.get_model("api", "PatientSummary")
+
+    counts = (
+        EyeTrackingTest.objects.order_by()
+        .values_list("patient_id")
+        .annotate(n=models.Count("id"))
+    )
+    for patient_id, tests_count in counts:
+        recent = list(
+            EyeTrackingTest.objects.filter(patient_id=patient_id)
+            .order_by("-test_date", "-id")
+            .values_list(*SUMMARY_FIELDS)[:SUMMARY_WINDOW]
+        )
+        PatientSummary.objects.create(
+            patient_id=patient_id, **summarize(tests_count, recent)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_teststatistics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatientSummary",
+            fields=[
+                (
+                    "patient",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="summary",
+                        serialize=False,
+                        to="api.patient",
+                    ),
+                ),
+                ("tests_count", models.IntegerField(default=0)),
+                ("last_test_date", models.DateTimeField(blank=True, null=True)),
+                (
+                    "latest_result",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("excellent", "Excellent"),
+                            ("good", "Bon"),
+                            ("acceptable", "Acceptable"),
+                            ("poor", "Faible"),
+                        ],
+                        default="",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "window_size",
+                    models.IntegerField(
+                        default=0, help_text="Nombre de tests de la fenêtre"
+                    ),
+                ),
+                ("avg_tracking_percentage", models.FloatField(blank=True, null=True)),
+                ("avg_gaze_stability", models.FloatField(blank=True, null=True)),
+                ("avg_gaze_consistency", models.FloatField(blank=True, null=True)),
+                (
+                    "tracking_trend",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Pente du pourcentage de suivi (points par test, > 0 = amélioration)",
+                        null=True,
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Résumé patient",
+                "verbose_name_plural": "Résumés patients",
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.8 on 2026-10-17 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_patientsummary"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="eyetrackingtest",
+            index=models.Index(
+                fields=["patient", "-created_at", "-id"],
+                name="test_patient_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="eyetrackingtest",
+            index=models.Index(
+                fields=["patient", "result"], name="test_patient_result_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="eyetrackingtest",
+            index=models.Index(
+                fields=["result", "created_at"], name="test_result_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="eyetrackingtest",
+            index=models.Index(
+                condition=models.Q(("ml_status", "pending")),
+                fields=["created_at"],
+                name="test_ml_pending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="eyetrackingtest",
+            index=models.Index(
+                condition=models.Q(("ml_status", "processing")),
+                fields=["ml_claimed_at"],
+                name="test_ml_processing_idx",
+            ),
+        ),
+    ]
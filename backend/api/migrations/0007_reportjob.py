@@ -0,0 +1,102 @@
+# Generated by Django 4.2.8 on 2026-10-17 03:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("api", "0006_eyetrackingtest_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("patient", "Rapport patient"),
+                            ("test", "Rapport de test"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "cache_key",
+                    models.CharField(
+                        db_index=True,
+                        help_text="Empreinte (patient, dernière modification des tests, version du modèle de rapport)",
+                        max_length=64,
+                    ),
+                ),
+                ("filename", models.CharField(max_length=255)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "En file"),
+                            ("running", "En cours"),
+                            ("succeeded", "Terminé"),
+                            ("failed", "Échec"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "size",
+                    models.IntegerField(default=0, help_text="Taille du PDF en octets"),
+                ),
+                ("error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="report_jobs",
+                        to="api.patient",
+                    ),
+                ),
+                (
+                    "test",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="report_jobs",
+                        to="api.eyetrackingtest",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Rapport PDF",
+                "verbose_name_plural": "Rapports PDF",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
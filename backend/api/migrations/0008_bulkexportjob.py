@@ -0,0 +1,97 @@
+# Generated by Django 4.2.8 on 2026-10-17 03:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("api", "0007_reportjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BulkExportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "patient_ids",
+                    models.JSONField(
+                        blank=True,
+                        help_text="Patients à exporter (tous si vide)",
+                        null=True,
+                    ),
+                ),
+                (
+                    "processes",
+                    models.IntegerField(default=1, help_text="Processus de rendu"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "En file"),
+                            ("running", "En cours"),
+                            ("succeeded", "Terminé"),
+                            ("failed", "Échec"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "total",
+                    models.IntegerField(default=0, help_text="Rapports à exporter"),
+                ),
+                (
+                    "done",
+                    models.IntegerField(
+                        default=0, help_text="Rapports ajoutés à l'archive"
+                    ),
+                ),
+                (
+                    "from_cache",
+                    models.IntegerField(
+                        default=0, help_text="Rapports repris du cache sans rendu"
+                    ),
+                ),
+                ("pages", models.IntegerField(default=0, help_text="Pages rendues")),
+                ("pages_per_second", models.FloatField(default=0.0)),
+                (
+                    "size",
+                    models.BigIntegerField(
+                        default=0, help_text="Taille de l'archive en octets"
+                    ),
+                ),
+                ("error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Export de rapports",
+                "verbose_name_plural": "Exports de rapports",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
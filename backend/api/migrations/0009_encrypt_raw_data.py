@@ -0,0 +1,102 @@
+# Generated by Django 4.2.8 on 2026-10-17 03:50
+
+import uuid
+
+from django.db import migrations, models
+
+import security.fields
+from security.security_manager import require_security_manager
+
+CHUNK_SIZE = 500
+
+
+def associated_data(row_uuid):
+    """Données associées de raw_data, liées à la ligne (EncryptedJSONField(bind_to="uuid"))"""
+    return f"api.EyeTrackingTest.raw_data:{row_uuid}".encode()
+
+
+def populate_uuids(apps, schema_editor):
+    EyeTrackingTest = apps.get_model("api", "EyeTrackingTest")
+    for test_id in EyeTrackingTest.objects.filter(uuid__isnull=True).values_list("id", flat=True):
+        EyeTrackingTest.objects.filter(id=test_id).update(uuid=uuid.uuid4())
+
+
+def _rewrite(EyeTrackingTest, source, target, convert):
+    ids = list(EyeTrackingTest.objects.order_by("id").values_list("id", flat=True))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        rows = EyeTrackingTest.objects.filter(id__in=ids[start : start + CHUNK_SIZE])
+        rows = list(rows.values_list("id", "uuid", source))
+        values = convert(
+            [value for _, _, value in rows],
+            [associated_data(row_uuid) for _, row_uuid, _ in rows],
+        )
+        for (test_id, _, _), value in zip(rows, values):
+            EyeTrackingTest.objects.filter(id=test_id).update(**{target: value})
+
+
+def encrypt_raw_data(apps, schema_editor):
+    """Chiffre raw_data des tests existants en lots (TinkSecurityManager.encrypt_many)"""
+    EyeTrackingTest = apps.get_model("api", "EyeTrackingTest")
+    manager = require_security_manager()
+    _rewrite(
+        EyeTrackingTest,
+        "raw_data",
+        "encrypted_raw_data",
+        lambda values, ads: [
+            security.fields.Ciphertext(ciphertext)
+            for ciphertext in manager.encrypt_many([value or {} for value in values], ads)
+        ],
+    )
+
+
+def decrypt_raw_data(apps, schema_editor):
+    EyeTrackingTest = apps.get_model("api", "EyeTrackingTest")
+    manager = require_security_manager()
+    _rewrite(
+        EyeTrackingTest,
+        "encrypted_raw_data",
+        "raw_data",
+        lambda values, ads: manager.decrypt_many(values, ads),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_bulkexportjob"),
+    ]
+
+    operations = [
+        # Identifiant stable de chaque ligne, distinct pour les tests existants
+        migrations.AddField(
+            model_name="eyetrackingtest",
+            name="uuid",
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_uuids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="eyetrackingtest",
+            name="uuid",
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+        migrations.AddField(
+            model_name="eyetrackingtest",
+            name="encrypted_raw_data",
+            field=security.fields.EncryptedJSONField(null=True),
+        ),
+        migrations.RunPython(encrypt_raw_data, decrypt_raw_data),
+        migrations.RemoveField(
+            model_name="eyetrackingtest",
+            name="raw_data",
+        ),
+        migrations.RenameField(
+            model_name="eyetrackingtest",
+            old_name="encrypted_raw_data",
+            new_name="raw_data",
+        ),
+        migrations.AlterField(
+            model_name="eyetrackingtest",
+            name="raw_data",
+            field=security.fields.EncryptedJSONField(bind_to="uuid", default=dict),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.8 on 2026-10-17 04:04
+
+from django.db import migrations, models
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    """Ne garde actif que le job le plus récent de chaque clé avant la contrainte"""
+    ReportJob = apps.get_model("api", "ReportJob")
+    seen = set()
+    duplicates = []
+    active = ReportJob.objects.filter(status__in=ACTIVE_STATUSES).order_by("-created_at", "-id")
+    for job_id, key in active.values_list("id", "cache_key"):
+        if key in seen:
+            duplicates.append(job_id)
+        seen.add(key)
+    ReportJob.objects.filter(id__in=duplicates).update(status="failed", error="Job en double")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_encrypt_raw_data"),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="reportjob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ACTIVE_STATUSES)),
+                fields=("cache_key",),
+                name="unique_active_report_job",
+            ),
+        ),
+    ]
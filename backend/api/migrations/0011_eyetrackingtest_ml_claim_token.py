@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-17 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_reportjob_unique_active"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eyetrackingtest",
+            name="ml_claim_token",
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
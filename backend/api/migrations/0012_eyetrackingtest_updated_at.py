@@ -0,0 +1,25 @@
+# Generated by Django 4.2.8 on 2026-10-17 04:20
+
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    """Tests existants : dernière modification connue = création"""
+    EyeTrackingTest = apps.get_model("api", "EyeTrackingTest")
+    EyeTrackingTest.objects.update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_eyetrackingtest_ml_claim_token"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eyetrackingtest",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,12 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils.functional import cached_property
+from security.fields import EncryptedJSONField
+from ml.features import (
+    LAYOUT_HISTORY, LAYOUT_TIMESTAMPS, GazeSamples, layout_has_target, merge_gaze_history, split_gaze_history
+)
 
 class Patient(models.Model):
     """Modèle Patient"""
@@ -16,6 +23,18 @@ class Patient(models.Model):
         verbose_name_plural = 'Patients'
 
 
+class EyeTrackingTestQuerySet(models.QuerySet):
+    def without_raw_data(self):
+        """Ne charge ni raw_data ni les features de la prédiction ML
+
+        Aucun de ces champs n'est utilisé par les listes, le détail ou les
+        exports ; les données brutes sont servies par tests/{id}/raw/.
+        """
+        return self.defer('raw_data').select_related('ml_prediction').defer(
+            'ml_prediction__features'
+        )
+
+
 class EyeTrackingTest(models.Model):
     """Modèle Test de suivi oculaire"""
     EXCELLENT = 'excellent'
@@ -30,6 +49,18 @@ class EyeTrackingTest(models.Model):
         (POOR, 'Faible'),
     ]
 
+    ML_PENDING = 'pending'
+    ML_PROCESSING = 'processing'
+    ML_SCORED = 'scored'
+    ML_FAILED = 'failed'
+
+    ML_STATUS_CHOICES = [
+        (ML_PENDING, 'En attente'),
+        (ML_PROCESSING, 'En cours'),
+        (ML_SCORED, 'Analysé'),
+        (ML_FAILED, 'Échec'),
+    ]
+
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='tests')
     test_date = models.DateTimeField(auto_now_add=True)
     
@@ -60,18 +91,209 @@ class EyeTrackingTest(models.Model):
     clinical_evaluation = models.TextField()
     recommended_follow_up = models.BooleanField(default=False)
     
-    # Données brutes (JSON)
-    raw_data = models.JSONField(default=dict)
+    # Scoring ML asynchrone (voir ml.scoring)
+    ml_status = models.CharField(max_length=20, choices=ML_STATUS_CHOICES, default=ML_PENDING)
+    ml_claimed_at = models.DateTimeField(null=True, blank=True)
+    # Jeton du worker qui a réclamé le test : seul ce worker le score
+    ml_claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    ml_error = models.TextField(blank=True, default='')
+    
+    # Données brutes (JSON chiffré au repos, déchiffré à la lecture de l'attribut),
+    # sans l'historique du regard stocké dans GazeRecording. Le ciphertext est
+    # lié à la ligne par uuid : copié dans un autre test, il ne se déchiffre pas.
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    raw_data = EncryptedJSONField(default=dict, bind_to='uuid')
     
     created_at = models.DateTimeField(auto_now_add=True)
+    # Dernière modification (clé de cache des rapports PDF, voir api.reports)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = EyeTrackingTestQuerySet.as_manager()
 
     def __str__(self):
         return f"Test {self.id} - {self.patient} - {self.test_date}"
 
+    @cached_property
+    def gaze_samples(self) -> GazeSamples:
+        """Historique du regard décodé en colonnes NumPy, chargé à la demande"""
+        try:
+            return self.gaze_recording.samples()
+        except GazeRecording.DoesNotExist:
+            # Test non enregistré : l'historique est encore dans raw_data
+            _, gaze_history, layout = split_gaze_history(self.raw_data)
+            return GazeSamples.from_history(gaze_history, has_target=layout_has_target(layout))
+
+    def full_raw_data(self) -> dict:
+        """raw_data tel qu'envoyé par le frontend, historique du regard compris"""
+        try:
+            recording = self.gaze_recording
+        except GazeRecording.DoesNotExist:
+            return dict(self.raw_data)
+        return merge_gaze_history(self.raw_data, self.gaze_samples, recording.layout)
+
     class Meta:
         verbose_name = 'Test de suivi oculaire'
         verbose_name_plural = 'Tests de suivi oculaire'
         ordering = ['-test_date']
+        # Motifs d'accès vérifiés par EXPLAIN (api.tests.IndexUsageTest)
+        indexes = [
+            # Tests d'un patient du plus récent au plus ancien, dans l'ordre exact de la
+            # pagination par curseur (listes, résultats, résumé) : aucun tri en mémoire
+            models.Index(fields=['patient', '-created_at', '-id'], name='test_patient_created_idx'),
+            # Statistiques d'un patient par résultat
+            models.Index(fields=['patient', 'result'], name='test_patient_result_idx'),
+            # Statistiques globales et données d'entraînement par résultat
+            models.Index(fields=['result', 'created_at'], name='test_result_created_idx'),
+            # File du scoring ML (ml.scoring) : index partiels limités aux quelques tests
+            # en attente ou réclamés. SQLite n'utilise un index partiel que si la requête
+            # reprend sa condition à l'identique : une condition par statut.
+            models.Index(
+                fields=['created_at'],
+                name='test_ml_pending_idx',
+                condition=models.Q(ml_status='pending'),
+            ),
+            models.Index(
+                fields=['ml_claimed_at'],
+                name='test_ml_processing_idx',
+                condition=models.Q(ml_status='processing'),
+            ),
+        ]
+
+
+class GazeRecording(models.Model):
+    """Historique du regard d'un test en colonnes binaires compressées
+
+    Format : ml.features.GazeSamples.pack (environ 29 octets par point avant
+    compression, contre plus de 100 en JSON).
+    """
+    test = models.OneToOneField(
+        EyeTrackingTest,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='gaze_recording'
+    )
+    LAYOUT_CHOICES = [
+        (LAYOUT_HISTORY, 'gazeHistory'),
+        (LAYOUT_TIMESTAMPS, 'Points horodatés'),
+    ]
+
+    layout = models.CharField(
+        max_length=20,
+        choices=LAYOUT_CHOICES,
+        default=LAYOUT_HISTORY,
+        help_text="Format d'origine dans raw_data, restitué par full_raw_data"
+    )
+    n_samples = models.IntegerField(default=0)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def samples(self) -> GazeSamples:
+        return GazeSamples.unpack(bytes(self.data), has_target=layout_has_target(self.layout))
+
+    @classmethod
+    def store(cls, test: EyeTrackingTest, gaze_history, layout: str = LAYOUT_HISTORY) -> 'GazeRecording':
+        """Enregistre l'historique du regard d'un test (liste de points JSON)"""
+        data = GazeSamples.from_history(gaze_history).pack()
+        recording, _ = cls.objects.update_or_create(
+            test=test,
+            defaults={'layout': layout, 'n_samples': len(gaze_history), 'data': data}
+        )
+        # Les features sont calculées sur les valeurs telles que stockées
+        test.gaze_samples = recording.samples()
+        return recording
+
+    @classmethod
+    def bulk_store(cls, items, batch_size: int = None) -> list:
+        """Enregistre les historiques de tests nouvellement créés en une insertion
+
+        Args:
+            items: (test, liste de points JSON, format d'origine) par test
+        """
+        recordings = []
+        for test, gaze_history, layout in items:
+            data = GazeSamples.from_history(gaze_history).pack()
+            recording = cls(test=test, layout=layout, n_samples=len(gaze_history), data=data)
+            recordings.append(recording)
+            test.gaze_samples = recording.samples()
+        return cls.objects.bulk_create(recordings, batch_size=batch_size)
+
+    class Meta:
+        verbose_name = 'Historique du regard'
+        verbose_name_plural = 'Historiques du regard'
+
+
+class TestStatistics(models.Model):
+    """Agrégats des tests tenus à jour de manière incrémentale (voir api.statistics)
+
+    Une ligne globale (clé « global ») et une ligne par patient : les
+    tableaux de bord les lisent sans parcourir la table des tests.
+    """
+    GLOBAL_KEY = 'global'
+
+    key = models.CharField(max_length=32, unique=True)
+    patient = models.OneToOneField(
+        Patient,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='statistics'
+    )
+
+    total_tests = models.IntegerField(default=0)
+    excellent_count = models.IntegerField(default=0)
+    good_count = models.IntegerField(default=0)
+    acceptable_count = models.IntegerField(default=0)
+    poor_count = models.IntegerField(default=0)
+
+    # Sommes : les moyennes sont calculées à la lecture
+    tracking_percentage_sum = models.FloatField(default=0)
+    gaze_stability_sum = models.FloatField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Statistiques {self.key} ({self.total_tests} tests)"
+
+    class Meta:
+        verbose_name = 'Statistiques des tests'
+        verbose_name_plural = 'Statistiques des tests'
+
+
+class PatientSummary(models.Model):
+    """Résumé longitudinal d'un patient, recalculé à chaque test (voir api.statistics)
+
+    Les moyennes et la tendance portent sur les SUMMARY_WINDOW derniers tests.
+    """
+    patient = models.OneToOneField(
+        Patient,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary'
+    )
+    tests_count = models.IntegerField(default=0)
+    last_test_date = models.DateTimeField(null=True, blank=True)
+    latest_result = models.CharField(
+        max_length=20, choices=EyeTrackingTest.RESULT_CHOICES, blank=True, default=''
+    )
+
+    # Fenêtre glissante des derniers tests
+    window_size = models.IntegerField(default=0, help_text="Nombre de tests de la fenêtre")
+    avg_tracking_percentage = models.FloatField(null=True, blank=True)
+    avg_gaze_stability = models.FloatField(null=True, blank=True)
+    avg_gaze_consistency = models.FloatField(null=True, blank=True)
+    tracking_trend = models.FloatField(
+        null=True, blank=True,
+        help_text="Pente du pourcentage de suivi (points par test, > 0 = amélioration)"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Résumé de {self.patient} ({self.tests_count} tests)"
+
+    class Meta:
+        verbose_name = 'Résumé patient'
+        verbose_name_plural = 'Résumés patients'
 
 
 class MLPrediction(models.Model):
@@ -94,3 +316,105 @@ class MLPrediction(models.Model):
     class Meta:
         verbose_name = 'Prédiction ML'
         verbose_name_plural = 'Prédictions ML'
+
+
+class ReportJob(models.Model):
+    """Génération d'un rapport PDF en arrière-plan (voir api.reports)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'En file'),
+        (RUNNING, 'En cours'),
+        (SUCCEEDED, 'Terminé'),
+        (FAILED, 'Échec'),
+    ]
+
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    KIND_PATIENT = 'patient'
+    KIND_TEST = 'test'
+
+    KIND_CHOICES = [
+        (KIND_PATIENT, 'Rapport patient'),
+        (KIND_TEST, 'Rapport de test'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='report_jobs')
+    test = models.ForeignKey(
+        EyeTrackingTest, on_delete=models.CASCADE, null=True, blank=True, related_name='report_jobs'
+    )
+    cache_key = models.CharField(
+        max_length=64, db_index=True,
+        help_text="Empreinte (patient, dernière modification des tests, version du modèle de rapport)"
+    )
+    filename = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    size = models.IntegerField(default=0, help_text="Taille du PDF en octets")
+    error = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Rapport {self.id} - {self.patient} - {self.status}"
+
+    class Meta:
+        verbose_name = 'Rapport PDF'
+        verbose_name_plural = 'Rapports PDF'
+        ordering = ['-created_at']
+        constraints = [
+            # Un seul job actif par rapport : deux requêtes simultanées ne
+            # lancent pas deux générations (voir api.reports.request_report)
+            models.UniqueConstraint(
+                fields=['cache_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_report_job',
+            ),
+        ]
+
+
+class BulkExportJob(models.Model):
+    """Export en masse des rapports patients dans une archive ZIP (voir api.bulk_export)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = ReportJob.STATUS_CHOICES
+
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    patient_ids = models.JSONField(
+        null=True, blank=True, help_text="Patients à exporter (tous si vide)"
+    )
+    processes = models.IntegerField(default=1, help_text="Processus de rendu")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+
+    # Progression
+    total = models.IntegerField(default=0, help_text="Rapports à exporter")
+    done = models.IntegerField(default=0, help_text="Rapports ajoutés à l'archive")
+    from_cache = models.IntegerField(default=0, help_text="Rapports repris du cache sans rendu")
+    pages = models.IntegerField(default=0, help_text="Pages rendues")
+    pages_per_second = models.FloatField(default=0.0)
+
+    size = models.BigIntegerField(default=0, help_text="Taille de l'archive en octets")
+    error = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Export {self.id} - {self.done}/{self.total} - {self.status}"
+
+    class Meta:
+        verbose_name = 'Export de rapports'
+        verbose_name_plural = 'Exports de rapports'
+        ordering = ['-created_at']
@@ -0,0 +1,13 @@
+"""
+Pagination par curseur des tests
+
+Pagination par clé (keyset) sur (created_at, id) : chaque page est lue par
+une requête indexée, quelle que soit sa position, sans COUNT(*) ni OFFSET.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class TestCursorPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
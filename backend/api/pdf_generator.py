@@ -1,8 +1,21 @@
 """
 Générateur de rapports PDF pour les résultats de suivi oculaire
+
+Styles de paragraphes et de tableaux construits une seule fois par
+processus (report_templates) puis réutilisés par chaque rapport. Le module
+ne dépend que de ReportLab : les workers d'export en masse (api.bulk_export)
+l'utilisent sans charger Django.
+
+L'historique des tests est découpé en tableaux de TEST_TABLE_ROWS lignes :
+ReportLab recalcule un tableau entier à chaque coupure de page, ce qui rend
+un tableau unique de plusieurs milliers de lignes très lent. Les PDF sont
+construits dans un fichier temporaire (en mémoire jusqu'à
+REPORT_SPOOL_MAX_SIZE octets, puis sur disque).
 """
 
-from io import BytesIO
+import tempfile
+from collections import namedtuple
+from functools import lru_cache
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
@@ -11,20 +24,107 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
 
+# Lignes de l'historique par tableau (un peu plus d'une page A4)
+TEST_TABLE_ROWS = 40
+# Taille au-delà de laquelle le PDF en construction est écrit sur disque
+REPORT_SPOOL_MAX_SIZE = 1024 * 1024
+# Champs d'un test lus par le rapport patient
+PATIENT_REPORT_TEST_FIELDS = ('created_at', 'duration', 'gaze_stability', 'result', 'clinical_evaluation')
+# Test réduit à ces champs, transmis aux workers d'export en masse
+ReportTest = namedtuple('ReportTest', PATIENT_REPORT_TEST_FIELDS)
 
-def generate_patient_report_pdf(patient, tests):
-    """
-    Génère un rapport PDF avec tous les résultats du patient
-    
-    Args:
-        patient: Objet Patient
-        tests: QuerySet d'EyeTrackingTest
-    
-    Returns:
-        BytesIO contenant le PDF
-    """
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
+
+@lru_cache(maxsize=None)
+def report_templates():
+    """Styles des rapports, construits au premier appel dans chaque processus"""
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#000091'),
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#000091'),
+            spaceAfter=12,
+            fontName='Helvetica-Bold'
+        ),
+        'normal': ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=11,
+            alignment=TA_LEFT,
+            spaceAfter=6
+        ),
+        'subtitle': ParagraphStyle(
+            'subtitle', parent=styles['Normal'], fontSize=10, textColor=colors.grey, alignment=TA_CENTER
+        ),
+        'footer': ParagraphStyle(
+            'footer', parent=styles['Normal'], fontSize=9, textColor=colors.grey, alignment=TA_CENTER
+        ),
+        'test_title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=20,
+            textColor=colors.HexColor('#000091'),
+            spaceAfter=20,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        'test_heading': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=12,
+            textColor=colors.HexColor('#000091'),
+            spaceAfter=10,
+            fontName='Helvetica-Bold'
+        ),
+        'body': ParagraphStyle('body', parent=styles['Normal'], fontSize=11),
+        'patient_table': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ]),
+        'tests_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#000091')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9f9f9')]),
+        ]),
+        'details_table': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('PADDING', (0, 0), (-1, -1), 8),
+        ]),
+    }
+
+
+def _spool():
+    return tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_SIZE)
+
+
+def _document(buffer):
+    return SimpleDocTemplate(
         buffer, 
         pagesize=A4,
         rightMargin=0.75*inch,
@@ -32,35 +132,50 @@ def generate_patient_report_pdf(patient, tests):
         topMargin=0.75*inch,
         bottomMargin=0.75*inch
     )
+
+
+def _test_tables(tests, rows_per_table):
+    """Tableaux successifs de l'historique, chacun avec sa ligne d'en-tête"""
+    templates = report_templates()
+    header = ['Date', 'Durée (s)', 'Stabilité', 'Résultat', 'Évaluation']
     
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#000091'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
+    def table(rows):
+        test_table = Table([header] + rows, colWidths=[1.5*inch, 1.2*inch, 1.3*inch, 1.0*inch, 1.5*inch], repeatRows=1)
+        test_table.setStyle(templates['tests_table'])
+        return test_table
     
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#000091'),
-        spaceAfter=12,
-        fontName='Helvetica-Bold'
-    )
+    rows = []
+    for test in tests:
+        rows.append([
+            test.created_at.strftime('%d/%m/%Y %H:%M'),
+            str(test.duration or 0),
+            f"{test.gaze_stability:.1f}%",
+            test.result.upper(),
+            test.clinical_evaluation or 'N/A'
+        ])
+        if len(rows) == rows_per_table:
+            yield table(rows)
+            rows = []
+    if rows:
+        yield table(rows)
+
+
+def render_patient_report(patient, tests, rows_per_table=TEST_TABLE_ROWS):
+    """
+    Construit le rapport d'un patient
     
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        alignment=TA_LEFT,
-        spaceAfter=6
-    )
+    Args:
+        patient: Objet Patient
+        tests: itérable d'EyeTrackingTest (PATIENT_REPORT_TEST_FIELDS suffisent),
+            parcouru une seule fois
+        rows_per_table: lignes par tableau de l'historique
+    
+    Returns:
+        (fichier temporaire contenant le PDF, positionné au début ; nombre de pages)
+    """
+    templates = report_templates()
+    buffer = _spool()
+    doc = _document(buffer)
     
     # Contenu
     elements = []
@@ -68,16 +183,16 @@ def generate_patient_report_pdf(patient, tests):
     # Header gouvernemental
     elements.append(Paragraph(
         "Rapport de Suivi Oculaire Clinique",
-        title_style
+        templates['title']
     ))
     elements.append(Paragraph(
         "Service Public Français - Système de Design de l'État",
-        ParagraphStyle('subtitle', parent=styles['Normal'], fontSize=10, textColor=colors.grey, alignment=TA_CENTER)
+        templates['subtitle']
     ))
     elements.append(Spacer(1, 0.3*inch))
     
     # Informations du patient
-    elements.append(Paragraph("INFORMATIONS DU PATIENT", heading_style))
+    elements.append(Paragraph("INFORMATIONS DU PATIENT", templates['heading']))
     patient_data = [
         ['Nom et Prénom:', f"{patient.user.first_name} {patient.user.last_name}"],
         ['Email:', patient.user.email],
@@ -86,53 +201,20 @@ def generate_patient_report_pdf(patient, tests):
     ]
     
     patient_table = Table(patient_data, colWidths=[2*inch, 3*inch])
-    patient_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-    ]))
+    patient_table.setStyle(templates['patient_table'])
     elements.append(patient_table)
     elements.append(Spacer(1, 0.3*inch))
     
     # Résumé des tests
-    elements.append(Paragraph("HISTORIQUE DES TESTS", heading_style))
-    
-    if tests:
-        test_data = [['Date', 'Durée (s)', 'Stabilité', 'Résultat', 'Évaluation']]
-        
-        for test in tests:
-            test_data.append([
-                test.created_at.strftime('%d/%m/%Y %H:%M'),
-                str(test.duration_seconds or 0),
-                f"{test.gaze_stability:.1f}%",
-                test.result.upper(),
-                test.clinical_evaluation or 'N/A'
-            ])
-        
-        # Créer le tableau des tests
-        test_table = Table(test_data, colWidths=[1.5*inch, 1.2*inch, 1.3*inch, 1.0*inch, 1.5*inch])
-        test_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#000091')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9f9f9')]),
-        ]))
-        elements.append(test_table)
+    elements.append(Paragraph("HISTORIQUE DES TESTS", templates['heading']))
+    
+    test_tables = list(_test_tables(tests, rows_per_table))
+    if test_tables:
+        elements.extend(test_tables)
     else:
         elements.append(Paragraph(
             "Aucun test enregistré pour ce patient.",
-            normal_style
+            templates['normal']
         ))
     
     elements.append(Spacer(1, 0.3*inch))
@@ -142,13 +224,34 @@ def generate_patient_report_pdf(patient, tests):
     elements.append(Paragraph(
         "<i>Ce rapport a été généré automatiquement par le système de suivi oculaire clinique. "
         "Pour toute question, veuillez contacter le service compétent.</i>",
-        ParagraphStyle('footer', parent=styles['Normal'], fontSize=9, textColor=colors.grey, alignment=TA_CENTER)
+        templates['footer']
     ))
     
     # Build PDF
     doc.build(elements)
     buffer.seek(0)
-    return buffer
+    return buffer, doc.page
+
+
+def render_report_task(patient, tests):
+    """Tâche d'un worker d'export en masse : (octets du PDF, nombre de pages)"""
+    pdf, pages = render_patient_report(patient, tests)
+    with pdf:
+        return pdf.read(), pages
+
+
+def generate_patient_report_pdf(patient, tests):
+    """
+    Génère un rapport PDF avec tous les résultats du patient
+    
+    Args:
+        patient: Objet Patient
+        tests: itérable d'EyeTrackingTest
+    
+    Returns:
+        Fichier temporaire contenant le PDF
+    """
+    return render_patient_report(patient, tests)[0]
 
 
 def generate_test_report_pdf(patient, test):
@@ -160,65 +263,33 @@ def generate_test_report_pdf(patient, test):
         test: Objet EyeTrackingTest
     
     Returns:
-        BytesIO contenant le PDF
+        Fichier temporaire contenant le PDF
     """
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer, 
-        pagesize=A4,
-        rightMargin=0.75*inch,
-        leftMargin=0.75*inch,
-        topMargin=0.75*inch,
-        bottomMargin=0.75*inch
-    )
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.HexColor('#000091'),
-        spaceAfter=20,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=12,
-        textColor=colors.HexColor('#000091'),
-        spaceAfter=10,
-        fontName='Helvetica-Bold'
-    )
+    templates = report_templates()
+    buffer = _spool()
+    doc = _document(buffer)
     
     elements = []
     
     # Header
-    elements.append(Paragraph("RÉSULTAT DÉTAILLÉ DU TEST", title_style))
+    elements.append(Paragraph("RÉSULTAT DÉTAILLÉ DU TEST", templates['test_title']))
     elements.append(Spacer(1, 0.2*inch))
     
     # Info patient et test
     info_data = [
         ['Patient:', f"{patient.user.first_name} {patient.user.last_name}"],
         ['Date du test:', test.created_at.strftime('%d/%m/%Y à %H:%M:%S')],
-        ['Durée:', f"{test.duration_seconds} secondes" if test.duration_seconds else 'N/A'],
+        ['Durée:', f"{test.duration} secondes" if test.duration else 'N/A'],
         ['Résultat:', test.result.upper()],
     ]
     
     info_table = Table(info_data, colWidths=[1.5*inch, 3.5*inch])
-    info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('PADDING', (0, 0), (-1, -1), 8),
-    ]))
+    info_table.setStyle(templates['details_table'])
     elements.append(info_table)
     elements.append(Spacer(1, 0.2*inch))
     
     # Métriques
-    elements.append(Paragraph("MÉTRIQUES DE SUIVI", heading_style))
+    elements.append(Paragraph("MÉTRIQUES DE SUIVI", templates['test_heading']))
     metrics_data = [
         ['Stabilité du regard:', f"{test.gaze_stability}%"],
         ['Cohérence du regard:', f"{test.gaze_consistency}%"],
@@ -228,21 +299,15 @@ def generate_test_report_pdf(patient, test):
     ]
     
     metrics_table = Table(metrics_data, colWidths=[2.5*inch, 2.5*inch])
-    metrics_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('PADDING', (0, 0), (-1, -1), 8),
-    ]))
+    metrics_table.setStyle(templates['details_table'])
     elements.append(metrics_table)
     elements.append(Spacer(1, 0.2*inch))
     
     # Évaluation clinique
-    elements.append(Paragraph("ÉVALUATION CLINIQUE", heading_style))
+    elements.append(Paragraph("ÉVALUATION CLINIQUE", templates['test_heading']))
     elements.append(Paragraph(
         test.clinical_evaluation or "Évaluation en attente",
-        ParagraphStyle('body', parent=styles['Normal'], fontSize=11)
+        templates['body']
     ))
     
     # Build PDF
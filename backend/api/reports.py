@@ -0,0 +1,257 @@
+"""
+Rapports PDF générés en arrière-plan, avec cache des fichiers
+
+Un rapport (patient ou test) est construit par un thread d'arrière-plan
+(ReportJob) plutôt que dans la requête, puis écrit dans REPORTS_LOCATION
+sous une clé dérivée de :
+- le patient (et le test pour un rapport de test) ;
+- la dernière modification de son dossier (Patient.updated_at) et les
+  champs affichés de son compte (nom, prénom, email) ;
+- la dernière modification de ses tests (Max de EyeTrackingTest.updated_at,
+  mis à jour à chaque modification ou re-scoring) et leur nombre (test
+  supprimé) ;
+- REPORT_TEMPLATE_VERSION.
+
+Tant qu'aucune de ces valeurs ne change, le PDF est resservi tel quel.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, close_old_connections, connection, transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import EyeTrackingTest, Patient, ReportJob
+from .pdf_generator import PATIENT_REPORT_TEST_FIELDS, generate_patient_report_pdf, generate_test_report_pdf
+
+logger = logging.getLogger(__name__)
+
+# À incrémenter à chaque modification de api/pdf_generator.py : les PDF en
+# cache ne sont alors plus resservis
+# v2 : durée du test (champ duration) corrigée
+# v3 : historique découpé en tableaux de TEST_TABLE_ROWS lignes
+REPORT_TEMPLATE_VERSION = 3
+
+# Intervalle (secondes) d'interrogation d'un job attendu par une requête
+REPORT_POLL_INTERVAL = 0.2
+# Tentatives de création d'un job (conflit ou base verrouillée)
+REPORT_REQUEST_ATTEMPTS = 3
+# Tests lus par requête pour un rapport patient
+REPORT_TESTS_CHUNK_SIZE = 2000
+
+
+# Valeurs lues sur le patient pour la clé de cache (annotées par with_report_markers)
+REPORT_KEY_FIELDS = (
+    'updated_at', 'user__username', 'user__first_name', 'user__last_name', 'user__email',
+    'tests_updated_at', 'tests_count',
+)
+
+
+def with_report_markers(patients):
+    """Annote les patients de la dernière modification et du nombre de leurs tests"""
+    return patients.annotate(tests_updated_at=Max('tests__updated_at'), tests_count=Count('tests'))
+
+
+def _key(patient_id, test_id, row) -> str:
+    parts = [patient_id, test_id or 'all']
+    for field in REPORT_KEY_FIELDS:
+        value = row[field]
+        parts.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    parts.append(REPORT_TEMPLATE_VERSION)
+    return hashlib.sha256(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def report_key(patient_id, test_id=None) -> str:
+    """Clé de cache du rapport d'un patient (ou d'un de ses tests)"""
+    row = with_report_markers(Patient.objects.filter(pk=patient_id)).values(*REPORT_KEY_FIELDS).get()
+    return _key(patient_id, test_id, row)
+
+
+def patient_report_key(row) -> str:
+    """Clé du rapport patient à partir d'une ligne déjà lue (export en masse)
+
+    Args:
+        row: valeurs du patient, REPORT_KEY_FIELDS et 'id' compris
+    """
+    return _key(row['id'], None, row)
+
+
+def report_path(patient_id, test_id, key: str) -> Path:
+    """Emplacement du PDF en cache : <REPORTS_LOCATION>/<patient>/<test|all>-<clé>.pdf"""
+    return Path(settings.REPORTS_LOCATION) / str(patient_id) / f"{test_id or 'all'}-{key}.pdf"
+
+
+def job_path(job: ReportJob) -> Path:
+    return report_path(job.patient_id, job.test_id, job.cache_key)
+
+
+def report_filename(patient: Patient, test: EyeTrackingTest = None) -> str:
+    """Nom du fichier proposé au téléchargement"""
+    if test is not None:
+        return f'Test_{test.id}_{test.created_at.strftime("%d%m%Y")}.pdf'
+    return f'Resultats_{patient.user.username}_{patient.id}.pdf'
+
+
+def cached_report(patient_id, test_id=None):
+    """(clé, chemin du PDF s'il est déjà en cache sinon None)"""
+    key = report_key(patient_id, test_id)
+    path = report_path(patient_id, test_id, key)
+    return key, (path if path.exists() else None)
+
+
+def build_report(patient: Patient, test: EyeTrackingTest = None):
+    """Construit le PDF (fichier temporaire) sans lire raw_data ni l'historique du regard
+
+    Les tests d'un rapport patient sont lus par lots, seulement les champs
+    affichés : un long historique n'est jamais entièrement chargé en modèles.
+    """
+    if test is not None:
+        return generate_test_report_pdf(patient, test)
+    tests = EyeTrackingTest.objects.filter(patient=patient).order_by('-created_at', '-id').only(
+        *PATIENT_REPORT_TEST_FIELDS
+    )
+    return generate_patient_report_pdf(patient, tests.iterator(chunk_size=REPORT_TESTS_CHUNK_SIZE))
+
+
+def store_report(path: Path, pdf):
+    """Copie le PDF (fichier ouvert) de manière atomique puis supprime les versions périmées du même rapport"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(pdf, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    prefix = path.name.split('-', 1)[0]
+    for stale in path.parent.glob(f'{prefix}-*.pdf'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+
+def run_report_job(job_id: int) -> ReportJob:
+    """Construit le rapport d'un job et l'écrit dans le cache"""
+    job = ReportJob.objects.select_related('patient__user', 'test').get(pk=job_id)
+    job.status = ReportJob.RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    try:
+        path = job_path(job)
+        if not path.exists():
+            test = None
+            if job.test_id is not None:
+                test = EyeTrackingTest.objects.without_raw_data().get(pk=job.test_id)
+            with build_report(job.patient, test) as pdf:
+                store_report(path, pdf)
+        job.size = path.stat().st_size
+        job.status = ReportJob.SUCCEEDED
+    except Exception as e:
+        logger.exception("Échec de la génération du rapport %s", job.pk)
+        job.status = ReportJob.FAILED
+        job.error = str(e)[:1000]
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'size', 'error', 'finished_at'])
+    return job
+
+
+def start_report_job(job: ReportJob) -> threading.Thread:
+    """Lance le job dans un thread d'arrière-plan"""
+    def target():
+        try:
+            run_report_job(job.pk)
+        finally:
+            close_old_connections()
+
+    thread = threading.Thread(target=target, name=f'report-{job.pk}', daemon=True)
+    thread.start()
+    return thread
+
+
+def expire_stale_jobs(timeout: float = None) -> int:
+    """Marque en échec les jobs restés en file ou en cours au-delà de REPORTS_JOB_TIMEOUT
+
+    Un job dont le thread a disparu (redémarrage du processus) resterait
+    sinon actif et serait réutilisé indéfiniment par request_report.
+    """
+    if timeout is None:
+        timeout = settings.REPORTS_JOB_TIMEOUT
+    deadline = timezone.now() - timedelta(seconds=timeout)
+    stale = ReportJob.objects.filter(status__in=ReportJob.ACTIVE_STATUSES).filter(
+        Q(started_at__lt=deadline) | Q(started_at__isnull=True, created_at__lt=deadline)
+    )
+    # Lecture d'abord : pas de verrou d'écriture SQLite quand rien n'a expiré
+    if not stale.exists():
+        return 0
+    return stale.update(
+        status=ReportJob.FAILED,
+        error="Délai dépassé : génération interrompue",
+        finished_at=timezone.now(),
+    )
+
+
+def _active_job(key: str) -> Optional[ReportJob]:
+    return ReportJob.objects.filter(cache_key=key, status__in=ReportJob.ACTIVE_STATUSES).first()
+
+
+def request_report(patient: Patient, test: EyeTrackingTest = None, user=None, key: str = None) -> ReportJob:
+    """Retourne le job du rapport, en réutilisant un job en cours pour la même clé
+
+    Pas de transaction lecture puis écriture : le job est créé directement,
+    la contrainte unique_active_report_job départageant deux requêtes
+    simultanées. Sous SQLite, une écriture concurrente (file de scoring) peut
+    dépasser busy_timeout : la création est alors retentée.
+    """
+    test_id = test.id if test is not None else None
+    key = key or report_key(patient.id, test_id)
+    for attempt in range(REPORT_REQUEST_ATTEMPTS):
+        try:
+            expire_stale_jobs()
+            job = _active_job(key)
+            if job is not None:
+                return job
+            with transaction.atomic():
+                job = ReportJob.objects.create(
+                    kind=ReportJob.KIND_TEST if test is not None else ReportJob.KIND_PATIENT,
+                    patient=patient,
+                    test=test,
+                    cache_key=key,
+                    filename=report_filename(patient, test),
+                    created_by=user if user is not None and user.is_authenticated else None,
+                )
+                transaction.on_commit(lambda: start_report_job(job))
+            return job
+        except IntegrityError:
+            # Job créé en parallèle pour la même clé : il est repris au tour suivant
+            continue
+        except OperationalError:
+            # « database is locked » (SQLite) ; une autre base ou une
+            # transaction englobante ne peut pas être retentée ici
+            if connection.vendor != 'sqlite' or connection.in_atomic_block \
+                    or attempt == REPORT_REQUEST_ATTEMPTS - 1:
+                raise
+            time.sleep(REPORT_POLL_INTERVAL * (attempt + 1))
+    job = _active_job(key)
+    if job is None:
+        raise RuntimeError(f"Impossible de créer le job du rapport {key}")
+    return job
+
+
+def wait_for_report(job: ReportJob, wait: float) -> ReportJob:
+    """Attend au plus `wait` secondes la fin d'un job"""
+    deadline = time.monotonic() + wait
+    while job.status in ReportJob.ACTIVE_STATUSES and time.monotonic() < deadline:
+        time.sleep(REPORT_POLL_INTERVAL)
+        job.refresh_from_db(fields=['status', 'size', 'error', 'started_at', 'finished_at'])
+    return job
@@ -0,0 +1,159 @@
+"""
+Cache des réponses des endpoints de lecture patient
+
+patients/me/, patients/results/, tests/statistics/ et le détail d'un test
+sont mis en cache (Redis en production, voir CACHES) par utilisateur.
+
+Invalidation par version : chaque clé contient la version de son périmètre
+(un patient, ou « global » pour les statistiques d'un admin). Les signaux de
+api.signals incrémentent ces versions à la validation de toute écriture sur
+un test, un patient ou son utilisateur ; les anciennes entrées ne sont plus
+jamais lues et expirent d'elles-mêmes (API_CACHE_TIMEOUT).
+
+La version sert aussi d'ETag : un client qui renvoie If-None-Match reçoit un
+304 sans lecture du cache ni de la base. Les compteurs hit / miss / 304 par
+endpoint sont exposés par GET /api/cache/stats/ (admin).
+"""
+import hashlib
+import time
+from typing import Callable, Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Patient
+
+GLOBAL_SCOPE = 'global'
+
+# Endpoints mis en cache (libellés des compteurs)
+ENDPOINTS = ('patients/me', 'patients/results', 'tests/statistics', 'tests/detail')
+
+HIT = 'hits'
+MISS = 'misses'
+NOT_MODIFIED = 'not_modified'
+COUNTERS = (HIT, MISS, NOT_MODIFIED)
+
+
+def patient_scope(patient_id) -> str:
+    return f'patient:{patient_id}'
+
+
+def _version_key(scope: str) -> str:
+    return f'api:version:{scope}'
+
+
+def _counter_key(endpoint: str, counter: str) -> str:
+    return f'api:cache-stats:{endpoint}:{counter}'
+
+
+def _incr(key: str, initial):
+    """Incrémente une clé sans expiration, créée à `initial` si absente ou évincée"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, initial, timeout=None)
+        return cache.incr(key)
+
+
+def versions(scopes: List[str]) -> List[int]:
+    """Versions courantes des périmètres (lues en une requête au cache)"""
+    keys = [_version_key(scope) for scope in scopes]
+    current = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in current}
+    if missing:
+        # Valeur initiale horodatée : une version évincée ne retombe jamais
+        # sur un numéro déjà utilisé par des entrées encore en cache
+        for key, version in missing.items():
+            cache.add(key, version, timeout=None)
+        current.update(cache.get_many(list(missing)))
+    return [current[key] for key in keys]
+
+
+def invalidate(scopes: Iterable[str]):
+    """Rend obsolètes les réponses des périmètres, une fois la transaction validée"""
+    scopes = set(scopes)
+
+    def bump():
+        for scope in scopes:
+            _incr(_version_key(scope), time.time_ns())
+
+    transaction.on_commit(bump)
+
+
+def invalidate_patients(patient_ids: Iterable):
+    """Écriture sur les tests de ces patients : leurs réponses et les statistiques globales"""
+    invalidate([GLOBAL_SCOPE, *(patient_scope(patient_id) for patient_id in patient_ids)])
+
+
+def _user_patient_key(user_id) -> str:
+    return f'api:user-patient:{user_id}'
+
+
+def user_patient_id(user):
+    """Identifiant du patient de l'utilisateur (mis en cache, oublié à chaque écriture sur le patient)"""
+    key = _user_patient_key(user.pk)
+    patient_id = cache.get(key)
+    if patient_id is None:
+        patient_id = Patient.objects.filter(user=user).values_list('id', flat=True).first()
+        if patient_id is not None:
+            cache.set(key, patient_id, timeout=settings.API_CACHE_TIMEOUT)
+    return patient_id
+
+
+def forget_user_patient(user_ids: Iterable):
+    """Patient créé, supprimé ou rattaché à un autre utilisateur, une fois la transaction validée"""
+    keys = [_user_patient_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _count(endpoint: str, counter: str):
+    _incr(_counter_key(endpoint, counter), 0)
+
+
+def counters() -> Dict[str, Dict[str, float]]:
+    """Compteurs et taux de succès par endpoint"""
+    values = cache.get_many([_counter_key(e, c) for e in ENDPOINTS for c in COUNTERS])
+    stats = {}
+    for endpoint in ENDPOINTS:
+        counts = {counter: values.get(_counter_key(endpoint, counter), 0) for counter in COUNTERS}
+        total = sum(counts.values())
+        counts['hit_ratio'] = round((counts[HIT] + counts[NOT_MODIFIED]) / total, 4) if total else 0.0
+        stats[endpoint] = counts
+    return stats
+
+
+def cached_response(request, endpoint: str, scopes: List[str], build: Callable[[], Response]) -> Response:
+    """Réponse de `build` servie depuis le cache de l'utilisateur, ou 304 si inchangée
+
+    Seules les réponses 200 sont mises en cache.
+    """
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    version = '.'.join(str(v) for v in versions(scopes))
+    key = f'api:response:{endpoint}:{request.user.pk}:{version}:{path_hash}'
+    etag = '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        _count(endpoint, NOT_MODIFIED)
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        data = cache.get(key)
+        if data is not None:
+            _count(endpoint, HIT)
+            response = Response(data)
+        else:
+            _count(endpoint, MISS)
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, timeout=settings.API_CACHE_TIMEOUT)
+
+    response['ETag'] = etag
+    # Le navigateur revalide à chaque fois ; les proxys ne partagent pas la réponse
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Patient, EyeTrackingTest, MLPrediction
+from django.urls import reverse
+from .models import Patient, PatientSummary, EyeTrackingTest, MLPrediction, ReportJob, BulkExportJob
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,17 +10,33 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class PatientSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PatientSummary
+        fields = [
+            'tests_count', 'last_test_date', 'latest_result', 'window_size',
+            'avg_tracking_percentage', 'avg_gaze_stability', 'avg_gaze_consistency',
+            'tracking_trend', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
 class PatientSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     tests_count = serializers.SerializerMethodField()
+    summary = PatientSummarySerializer(read_only=True)
 
     class Meta:
         model = Patient
-        fields = ['id', 'user', 'age', 'tests_count', 'created_at', 'updated_at']
+        fields = ['id', 'user', 'age', 'tests_count', 'summary', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_tests_count(self, obj):
-        return obj.tests.count()
+        # Lu dans le résumé matérialisé plutôt que compté à chaque requête
+        try:
+            return obj.summary.tests_count
+        except PatientSummary.DoesNotExist:
+            return 0
 
 
 class MLPredictionSerializer(serializers.ModelSerializer):
@@ -55,10 +72,11 @@ class EyeTrackingTestSerializer(serializers.ModelSerializer):
             'result',
             'clinical_evaluation',
             'recommended_follow_up',
+            'ml_status',
             'ml_prediction',
             'created_at'
         ]
-        read_only_fields = ['id', 'test_date', 'created_at', 'result', 'clinical_evaluation', 'recommended_follow_up', 'ml_prediction']
+        read_only_fields = ['id', 'test_date', 'created_at', 'result', 'clinical_evaluation', 'recommended_follow_up', 'ml_status', 'ml_prediction']
 
     def get_patient_name(self, obj):
         """Retourne le nom complet du patient"""
@@ -73,10 +91,13 @@ class EyeTrackingTestSerializer(serializers.ModelSerializer):
 class EyeTrackingTestCreateSerializer(serializers.ModelSerializer):
     """Serializer pour la création de tests avec les données brutes"""
     patient_id = serializers.IntegerField(required=False, write_only=True)
+    # Champ chiffré au repos (binaire) : exposé en JSON
+    raw_data = serializers.JSONField(required=False)
     
     class Meta:
         model = EyeTrackingTest
         fields = [
+            'id',
             'patient_id',
             'duration',
             'gaze_time',
@@ -87,5 +108,79 @@ class EyeTrackingTestCreateSerializer(serializers.ModelSerializer):
             'min_fixation_duration',
             'gaze_stability',
             'gaze_consistency',
-            'raw_data'
+            'raw_data',
+            'ml_status'
         ]
+        read_only_fields = ['id', 'ml_status']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # L'historique du regard est stocké à part (GazeRecording) mais renvoyé
+        # dans raw_data comme à l'envoi
+        data['raw_data'] = instance.full_raw_data()
+        return data
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id',
+            'kind',
+            'patient',
+            'test',
+            'status',
+            'filename',
+            'size',
+            'error',
+            'download_url',
+            'created_at',
+            'started_at',
+            'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != ReportJob.SUCCEEDED:
+            return None
+        return reverse('report-download', kwargs={'pk': obj.pk})
+
+
+class BulkExportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BulkExportJob
+        fields = [
+            'id',
+            'patient_ids',
+            'processes',
+            'status',
+            'total',
+            'done',
+            'from_cache',
+            'progress',
+            'pages',
+            'pages_per_second',
+            'size',
+            'error',
+            'download_url',
+            'created_at',
+            'started_at',
+            'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        """Pourcentage de rapports ajoutés à l'archive"""
+        if obj.status == BulkExportJob.SUCCEEDED:
+            return 100.0
+        return round(100 * obj.done / obj.total, 1) if obj.total else 0.0
+
+    def get_download_url(self, obj):
+        if obj.status != BulkExportJob.SUCCEEDED:
+            return None
+        return reverse('report-export-download', kwargs={'pk': obj.pk})
@@ -0,0 +1,67 @@
+"""
+Signaux de l'application api : maintien incrémental de TestStatistics et
+de PatientSummary, invalidation du cache des réponses
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import response_cache, statistics
+from .models import EyeTrackingTest, Patient
+
+
+@receiver(post_init, sender=EyeTrackingTest)
+def remember_statistics_fields(sender, instance, **kwargs):
+    """Conserve les valeurs chargées pour calculer le delta à l'enregistrement"""
+    instance._statistics_snapshot = statistics.snapshot(instance)
+
+
+@receiver(post_save, sender=EyeTrackingTest)
+def update_statistics_on_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance._statistics_snapshot
+    statistics.test_saved(instance, created, previous, update_fields)
+
+    current = statistics.snapshot(instance)
+    if statistics.summary_changed(created, previous, current, update_fields):
+        statistics.refresh_patient_summary(instance.patient_id)
+        if previous is not None and previous['patient_id'] != instance.patient_id:
+            statistics.refresh_patient_summary(previous['patient_id'])
+    instance._statistics_snapshot = current
+
+    patient_ids = {instance.patient_id}
+    if previous is not None:
+        patient_ids.add(previous['patient_id'])
+    response_cache.invalidate_patients(patient_ids)
+
+
+@receiver(post_delete, sender=EyeTrackingTest)
+def update_statistics_on_delete(sender, instance, **kwargs):
+    statistics.test_deleted(instance, instance._statistics_snapshot)
+    statistics.refresh_patient_summary(instance.patient_id)
+    response_cache.invalidate_patients([instance.patient_id])
+
+
+@receiver(post_init, sender=Patient)
+def remember_patient_user(sender, instance, **kwargs):
+    # __dict__ : un champ différé (only/defer) ne déclenche pas de requête
+    instance._loaded_user_id = instance.__dict__.get('user_id')
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+def invalidate_patient_responses(sender, instance, **kwargs):
+    response_cache.invalidate([response_cache.patient_scope(instance.pk)])
+    # Correspondance utilisateur → patient de l'ancien et du nouvel utilisateur
+    response_cache.forget_user_patient([instance.user_id, instance._loaded_user_id])
+    instance._loaded_user_id = instance.user_id
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_responses(sender, instance, created=False, **kwargs):
+    """Nom et e-mail de l'utilisateur sont renvoyés avec son dossier patient"""
+    if created:
+        return
+    patient_ids = Patient.objects.filter(user=instance).values_list('id', flat=True)
+    response_cache.invalidate(response_cache.patient_scope(patient_id) for patient_id in patient_ids)
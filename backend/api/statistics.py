@@ -0,0 +1,256 @@
+"""
+Statistiques des tests de suivi oculaire
+
+Les agrégats (nombre de tests par résultat, moyennes) sont calculés en une
+seule requête par agrégation conditionnelle, puis conservés dans
+TestStatistics : une ligne globale et une ligne par patient. Les signaux de
+api.signals les mettent à jour de manière incrémentale (expressions F) à
+chaque création, re-scoring ou suppression de test ; une ligne absente est
+recalculée à la lecture suivante.
+
+Le résumé longitudinal de chaque patient (PatientSummary : moyennes
+glissantes, tendance, dernier résultat) est recalculé au même moment à
+partir des SUMMARY_WINDOW derniers tests.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import EyeTrackingTest, Patient, PatientSummary, TestStatistics
+
+# Champs de EyeTrackingTest dont dépendent les statistiques et le résumé patient
+TRACKED_FIELDS = (
+    'patient_id', 'result', 'tracking_percentage', 'gaze_stability', 'gaze_consistency',
+)
+
+# Nombre de derniers tests pris en compte par les moyennes glissantes du résumé
+SUMMARY_WINDOW = 10
+
+# Colonnes lues pour chaque test de la fenêtre, du plus récent au plus ancien
+SUMMARY_FIELDS = ('test_date', 'result', 'tracking_percentage', 'gaze_stability', 'gaze_consistency')
+
+RESULT_COUNT_FIELDS = {
+    EyeTrackingTest.EXCELLENT: 'excellent_count',
+    EyeTrackingTest.GOOD: 'good_count',
+    EyeTrackingTest.ACCEPTABLE: 'acceptable_count',
+    EyeTrackingTest.POOR: 'poor_count',
+}
+
+
+def patient_key(patient_id) -> str:
+    return f'patient:{patient_id}'
+
+
+def aggregate_statistics(tests) -> Dict[str, Any]:
+    """Calcule tous les agrégats d'un QuerySet de tests en une seule requête"""
+    aggregates = {
+        'total_tests': Count('id'),
+        'tracking_percentage_sum': Sum('tracking_percentage'),
+        'gaze_stability_sum': Sum('gaze_stability'),
+    }
+    for result, field in RESULT_COUNT_FIELDS.items():
+        aggregates[field] = Count('id', filter=Q(result=result))
+    values = tests.order_by().aggregate(**aggregates)
+    values['tracking_percentage_sum'] = values['tracking_percentage_sum'] or 0
+    values['gaze_stability_sum'] = values['gaze_stability_sum'] or 0
+    return values
+
+
+def rebuild_statistics(patient_id=None) -> TestStatistics:
+    """Recalcule entièrement une ligne (globale si patient_id est None)"""
+    tests = EyeTrackingTest.objects.all()
+    key = TestStatistics.GLOBAL_KEY
+    if patient_id is not None:
+        tests = tests.filter(patient_id=patient_id)
+        key = patient_key(patient_id)
+    values = aggregate_statistics(tests)
+    try:
+        with transaction.atomic():
+            stats, _ = TestStatistics.objects.update_or_create(
+                key=key, defaults={'patient_id': patient_id, **values}
+            )
+    except IntegrityError:
+        # Ligne créée en parallèle : la mise à jour suffit
+        TestStatistics.objects.filter(key=key).update(updated_at=timezone.now(), **values)
+        stats = TestStatistics.objects.get(key=key)
+    return stats
+
+
+def rebuild_all_statistics() -> int:
+    """Recalcule la ligne globale et celle de chaque patient"""
+    rebuild_statistics()
+    patient_ids = list(Patient.objects.values_list('id', flat=True))
+    for patient_id in patient_ids:
+        rebuild_statistics(patient_id)
+    TestStatistics.objects.exclude(patient_id__in=patient_ids).exclude(
+        key=TestStatistics.GLOBAL_KEY
+    ).delete()
+    return len(patient_ids) + 1
+
+
+def _contribution(values, sign: int) -> Dict[str, Any]:
+    """Contribution (+1 ou -1) d'un test aux agrégats"""
+    contribution = {
+        'total_tests': sign,
+        'tracking_percentage_sum': sign * (values['tracking_percentage'] or 0),
+        'gaze_stability_sum': sign * (values['gaze_stability'] or 0),
+    }
+    count_field = RESULT_COUNT_FIELDS.get(values['result'])
+    if count_field:
+        contribution[count_field] = sign
+    return contribution
+
+
+def _keys(patient_id):
+    return [TestStatistics.GLOBAL_KEY, patient_key(patient_id)]
+
+
+def _apply(patient_id, delta: Dict[str, Any]):
+    """Ajoute delta aux lignes globale et patient existantes, en une requête"""
+    delta = {field: value for field, value in delta.items() if value}
+    if not delta:
+        return
+    TestStatistics.objects.filter(key__in=_keys(patient_id)).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + value for field, value in delta.items()}
+    )
+
+
+def invalidate(patient_id):
+    """Supprime les lignes concernées : elles seront recalculées à la lecture"""
+    TestStatistics.objects.filter(key__in=_keys(patient_id)).delete()
+
+
+def _merge(*deltas) -> Dict[str, Any]:
+    merged = {}
+    for delta in deltas:
+        for field, value in delta.items():
+            merged[field] = merged.get(field, 0) + value
+    return merged
+
+
+def snapshot(test: EyeTrackingTest) -> Optional[Dict[str, Any]]:
+    """Valeurs suivies d'un test chargé, ou None si certaines sont différées"""
+    if test.pk is None or any(field not in test.__dict__ for field in TRACKED_FIELDS):
+        return None
+    return {field: test.__dict__[field] for field in TRACKED_FIELDS}
+
+
+def test_saved(test: EyeTrackingTest, created: bool, previous: Optional[Dict[str, Any]],
+               update_fields: Optional[Iterable[str]] = None):
+    """Met à jour les statistiques après l'enregistrement d'un test"""
+    if not created and update_fields is not None and not _tracks(update_fields):
+        return
+
+    current = snapshot(test)
+    if current is None or (previous is None and not created):
+        # Valeurs différées ou inconnues : delta impossible
+        invalidate(test.patient_id)
+        if previous is not None:
+            invalidate(previous['patient_id'])
+        return
+    if created:
+        _apply(test.patient_id, _contribution(current, +1))
+        return
+    if previous == current:
+        return
+    if previous['patient_id'] != current['patient_id']:
+        _apply(previous['patient_id'], _contribution(previous, -1))
+        _apply(current['patient_id'], _contribution(current, +1))
+        return
+    _apply(test.patient_id, _merge(_contribution(previous, -1), _contribution(current, +1)))
+
+
+def test_deleted(test: EyeTrackingTest, previous: Optional[Dict[str, Any]]):
+    """Met à jour les statistiques après la suppression d'un test"""
+    if previous is None:
+        invalidate(test.patient_id)
+        return
+    _apply(previous['patient_id'], _contribution(previous, -1))
+
+
+def tests_bulk_created(tests: Iterable[EyeTrackingTest]):
+    """Met à jour statistiques et résumés après un bulk_create (qui n'émet aucun signal)
+
+    Une requête de mise à jour et un recalcul de résumé par patient concerné.
+    """
+    deltas = {}
+    for test in tests:
+        values = snapshot(test)
+        deltas[test.patient_id] = _merge(deltas.get(test.patient_id, {}), _contribution(values, +1))
+    for patient_id, delta in deltas.items():
+        _apply(patient_id, delta)
+        refresh_patient_summary(patient_id)
+
+
+def get_statistics(patient_id=None) -> TestStatistics:
+    """Retourne les statistiques globales ou d'un patient (calculées au premier appel)"""
+    key = TestStatistics.GLOBAL_KEY if patient_id is None else patient_key(patient_id)
+    stats = TestStatistics.objects.filter(key=key).first()
+    if stats is None:
+        stats = rebuild_statistics(patient_id)
+    return stats
+
+
+def summarize(tests_count: int, recent: List[Tuple]) -> Dict[str, Any]:
+    """Valeurs de PatientSummary à partir des derniers tests (SUMMARY_FIELDS, plus récent d'abord)"""
+    if not recent:
+        return {
+            'tests_count': tests_count, 'last_test_date': None, 'latest_result': '',
+            'window_size': 0, 'avg_tracking_percentage': None, 'avg_gaze_stability': None,
+            'avg_gaze_consistency': None, 'tracking_trend': None,
+        }
+
+    columns = list(zip(*recent))
+    tracking = np.array(columns[2], dtype=np.float64)
+    stability = np.array(columns[3], dtype=np.float64)
+    consistency = np.array(columns[4], dtype=np.float64)
+    # Tendance : pente des moindres carrés, du plus ancien au plus récent
+    trend = None
+    if len(recent) >= 2:
+        trend = float(np.polyfit(np.arange(len(recent)), tracking[::-1], 1)[0])
+
+    return {
+        'tests_count': tests_count,
+        'last_test_date': recent[0][0],
+        'latest_result': recent[0][1],
+        'window_size': len(recent),
+        'avg_tracking_percentage': float(tracking.mean()),
+        'avg_gaze_stability': float(stability.mean()),
+        'avg_gaze_consistency': float(consistency.mean()),
+        'tracking_trend': trend,
+    }
+
+
+def refresh_patient_summary(patient_id) -> Optional[PatientSummary]:
+    """Recalcule le résumé d'un patient (supprimé s'il n'a plus de test)"""
+    tests = EyeTrackingTest.objects.filter(patient_id=patient_id)
+    tests_count = tests.order_by().aggregate(n=Count('id'))['n']
+    if not tests_count:
+        # Dernier test supprimé, éventuellement avec le patient (cascade)
+        PatientSummary.objects.filter(patient_id=patient_id).delete()
+        return None
+
+    recent = list(tests.order_by('-created_at', '-id').values_list(*SUMMARY_FIELDS)[:SUMMARY_WINDOW])
+    summary, _ = PatientSummary.objects.update_or_create(
+        patient_id=patient_id, defaults=summarize(tests_count, recent)
+    )
+    return summary
+
+
+def summary_changed(created: bool, previous: Optional[Dict[str, Any]],
+                    current: Optional[Dict[str, Any]],
+                    update_fields: Optional[Iterable[str]] = None) -> bool:
+    """Indique si l'enregistrement d'un test modifie le résumé de son patient"""
+    if created:
+        return True
+    if update_fields is not None and not _tracks(update_fields):
+        return False
+    return previous is None or current is None or previous != current
+
+
+def _tracks(update_fields: Iterable[str]) -> bool:
+    return bool({'patient', 'test_date', *TRACKED_FIELDS} & set(update_fields))
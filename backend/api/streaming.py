@@ -0,0 +1,69 @@
+"""
+NDJSON (un objet JSON par ligne) pour les tests
+
+Export : avec ?format=ndjson (ou Accept: application/x-ndjson), les listes
+de tests sont écrites ligne par ligne pendant la lecture en base : la
+mémoire reste constante quel que soit le nombre de tests.
+
+Import : NDJSONParser lit un corps application/x-ndjson en liste d'objets
+(POST /api/tests/bulk/).
+"""
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Nombre de lignes lues en base par requête pendant le flux
+STREAM_CHUNK_SIZE = 500
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Un objet JSON par ligne (les listes paginées sont aplaties)"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and 'results' in data:
+            data = data['results']
+        if not isinstance(data, list):
+            data = [data]
+        return ''.join(ndjson_line(item) for item in data).encode(self.charset)
+
+
+class NDJSONParser(BaseParser):
+    """Corps NDJSON lu en liste d'objets (les lignes vides sont ignorées)"""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        items = []
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                raise ParseError(f'NDJSON invalide (ligne {number}) : {e}')
+        return items
+
+
+def ndjson_line(item) -> str:
+    return json.dumps(item, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def wants_ndjson(request) -> bool:
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.format == NDJSONRenderer.format
+
+
+def stream_ndjson(queryset, serializer_class, context=None, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Réponse en flux : une ligne NDJSON par objet, lu par blocs de chunk_size"""
+    def rows():
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            yield ndjson_line(serializer_class(obj, context=context).data)
+
+    return StreamingHttpResponse(rows(), content_type=NDJSONRenderer.media_type)
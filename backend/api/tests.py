@@ -0,0 +1,286 @@
+import tempfile
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .bulk_export import _report_data
+from .ingestion import test_fields
+from .models import EyeTrackingTest, MLPrediction, Patient
+from .pagination import TestCursorPagination
+from .reports import report_key
+from .views import EyeTrackingTestViewSet, PatientViewSet
+
+
+def create_patient(username, n_tests=0):
+    """Patient et `n_tests` tests enregistrés comme par l'API"""
+    user = User.objects.create_user(username, f'{username}@example.com')
+    patient = Patient.objects.create(user=user, age=40)
+    for _ in range(n_tests):
+        EyeTrackingTest.objects.create(patient=patient, **test_fields({'duration': 10})[0])
+    return patient
+
+
+def create_scored_test(patient):
+    """Test scoré avec sa prédiction ML"""
+    test = EyeTrackingTest.objects.create(
+        patient=patient, **{**test_fields({'duration': 30})[0], 'ml_status': EyeTrackingTest.ML_SCORED}
+    )
+    MLPrediction.objects.create(test=test, predicted_result='good', confidence_score=0.9, features={})
+    return test
+
+
+def get(view, actions, path, user):
+    """Réponse rendue d'une vue de l'API, authentifiée en tant que `user`
+
+    Le cache des réponses est vidé d'abord : l'invalidation attend la fin de
+    la transaction, jamais validée dans un TestCase.
+    """
+    cache.clear()
+    request = APIRequestFactory().get(path)
+    force_authenticate(request, user=user)
+    response = view.as_view(actions)(request)
+    response.render()
+    return response
+
+
+class ListQueryCountTest(TestCase):
+    """Le nombre de requêtes SQL des listes ne dépend pas du nombre de lignes (pas de N+1)"""
+
+    ROWS = 20
+
+    def setUp(self):
+        self.admin = User.objects.create_user('query-count-admin', is_staff=True)
+
+    def populate(self, n):
+        """n patients (liste des patients) et n tests scorés pour le premier"""
+        patients = [create_patient(f'query-count-{n}-{i}') for i in range(n)]
+        for _ in range(n):
+            create_scored_test(patients[0])
+        return patients
+
+    def assertConstantQueries(self, view, actions, path, as_admin=False):
+        counts = []
+        for n in (1, self.ROWS):
+            patients = self.populate(n)
+            user = self.admin if as_admin else patients[0].user
+            if counts:
+                # Même nombre de requêtes pour ROWS lignes que pour une seule
+                with self.assertNumQueries(counts[0]):
+                    response = get(view, actions, path, user)
+            else:
+                with CaptureQueriesContext(connection) as ctx:
+                    response = get(view, actions, path, user)
+                counts.append(len(ctx.captured_queries))
+            self.assertEqual(response.status_code, 200)
+            Patient.objects.filter(pk__in=[patient.pk for patient in patients]).delete()
+
+    def test_tests_list_admin(self):
+        self.assertConstantQueries(EyeTrackingTestViewSet, {'get': 'list'}, '/api/tests/', as_admin=True)
+
+    def test_tests_list_patient(self):
+        self.assertConstantQueries(EyeTrackingTestViewSet, {'get': 'list'}, '/api/tests/')
+
+    def test_patients_list_admin(self):
+        self.assertConstantQueries(PatientViewSet, {'get': 'list'}, '/api/patients/', as_admin=True)
+
+    def test_patient_me(self):
+        self.assertConstantQueries(PatientViewSet, {'get': 'me'}, '/api/patients/me/')
+
+    def test_patient_results(self):
+        self.assertConstantQueries(PatientViewSet, {'get': 'results'}, '/api/patients/results/')
+
+
+class ListColumnsTest(TestCase):
+    """Les listes ne lisent ni raw_data, ni les features ML, ni l'historique du regard
+
+    et leur nombre de requêtes ne croît pas avec l'historique du patient.
+    """
+
+    HISTORY = 20
+    # Colonnes lourdes, servies seulement par tests/{id}/raw/
+    HEAVY_COLUMNS = (
+        '"api_eyetrackingtest"."raw_data"',
+        '"api_mlprediction"."features"',
+        '"api_gazerecording"."data"',
+    )
+    ENDPOINTS = [
+        # (vue, actions, chemin, en tant qu'admin)
+        (EyeTrackingTestViewSet, {'get': 'list'}, '/api/tests/', True),
+        (EyeTrackingTestViewSet, {'get': 'list'}, '/api/tests/', False),
+        (PatientViewSet, {'get': 'list'}, '/api/patients/', True),
+        (PatientViewSet, {'get': 'me'}, '/api/patients/me/', False),
+        (PatientViewSet, {'get': 'results'}, '/api/patients/results/', False),
+    ]
+
+    def setUp(self):
+        self.admin = User.objects.create_user('columns-admin', is_staff=True)
+        self.patient = create_patient('columns')
+
+    def capture(self):
+        """Requêtes exécutées par chaque endpoint"""
+        captured = []
+        for view, actions, path, as_admin in self.ENDPOINTS:
+            user = self.admin if as_admin else self.patient.user
+            with CaptureQueriesContext(connection) as ctx:
+                response = get(view, actions, path, user)
+            self.assertEqual(response.status_code, 200, path)
+            captured.append((path, [query['sql'] for query in ctx.captured_queries]))
+        return captured
+
+    def test_heavy_columns_not_selected(self):
+        for _ in range(3):
+            create_scored_test(self.patient)
+        for path, queries in self.capture():
+            for sql in queries:
+                for column in self.HEAVY_COLUMNS:
+                    self.assertNotIn(column, sql, f'{path} : {sql}')
+
+    def test_query_count_flat_as_history_grows(self):
+        create_scored_test(self.patient)
+        short = self.capture()
+        for _ in range(self.HISTORY - 1):
+            create_scored_test(self.patient)
+        long = self.capture()
+        for (path, few), (_, many) in zip(short, long):
+            self.assertEqual(len(many), len(few), path)
+
+
+class ReportKeyTest(TestCase):
+    """La clé du rapport change avec tout champ affiché dans le PDF"""
+
+    def setUp(self):
+        self.patient = create_patient('report', n_tests=2)
+        self.test = self.patient.tests.first()
+
+    def test_test_edit_changes_key(self):
+        for field, value in (('duration', 42.0), ('clinical_evaluation', 'Suivi conseillé')):
+            key = report_key(self.patient.id)
+            test_key = report_key(self.patient.id, self.test.id)
+            setattr(self.test, field, value)
+            self.test.save()
+            self.assertNotEqual(report_key(self.patient.id), key)
+            self.assertNotEqual(report_key(self.patient.id, self.test.id), test_key)
+
+    def test_user_edit_changes_key(self):
+        for field, value in (('last_name', 'Martin'), ('email', 'nouveau@example.com')):
+            key = report_key(self.patient.id)
+            setattr(self.patient.user, field, value)
+            self.patient.user.save()
+            self.assertNotEqual(report_key(self.patient.id), key)
+
+    def test_deleted_test_changes_key(self):
+        key = report_key(self.patient.id)
+        self.patient.tests.order_by('created_at').first().delete()
+        self.assertNotEqual(report_key(self.patient.id), key)
+
+    def test_key_is_stable_without_changes(self):
+        self.assertEqual(report_key(self.patient.id), report_key(self.patient.id))
+
+
+class BulkExportDataTest(TestCase):
+    """Les tests de chaque patient sont lus en flux, et seulement pour les rapports à rendre"""
+
+    def setUp(self):
+        self.patients = [create_patient(f'export{i}', n_tests=n) for i, n in enumerate((2, 0, 3))]
+        self.ids = [patient.id for patient in self.patients]
+
+    def test_groups_tests_by_patient(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(REPORTS_LOCATION=location):
+            data = list(_report_data(self.ids))
+        self.assertEqual([patient.id for patient, _, _ in data], self.ids)
+        self.assertEqual([len(tests) for _, _, tests in data], [2, 0, 3])
+        for (_, _, tests), patient in zip(data, self.patients):
+            expected = list(patient.tests.order_by('-created_at', '-id').values_list('created_at', flat=True))
+            self.assertEqual([test.created_at for test in tests], expected)
+
+    def test_cached_reports_skip_tests_query(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(REPORTS_LOCATION=location):
+            for _, cache_path, _ in _report_data(self.ids):
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                cache_path.write_bytes(b'%PDF')
+            # Une requête pour les patients, aucune pour leurs tests
+            with self.assertNumQueries(1):
+                data = list(_report_data(self.ids))
+        self.assertEqual([tests for _, _, tests in data], [None, None, None])
+
+
+def patient_tests():
+    """Liste et résultats d'un patient, page suivante du curseur comprise"""
+    return EyeTrackingTest.objects.filter(
+        patient_id=1, created_at__lt=timezone.now()
+    ).order_by(*TestCursorPagination.ordering)[:20]
+
+
+def patient_results():
+    """Répartition des résultats d'un patient (statistiques)"""
+    return EyeTrackingTest.objects.filter(patient_id=1).order_by().values('result').annotate(n=Count('id'))
+
+
+def tests_by_result():
+    """Tests d'un résultat donné, par date (statistiques globales, entraînement)"""
+    return EyeTrackingTest.objects.filter(result=EyeTrackingTest.GOOD).order_by('created_at')
+
+
+def pending_queue():
+    """Tests en attente de scoring (ml.scoring.claim_pending)"""
+    return EyeTrackingTest.objects.filter(
+        ml_status=EyeTrackingTest.ML_PENDING
+    ).order_by('created_at').values_list('id', flat=True)[:50]
+
+
+def stale_claims():
+    """Tests réclamés par un worker disparu (ml.scoring.requeue_stale)"""
+    return EyeTrackingTest.objects.filter(
+        ml_status=EyeTrackingTest.ML_PROCESSING, ml_claimed_at__lt=timezone.now()
+    ).order_by()
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), "EXPLAIN vérifié sous SQLite et PostgreSQL")
+class IndexUsageTest(TestCase):
+    """Les requêtes fréquentes sur les tests utilisent les index de EyeTrackingTest.Meta.indexes
+
+    Sous PostgreSQL, les parcours séquentiels sont désactivés dans la
+    transaction du test (SET LOCAL enable_seqscan = off) : sur une base vide,
+    le planificateur les préfère même quand l'index est utilisable.
+    """
+
+    CHECKS = [
+        # (requête, index attendu)
+        (patient_tests, 'test_patient_created_idx'),
+        (patient_results, 'test_patient_result_idx'),
+        (tests_by_result, 'test_result_created_idx'),
+        (pending_queue, 'test_ml_pending_idx'),
+        (stale_claims, 'test_ml_processing_idx'),
+    ]
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def test_queries_use_their_index(self):
+        for query, index in self.CHECKS:
+            with self.subTest(query.__name__):
+                self.assertIn(index, self.explain(query()))
+
+    def test_cursor_page_is_not_sorted(self):
+        # L'index suit l'ordre exact de la pagination : aucun tri en mémoire
+        sort = 'Sort' if connection.vendor == 'postgresql' else 'TEMP B-TREE'
+        self.assertNotIn(sort, self.explain(patient_tests()))
+
+    @skipUnless(connection.vendor == 'postgresql', "SELECT ... FOR UPDATE SKIP LOCKED : PostgreSQL seulement")
+    def test_locked_claim_uses_pending_index(self):
+        claim = EyeTrackingTest.objects.filter(
+            ml_status=EyeTrackingTest.ML_PENDING
+        ).order_by('created_at').select_for_update(skip_locked=True)[:50]
+        plan = self.explain(claim)
+        self.assertIn('test_ml_pending_idx', plan)
+        self.assertNotIn('Sort', plan)
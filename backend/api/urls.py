@@ -5,10 +5,13 @@ from . import views
 router = DefaultRouter()
 router.register(r'patients', views.PatientViewSet, basename='patient')
 router.register(r'tests', views.EyeTrackingTestViewSet, basename='test')
+router.register(r'reports', views.ReportJobViewSet, basename='report')
+router.register(r'report-exports', views.BulkExportJobViewSet, basename='report-export')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/register/', views.RegisterView.as_view(), name='register'),
     path('auth/login/', views.LoginView.as_view(), name='login'),
     path('auth/refresh/', views.RefreshTokenView.as_view(), name='refresh'),
+    path('cache/stats/', views.CacheStatsView.as_view(), name='cache-stats'),
 ]
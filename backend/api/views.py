@@ -2,16 +2,73 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.conf import settings
 from django.db import transaction
-from django.http import HttpResponse
-from .models import Patient, EyeTrackingTest, MLPrediction
-from .serializers import PatientSerializer, EyeTrackingTestSerializer, EyeTrackingTestCreateSerializer
-from ml.predictor import EyeTrackingPredictor
-from .pdf_generator import generate_patient_report_pdf, generate_test_report_pdf
+from django.http import FileResponse
+import logging
+import time
+from .models import Patient, EyeTrackingTest, GazeRecording, ReportJob, BulkExportJob
+from .serializers import (
+    PatientSerializer, EyeTrackingTestSerializer, EyeTrackingTestCreateSerializer, ReportJobSerializer,
+    BulkExportJobSerializer
+)
+from ml.feature_store import store_features
+from ml.scoring import enqueue_scoring
+from security.identity import email_exists, username_exists
+from .ingestion import BULK_MAX_TESTS, ingest_tests, test_fields
+from .pagination import TestCursorPagination
+from .response_cache import (
+    GLOBAL_SCOPE, cached_response, counters as cache_counters, patient_scope, user_patient_id
+)
+from .statistics import get_statistics
+from .streaming import NDJSONParser, NDJSONRenderer, stream_ndjson, wants_ndjson
+from .reports import cached_report, job_path, report_filename, request_report, wait_for_report
+from .bulk_export import export_filename, export_path, request_bulk_export
+
+logger = logging.getLogger(__name__)
+
+# Intervalle (secondes) entre deux lectures de l'état du scoring en long-polling
+SCORING_POLL_INTERVAL = 0.5
+
+
+def pdf_response(path, filename):
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
+
+
+def report_response(request, patient, test=None):
+    """
+    Rapport PDF servi depuis le cache, ou généré en arrière-plan (api.reports)
+    
+    La requête attend la fin de la génération au plus ?wait=<secondes>
+    (REPORTS_MAX_WAIT par défaut) ; au-delà, elle répond 202 avec le job à
+    suivre sur /api/reports/{id}/.
+    """
+    key, path = cached_report(patient.id, test.id if test is not None else None)
+    if path is None:
+        try:
+            wait = min(float(request.query_params.get('wait', settings.REPORTS_MAX_WAIT)), settings.REPORTS_MAX_WAIT)
+        except ValueError:
+            wait = 0
+        job = wait_for_report(request_report(patient, test, request.user, key), wait)
+        if job.status == ReportJob.FAILED:
+            return Response(
+                {'error': f'Erreur lors de la génération du PDF: {job.error}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        if job.status != ReportJob.SUCCEEDED:
+            return Response(
+                ReportJobSerializer(job).data,
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Location': f'/api/reports/{job.id}/'}
+            )
+        path = job_path(job)
+    return pdf_response(path, report_filename(patient, test))
+
 
 class RegisterView(APIView):
     """Vue d'enregistrement utilisateur"""
@@ -31,13 +88,14 @@ class RegisterView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if User.objects.filter(username=username).exists():
+        # Identifiants cherchés par leur index aveugle (security.identity)
+        if username_exists(username):
             return Response(
                 {'error': 'Ce nom d\'utilisateur existe déjà'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if User.objects.filter(email=email).exists():
+        if email_exists(email):
             return Response(
                 {'error': 'Cet email existe déjà'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -114,74 +172,88 @@ class PatientViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Les admins voient tous les patients, les patients ne voient que leur propre dossier"""
         user = self.request.user
+        # Nombre de tests et moyennes lus dans PatientSummary, sans agréger les tests
+        patients = Patient.objects.select_related('user', 'summary').order_by('id')
         if user.is_staff or user.is_superuser:
             # Admin voit tous les patients
-            return Patient.objects.all()
+            return patients
         else:
             # Patient voit uniquement son propre dossier
-            return Patient.objects.filter(user=user)
+            return patients.filter(user=user)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def me(self, request):
         """Retourne les données du patient courant"""
-        try:
-            patient = Patient.objects.get(user=request.user)
-            serializer = self.get_serializer(patient)
-            return Response(serializer.data)
-        except Patient.DoesNotExist:
+        patient_id = user_patient_id(request.user)
+        if patient_id is None:
             return Response(
                 {'error': 'Profil patient non trouvé'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        def build():
+            patient = self.get_queryset().get(pk=patient_id)
+            return Response(self.get_serializer(patient).data)
+        
+        return cached_response(request, 'patients/me', [patient_scope(patient_id)], build)
 
-    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+            renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer])
     def results(self, request):
-        """Retourne tous les résultats de tests du patient"""
-        try:
-            patient = Patient.objects.get(user=request.user)
-            tests = EyeTrackingTest.objects.filter(patient=patient).order_by('-created_at')
-            serializer = EyeTrackingTestSerializer(tests, many=True)
-            return Response({
-                'patient': PatientSerializer(patient).data,
-                'tests': serializer.data,
-                'total_tests': len(tests)
-            })
-        except Patient.DoesNotExist:
+        """
+        Retourne les résultats de tests du patient, paginés par curseur
+        
+        Avec ?format=ndjson, tous les tests sont envoyés en flux, un par ligne.
+        """
+        patient_id = user_patient_id(request.user)
+        if patient_id is None:
             return Response(
                 {'error': 'Profil patient non trouvé'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        tests = EyeTrackingTest.objects.filter(patient_id=patient_id).without_raw_data().select_related(
+            'patient__user'
+        ).order_by(*TestCursorPagination.ordering)
+        if wants_ndjson(request):
+            return stream_ndjson(tests, EyeTrackingTestSerializer)
+        
+        def build():
+            patient = self.get_queryset().get(pk=patient_id)
+            paginator = TestCursorPagination()
+            page = paginator.paginate_queryset(tests, request, view=self)
+            patient_data = PatientSerializer(patient).data
+            return Response({
+                'patient': patient_data,
+                'tests': EyeTrackingTestSerializer(page, many=True).data,
+                'total_tests': patient_data['tests_count'],
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link()
+            })
+        
+        return cached_response(request, 'patients/results', [patient_scope(patient_id)], build)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def export_pdf(self, request):
-        """Exporte tous les résultats en PDF"""
+        """Exporte tous les résultats en PDF (généré en arrière-plan, puis servi depuis le cache)"""
         try:
-            patient = Patient.objects.get(user=request.user)
-            tests = EyeTrackingTest.objects.filter(patient=patient).order_by('-created_at')
-            
-            pdf_buffer = generate_patient_report_pdf(patient, tests)
-            
-            response = HttpResponse(pdf_buffer.read(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="Resultats_{patient.user.username}_{patient.id}.pdf"'
-            return response
+            patient = Patient.objects.select_related('user').get(user=request.user)
         except Patient.DoesNotExist:
             return Response(
                 {'error': 'Profil patient non trouvé'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        except Exception as e:
-            return Response(
-                {'error': f'Erreur lors de la génération du PDF: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return report_response(request, patient)
 
 
 class EyeTrackingTestViewSet(viewsets.ModelViewSet):
     """ViewSet pour les tests de suivi oculaire"""
     permission_classes = [IsAuthenticated]
+    pagination_class = TestCursorPagination
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
     
     def get_serializer_class(self):
-        if self.action == 'create':
+        if self.action in ('create', 'bulk'):
             return EyeTrackingTestCreateSerializer
         return EyeTrackingTestSerializer
 
@@ -190,21 +262,44 @@ class EyeTrackingTestViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.is_staff or user.is_superuser:
             # Admin voit tous les tests
-            return EyeTrackingTest.objects.all()
+            tests = EyeTrackingTest.objects.all()
         else:
             # Patient voit uniquement ses propres tests
-            try:
-                patient = Patient.objects.get(user=user)
-                return EyeTrackingTest.objects.filter(patient=patient)
-            except Patient.DoesNotExist:
-                return EyeTrackingTest.objects.none()
+            tests = EyeTrackingTest.objects.filter(patient__user=user)
+
+        if self.action == 'raw':
+            return tests.only('id', 'patient', 'uuid', 'raw_data').select_related('gaze_recording')
+        # Les données brutes ne sont lues que par l'action raw ; patient, utilisateur
+        # et prédiction ML sont joints pour éviter une requête par test
+        return tests.without_raw_data().select_related('patient__user')
+
+    def list(self, request, *args, **kwargs):
+        """Liste paginée par curseur, ou flux NDJSON complet avec ?format=ndjson"""
+        if wants_ndjson(request):
+            tests = self.filter_queryset(self.get_queryset()).order_by(*TestCursorPagination.ordering)
+            return stream_ndjson(tests, self.get_serializer_class(), self.get_serializer_context())
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Détail d'un test, servi depuis le cache tant que son patient n'a pas changé"""
+        try:
+            patient_id = self.get_queryset().filter(pk=kwargs['pk']).values_list('patient_id', flat=True).first()
+        except (TypeError, ValueError):
+            patient_id = None
+        if patient_id is None:
+            # Test inexistant ou inaccessible : 404 standard
+            return super().retrieve(request, *args, **kwargs)
+        return cached_response(
+            request, 'tests/detail', [patient_scope(patient_id)],
+            lambda: super(EyeTrackingTestViewSet, self).retrieve(request, *args, **kwargs)
+        )
 
     @transaction.atomic
     def perform_create(self, serializer):
-        """Crée un test et lance la prédiction ML"""
+        """Crée un test et planifie la prédiction ML"""
         user = self.request.user
         test_data = serializer.validated_data
-        raw_data = test_data.get('raw_data', {})
+        fields, gaze_history, gaze_layout = test_fields(test_data)
         
         # Détermine le patient
         patient_id = test_data.get('patient_id')
@@ -219,115 +314,244 @@ class EyeTrackingTestViewSet(viewsets.ModelViewSet):
             patient = Patient.objects.get(user=user)
 
         # Crée le test avec les valeurs fournies et les valeurs par défaut
-        test = serializer.save(
-            patient=patient,
-            # Valeurs fournies par le frontend
-            duration=test_data.get('duration', 0),
-            gaze_time=test_data.get('gaze_time', 0),
-            tracking_percentage=test_data.get('tracking_percentage', 0),
-            fixation_count=test_data.get('fixation_count', 0),
-            avg_fixation_duration=test_data.get('avg_fixation_duration', 0),
-            max_fixation_duration=test_data.get('max_fixation_duration', 0),
-            min_fixation_duration=test_data.get('min_fixation_duration', 0),
-            gaze_stability=test_data.get('gaze_stability', 0),
-            gaze_consistency=test_data.get('gaze_consistency', 0),
-            # Valeurs par défaut
-            result='poor',
-            clinical_evaluation='En attente',
-            left_eye_open=raw_data.get('eyeStatus', {}).get('leftEyeOpen', False),
-            right_eye_open=raw_data.get('eyeStatus', {}).get('rightEyeOpen', False),
-            raw_data=raw_data
-        )
+        test = serializer.save(patient=patient, **fields)
+        GazeRecording.store(test, gaze_history, gaze_layout)
+        self._store_features(test)
 
-        # Lance la prédiction ML
+        # Le scoring ML est fait hors de la requête, une fois la transaction validée
+        transaction.on_commit(enqueue_scoring)
+
+    def perform_update(self, serializer):
+        """Met à jour un test et recalcule ses features"""
+        test = serializer.save()
+        self._store_features(test)
+
+    def _store_features(self, test):
+        """Calcule les features du test une seule fois, à l'ingestion"""
         try:
-            predictor = EyeTrackingPredictor()
-            prediction = predictor.predict(test)
-            
-            # Sauvegarde la prédiction
-            MLPrediction.objects.create(
-                test=test,
-                predicted_result=prediction['result'],
-                confidence_score=prediction['confidence'],
-                features=prediction.get('features', {}),
-                anomaly_detected=prediction.get('anomaly_detected', False),
-                anomaly_score=prediction.get('anomaly_score', 0.0)
+            # Point de sauvegarde : une erreur de base ne doit pas invalider la
+            # transaction de perform_create (PostgreSQL)
+            with transaction.atomic():
+                store_features([test])
+        except Exception:
+            # Le scoring recalculera les features manquantes
+            logger.exception("Erreur lors du calcul des features du test %s", test.id)
+
+    @action(detail=False, methods=['post'],
+            parser_classes=[*api_settings.DEFAULT_PARSER_CLASSES, NDJSONParser])
+    def bulk(self, request):
+        """
+        Crée plusieurs tests en une requête : tableau JSON ou flux NDJSON
+        (Content-Type: application/x-ndjson, un test par ligne)
+        
+        Les éléments invalides sont rejetés individuellement ; les autres sont créés.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'error': 'Un tableau de tests est attendu'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
-            # Met à jour le test avec les résultats de la prédiction
-            test.result = prediction['result']
-            test.clinical_evaluation = prediction['clinical_evaluation']
-            test.recommended_follow_up = prediction['recommended_follow_up']
-            test.tracking_percentage = prediction.get('tracking_percentage', 0)
-            test.gaze_stability = prediction.get('gaze_stability', 0)
-            test.gaze_consistency = prediction.get('gaze_consistency', 0)
-            test.save()
-        except Exception as e:
-            print(f"Erreur lors de la prédiction ML: {str(e)}")
+        if len(items) > BULK_MAX_TESTS:
+            return Response(
+                {'error': f'Au plus {BULK_MAX_TESTS} tests par requête'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        created, errors = ingest_tests(items, request.user, self.get_serializer_context())
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {'total': len(items), 'created': created, 'errors': errors},
+            status=response_status
+        )
 
     @action(detail=True, methods=['get'])
-    def export_pdf(self, request, pk=None):
-        """Exporte un test spécifique en PDF"""
+    def prediction(self, request, pk=None):
+        """
+        Retourne l'état du scoring ML d'un test
+        
+        Avec ?wait=<secondes>, attend (long-polling) que le scoring soit terminé.
+        """
+        test = self.get_object()
         try:
-            test = self.get_object()
-            patient = test.patient
-            
-            # Vérifier que l'utilisateur a accès à ce test
-            if patient.user != request.user:
-                return Response(
-                    {'error': 'Accès refusé'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
-            pdf_buffer = generate_test_report_pdf(patient, test)
-            
-            response = HttpResponse(pdf_buffer.read(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="Test_{test.id}_{test.created_at.strftime("%d%m%Y")}.pdf"'
-            return response
-        except EyeTrackingTest.DoesNotExist:
-            return Response(
-                {'error': 'Test non trouvé'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        except Exception as e:
+            wait = min(float(request.query_params.get('wait', 0)), settings.ML_SCORING_MAX_WAIT)
+        except ValueError:
+            wait = 0
+        
+        deadline = time.monotonic() + wait
+        waiting = (EyeTrackingTest.ML_PENDING, EyeTrackingTest.ML_PROCESSING)
+        if test.ml_status in waiting and wait > 0:
+            while test.ml_status in waiting and time.monotonic() < deadline:
+                time.sleep(SCORING_POLL_INTERVAL)
+                test.refresh_from_db(fields=['ml_status'])
+            test = self.get_queryset().get(pk=test.pk)
+        
+        return Response(EyeTrackingTestSerializer(test).data)
+
+    @action(detail=True, methods=['get'])
+    def raw(self, request, pk=None):
+        """Retourne les données brutes du test, historique du regard compris"""
+        test = self.get_object()
+        return Response(test.full_raw_data())
+
+    @action(detail=True, methods=['get'])
+    def export_pdf(self, request, pk=None):
+        """Exporte un test spécifique en PDF (généré en arrière-plan, puis servi depuis le cache)"""
+        test = self.get_object()
+        patient = test.patient
+        
+        # Vérifier que l'utilisateur a accès à ce test
+        if patient.user != request.user:
             return Response(
-                {'error': f'Erreur lors de la génération du PDF: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'Accès refusé'},
+                status=status.HTTP_403_FORBIDDEN
             )
+        return report_response(request, patient, test)
 
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """Retourne les statistiques du patient"""
+        """Retourne les statistiques du patient (globales pour un admin)"""
         user = request.user
-        patient = Patient.objects.get(user=user)
-        tests = self.get_queryset()
-
-        if tests.count() == 0:
+        if user.is_staff or user.is_superuser:
+            patient_id, scopes = None, [GLOBAL_SCOPE]
+        else:
+            patient_id = user_patient_id(user)
+            if patient_id is None:
+                return Response({
+                    'total_tests': 0,
+                    'message': 'Aucun test disponible'
+                })
+            scopes = [patient_scope(patient_id)]
+        
+        def build():
+            stats = get_statistics(patient_id)
+            if stats.total_tests == 0:
+                return Response({
+                    'total_tests': 0,
+                    'message': 'Aucun test disponible'
+                })
+            
             return Response({
-                'total_tests': 0,
-                'message': 'Aucun test disponible'
+                'total_tests': stats.total_tests,
+                'results': {
+                    'excellent': stats.excellent_count,
+                    'good': stats.good_count,
+                    'acceptable': stats.acceptable_count,
+                    'poor': stats.poor_count
+                },
+                'averages': {
+                    'tracking_percentage': round(stats.tracking_percentage_sum / stats.total_tests, 2),
+                    'gaze_stability': round(stats.gaze_stability_sum / stats.total_tests, 2)
+                }
             })
+        
+        return cached_response(request, 'tests/statistics', scopes, build)
 
-        excellent_count = tests.filter(result=EyeTrackingTest.EXCELLENT).count()
-        good_count = tests.filter(result=EyeTrackingTest.GOOD).count()
-        acceptable_count = tests.filter(result=EyeTrackingTest.ACCEPTABLE).count()
-        poor_count = tests.filter(result=EyeTrackingTest.POOR).count()
 
-        avg_tracking = tests.aggregate(models.Avg('tracking_percentage'))['tracking_percentage__avg']
-        avg_stability = tests.aggregate(models.Avg('gaze_stability'))['gaze_stability__avg']
+class ReportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Suivi et téléchargement des rapports PDF générés en arrière-plan"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = ReportJobSerializer
+    
+    def get_queryset(self):
+        """Les admins voient tous les rapports, les patients ne voient que les leurs"""
+        user = self.request.user
+        jobs = ReportJob.objects.all()
+        if not (user.is_staff or user.is_superuser):
+            jobs = jobs.filter(patient__user=user)
+        return jobs
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Télécharge le PDF d'un rapport terminé"""
+        job = self.get_object()
+        if job.status != ReportJob.SUCCEEDED:
+            return Response(
+                ReportJobSerializer(job).data,
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            return pdf_response(job_path(job), job.filename)
+        except FileNotFoundError:
+            # Remplacé par une version plus récente du même rapport
+            return Response(
+                {'error': 'Rapport expiré, relancer l\'export'},
+                status=status.HTTP_410_GONE
+            )
+
 
+class BulkExportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Export en masse des rapports patients dans une archive ZIP (admin)"""
+    permission_classes = [IsAdminUser]
+    serializer_class = BulkExportJobSerializer
+    queryset = BulkExportJob.objects.all()
+    
+    def create(self, request):
+        """
+        Lance un export : {"patient_ids": [...], "processes": N}
+        
+        Sans patient_ids, tous les patients sont exportés ; processes est
+        borné par REPORTS_EXPORT_PROCESSES. La progression est suivie sur
+        /api/report-exports/{id}/.
+        """
+        patient_ids = request.data.get('patient_ids') or None
+        processes = request.data.get('processes')
+        if patient_ids is not None and (
+            not isinstance(patient_ids, list) or not all(isinstance(i, int) for i in patient_ids)
+        ):
+            return Response(
+                {'patient_ids': ['Liste d\'identifiants de patients attendue']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if processes is not None and (not isinstance(processes, int) or processes < 1):
+            return Response(
+                {'processes': ['Entier positif attendu']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        job = request_bulk_export(patient_ids, processes, request.user)
+        return Response(
+            BulkExportJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': f'/api/report-exports/{job.id}/'}
+        )
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Télécharge l'archive ZIP d'un export terminé"""
+        job = self.get_object()
+        if job.status != BulkExportJob.SUCCEEDED:
+            return Response(
+                BulkExportJobSerializer(job).data,
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            return FileResponse(
+                open(export_path(job), 'rb'),
+                as_attachment=True,
+                filename=export_filename(job),
+                content_type='application/zip'
+            )
+        except FileNotFoundError:
+            return Response(
+                {'error': 'Archive supprimée, relancer l\'export'},
+                status=status.HTTP_410_GONE
+            )
+
+
+class CacheStatsView(APIView):
+    """Compteurs du cache des réponses (hits, misses, 304) par endpoint"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
         return Response({
-            'total_tests': tests.count(),
-            'results': {
-                'excellent': excellent_count,
-                'good': good_count,
-                'acceptable': acceptable_count,
-                'poor': poor_count
-            },
-            'averages': {
-                'tracking_percentage': round(avg_tracking, 2),
-                'gaze_stability': round(avg_stability, 2)
-            }
+            'backend': settings.CACHES['default']['BACKEND'],
+            'endpoints': cache_counters()
         })
 
 
@@ -358,7 +582,3 @@ class RefreshTokenView(APIView):
                 {'error': 'Token invalide ou expiré'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
-
-
-# Import models pour les statistiques
-from django.db import models
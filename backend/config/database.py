@@ -0,0 +1,70 @@
+"""
+Configuration de la base de données
+
+PostgreSQL est sélectionné par DATABASE_URL (postgresql://user:pass@hôte:5432/base,
+comme dans docker-compose.production.yml) ; sans cette variable, SQLite local.
+
+PostgreSQL :
+- connexions persistantes (DB_CONN_MAX_AGE secondes, 60 par défaut) avec
+  vérification de santé avant réutilisation : un worker gunicorn garde sa
+  connexion d'une requête à l'autre au lieu d'en ouvrir une à chaque requête ;
+- DB_POOLER=pgbouncer : connexions passant par PgBouncer en mode transaction.
+  Les curseurs serveur (QuerySet.iterator) sont alors désactivés, une
+  transaction pouvant changer de connexion serveur à chaque requête.
+
+SQLite : réglé à chaque connexion pour l'usage local (attente sur verrou
+plutôt qu'échec immédiat, synchronous=NORMAL). Le journal WAL, propriété
+persistante du fichier, n'est pas activé ici : toute commande manage.py
+réécrirait l'en-tête de la base et laisserait des fichiers -wal/-shm. Il
+s'active une fois, au déploiement :
+
+    python manage.py enable_sqlite_wal
+"""
+from django.db.backends.signals import connection_created
+
+POOLER_NONE = ''
+POOLER_PGBOUNCER = 'pgbouncer'
+
+# PRAGMA appliqués à chaque nouvelle connexion SQLite
+SQLITE_PRAGMAS = {
+    # Attente (ms) d'un verrou avant "database is locked"
+    'busy_timeout': 5000,
+    # Sûr en WAL : seule une coupure de courant peut perdre la dernière transaction
+    'synchronous': 'NORMAL',
+}
+
+# Mode de journal activé une fois par enable_sqlite_wal (persistant dans le fichier) :
+# les lecteurs ne bloquent plus l'écrivain, et inversement
+SQLITE_JOURNAL_MODE = 'WAL'
+
+
+def database_settings(env, base_dir) -> dict:
+    """Construit DATABASES['default'] à partir de l'environnement"""
+    database = env.db('DATABASE_URL', default=f"sqlite:///{base_dir / 'db.sqlite3'}")
+    if database['ENGINE'] != 'django.db.backends.postgresql':
+        return database
+
+    pooler = env('DB_POOLER', default=POOLER_NONE)
+    if pooler not in (POOLER_NONE, POOLER_PGBOUNCER):
+        raise ValueError(f"DB_POOLER inconnu : {pooler}")
+
+    database['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=60)
+    database['CONN_HEALTH_CHECKS'] = True
+    database.setdefault('OPTIONS', {})
+    database['OPTIONS'].setdefault('connect_timeout', env.int('DB_CONNECT_TIMEOUT', default=5))
+    if pooler == POOLER_PGBOUNCER:
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return database
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Applique SQLITE_PRAGMAS à une nouvelle connexion SQLite"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def connect_signals():
+    connection_created.connect(configure_sqlite, dispatch_uid='config.database.configure_sqlite')
@@ -73,25 +73,20 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
-# Database
+# Database : PostgreSQL si DATABASE_URL est défini, SQLite sinon (voir config/database.py)
+from .database import database_settings
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_settings(env, BASE_DIR),
 }
 
-# En production, utiliser PostgreSQL:
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': env('DB_NAME'),
-#         'USER': env('DB_USER'),
-#         'PASSWORD': env('DB_PASSWORD'),
-#         'HOST': env('DB_HOST'),
-#         'PORT': env('DB_PORT', default='5432'),
-#     }
-# }
+# Cache : Redis si REDIS_URL est défini (docker-compose.production.yml), mémoire locale sinon.
+# Le cache local n'est pas partagé entre workers : à réserver au développement.
+CACHES = {
+    'default': env.cache('REDIS_URL', default='locmemcache://'),
+}
+# Durée de vie (secondes) des réponses en cache (api/response_cache.py)
+API_CACHE_TIMEOUT = env.int('API_CACHE_TIMEOUT', default=300)
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -170,6 +165,34 @@ os.environ['TINK_ALLOW_INSECURE_KEYSET_ACCESS'] = '1'  # Dev only
 # ML Models location
 ML_MODELS_LOCATION = BASE_DIR / 'ml_models'
 
+# Intervalle (secondes) de vérification du fichier modèle pour rechargement à chaud (0 = désactivé)
+ML_MODEL_RELOAD_INTERVAL = env.int('ML_MODEL_RELOAD_INTERVAL', default=30)
+
+# Backend d'inférence : 'numpy' (poids .npz exportés) ou 'keras'
+ML_INFERENCE_BACKEND = env('ML_INFERENCE_BACKEND', default='numpy')
+
+# Scoring ML asynchrone : 'thread' (pool de threads dans chaque worker web)
+# ou 'worker' (processus dédié : python manage.py run_scoring_worker)
+ML_SCORING_MODE = env('ML_SCORING_MODE', default='thread')
+ML_SCORING_THREADS = env.int('ML_SCORING_THREADS', default=1)
+ML_SCORING_BATCH_SIZE = env.int('ML_SCORING_BATCH_SIZE', default=64)
+ML_SCORING_POLL_INTERVAL = env.float('ML_SCORING_POLL_INTERVAL', default=5.0)
+# Délai après lequel un test réclamé par un worker disparu est remis en attente
+ML_SCORING_STALE_AFTER = env.int('ML_SCORING_STALE_AFTER', default=600)
+# Attente maximale (secondes) du long-polling sur tests/{id}/prediction/
+ML_SCORING_MAX_WAIT = env.int('ML_SCORING_MAX_WAIT', default=30)
+# Délai (secondes) après lequel un entraînement resté en file ou en cours (processus redémarré) est marqué en échec
+ML_TRAINING_JOB_TIMEOUT = env.int('ML_TRAINING_JOB_TIMEOUT', default=3600)
+
+# Rapports PDF générés en arrière-plan et mis en cache (api/reports.py)
+REPORTS_LOCATION = env('REPORTS_LOCATION', default=str(BASE_DIR / 'media' / 'reports'))
+# Attente maximale (secondes) d'un rapport par les endpoints export_pdf avant de répondre 202
+REPORTS_MAX_WAIT = env.int('REPORTS_MAX_WAIT', default=30)
+# Délai (secondes) après lequel un job resté en file ou en cours (worker disparu) est marqué en échec
+REPORTS_JOB_TIMEOUT = env.int('REPORTS_JOB_TIMEOUT', default=600)
+# Processus de rendu des exports en masse (api/bulk_export.py)
+REPORTS_EXPORT_PROCESSES = env.int('REPORTS_EXPORT_PROCESSES', default=os.cpu_count() or 1)
+
 # Logging
 LOGGING = {
     'version': 1,
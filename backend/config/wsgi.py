@@ -9,3 +9,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Précharge le modèle ML en arrière-plan pour que la première requête ne paie pas le chargement
+from ml.registry import get_registry  # noqa: E402
+from ml.scoring import enqueue_scoring  # noqa: E402
+from security.security_manager import get_security_manager  # noqa: E402
+
+# Charge les keysets Tink avant la première requête
+get_security_manager()
+
+get_registry().warm_up()
+# Reprend les tests restés en attente de scoring
+enqueue_scoring()
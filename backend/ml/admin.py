@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import TestFeatures, TrainingJob
+
+
+@admin.register(TrainingJob)
+class TrainingJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'current_epoch', 'epochs', 'n_samples', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+
+@admin.register(TestFeatures)
+class TestFeaturesAdmin(admin.ModelAdmin):
+    list_display = ('test', 'schema_version', 'computed_at')
+    list_filter = ('schema_version',)
+    readonly_fields = ('computed_at',)
@@ -0,0 +1,157 @@
+"""
+Feature store des tests de suivi oculaire
+
+Les features de chaque test sont calculées une seule fois, à l'ingestion,
+et stockées dans ml.models.TestFeatures sous forme de vecteur float64 brut.
+L'entraînement, l'évaluation et le scoring lisent ensuite une matrice dense
+en une seule requête, sans recharger ni reparcourir raw_data. Lorsque
+FEATURE_SCHEMA_VERSION change, seuls les vecteurs périmés sont recalculés.
+"""
+import logging
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+from django.utils import timezone
+
+from api.models import EyeTrackingTest
+from security.fields import decrypt_fields
+from .features import FEATURE_NAMES, FEATURE_SCHEMA_VERSION
+from .models import TestFeatures
+from .predictor import EyeTrackingPredictor, chunked
+
+logger = logging.getLogger(__name__)
+
+# Nombre de tests recalculés par passe
+REFRESH_CHUNK_SIZE = 500
+
+# Colonnes de EyeTrackingTest nécessaires au calcul des features
+FEATURE_SOURCE_FIELDS = ('id', 'duration', 'gaze_time', 'fixation_count', 'uuid', 'raw_data')
+
+VECTOR_DTYPE = np.float64
+
+
+def store_features(tests: List[EyeTrackingTest]) -> np.ndarray:
+    """Calcule et enregistre les features d'un lot de tests
+
+    Le calcul ne nécessite pas le modèle : il peut être fait dans la requête.
+
+    Returns:
+        La matrice calculée, dans l'ordre des tests fournis
+    """
+    tests = list(tests)
+    if not tests:
+        return np.empty((0, len(FEATURE_NAMES)), dtype=VECTOR_DTYPE)
+
+    # raw_data déchiffré en un seul lot plutôt qu'à la lecture de chaque test
+    decrypt_fields(tests, 'raw_data')
+    matrix = EyeTrackingPredictor.extract_feature_matrix(tests)
+    now = timezone.now()
+    TestFeatures.objects.bulk_create(
+        [
+            TestFeatures(
+                test_id=test.pk,
+                schema_version=FEATURE_SCHEMA_VERSION,
+                vector=row.astype(VECTOR_DTYPE).tobytes(),
+                computed_at=now,
+            )
+            for test, row in zip(tests, matrix)
+        ],
+        update_conflicts=True,
+        unique_fields=['test'],
+        update_fields=['schema_version', 'vector', 'computed_at'],
+    )
+    return matrix
+
+
+def stale_tests():
+    """Tests sans features ou calculées avec une autre version du schéma"""
+    current = TestFeatures.objects.filter(schema_version=FEATURE_SCHEMA_VERSION)
+    return EyeTrackingTest.objects.exclude(
+        pk__in=current.values('test_id')
+    )
+
+
+def refresh_features(chunk_size: int = REFRESH_CHUNK_SIZE) -> int:
+    """Recalcule de manière incrémentale les features manquantes ou périmées
+
+    Returns:
+        Le nombre de tests recalculés
+    """
+    rows = stale_tests().only(*FEATURE_SOURCE_FIELDS).prefetch_related(
+        'gaze_recording'
+    ).order_by('id').iterator(chunk_size=chunk_size)
+    refreshed = 0
+    for chunk in chunked(rows, chunk_size):
+        store_features(chunk)
+        refreshed += len(chunk)
+    if refreshed:
+        logger.info("Features recalculées pour %s tests (schéma v%s)", refreshed, FEATURE_SCHEMA_VERSION)
+    return refreshed
+
+
+def _feature_rows(tests=None, fields: Iterable[str] = ()):
+    queryset = TestFeatures.objects.filter(schema_version=FEATURE_SCHEMA_VERSION)
+    if tests is not None:
+        queryset = queryset.filter(test__in=tests)
+    columns = ['test_id', *(f'test__{field}' for field in fields)]
+    return queryset.order_by('test_id').values_list('vector', *columns)
+
+
+def _decode(rows: list) -> np.ndarray:
+    if not rows:
+        return np.empty((0, len(FEATURE_NAMES)), dtype=VECTOR_DTYPE)
+    return np.frombuffer(
+        b''.join(bytes(row[0]) for row in rows), dtype=VECTOR_DTYPE
+    ).reshape(len(rows), len(FEATURE_NAMES))
+
+
+def load_feature_matrix(tests=None, fields: Iterable[str] = ()) -> Tuple[np.ndarray, list]:
+    """Lit les features à jour en une seule requête
+
+    Args:
+        tests: QuerySet de EyeTrackingTest à lire (tous les tests par défaut)
+        fields: Colonnes supplémentaires du test à renvoyer pour chaque ligne
+
+    Returns:
+        (matrice (n, len(FEATURE_NAMES)), liste des tuples (test_id, *fields))
+    """
+    rows = list(_feature_rows(tests, fields))
+    return _decode(rows), [row[1:] for row in rows]
+
+
+def count_features(tests=None) -> int:
+    """Nombre de vecteurs à jour (lignes de load_feature_matrix / iter_feature_matrix)"""
+    return _feature_rows(tests).count()
+
+
+def iter_feature_matrix(tests=None, fields: Iterable[str] = (),
+                        chunk_size: int = REFRESH_CHUNK_SIZE) -> Iterator[Tuple[np.ndarray, list]]:
+    """Comme load_feature_matrix, par blocs de chunk_size lignes
+
+    La table n'est jamais entièrement chargée : la mémoire reste constante
+    quel que soit le nombre de tests.
+    """
+    rows = _feature_rows(tests, fields).iterator(chunk_size=chunk_size)
+    for chunk in chunked(rows, chunk_size):
+        yield _decode(chunk), [row[1:] for row in chunk]
+
+
+def features_for(tests: List[EyeTrackingTest]) -> np.ndarray:
+    """Matrice des features d'un lot de tests, calculées au besoin
+
+    Les vecteurs absents ou périmés sont calculés et enregistrés au passage.
+    """
+    tests = list(tests)
+    matrix = np.empty((len(tests), len(FEATURE_NAMES)), dtype=VECTOR_DTYPE)
+    stored, ids = load_feature_matrix(EyeTrackingTest.objects.filter(pk__in=[t.pk for t in tests]))
+    index = {row[0]: i for i, row in enumerate(ids)}
+
+    missing = []
+    for i, test in enumerate(tests):
+        if test.pk in index:
+            matrix[i] = stored[index[test.pk]]
+        else:
+            missing.append(i)
+    if missing:
+        matrix[missing] = store_features([tests[i] for i in missing])
+    return matrix
@@ -0,0 +1,227 @@
+"""
+Extraction vectorisée des features du regard
+
+L'historique du regard envoyé par le frontend (targetDetector.ts, jusqu'à
+1000 points par test) est converti une seule fois en colonnes NumPy ; toutes
+les features sont ensuite calculées par opérations vectorisées.
+
+En base, l'historique est conservé au format binaire de GazeSamples.pack
+(colonnes float32/uint8 compressées) plutôt qu'en JSON.
+"""
+import struct
+import zlib
+
+import numpy as np
+from typing import Any, Dict, List
+
+# Taille de la fenêtre glissante utilisée pour la cohérence
+CONSISTENCY_WINDOW = 10
+
+# Features calculées pour chaque test et conservées dans le feature store
+# (ml.models.TestFeatures). Les 8 premières sont les entrées du modèle.
+# Toute modification de leur calcul ou de leur ordre impose d'incrémenter
+# FEATURE_SCHEMA_VERSION : les vecteurs périmés sont alors recalculés.
+# v2 : les points horodatés de raw_data (LAYOUT_TIMESTAMPS) sont pris en compte
+# v3 : points horodatés sans cible (has_target) : stabilité et cohérence neutres, comme en v1
+FEATURE_SCHEMA_VERSION = 3
+FEATURE_NAMES = [
+    'tracking_percentage',
+    'fixation_count',
+    'avg_fixation',
+    'left_eye_open',
+    'right_eye_open',
+    'gaze_stability',
+    'duration',
+    'gaze_time',
+    'gaze_consistency',
+]
+
+# Format binaire de l'historique : en-tête (magic, version, compression,
+# nombre de points) suivi des colonnes contiguës, dans l'ordre ci-dessous
+PACK_MAGIC = b'GZ'
+PACK_VERSION = 1
+PACK_HEADER = struct.Struct('<2sBBI')
+PACK_COLUMNS = (
+    ('timestamp', np.float64),
+    ('x', np.float32),
+    ('y', np.float32),
+    ('target_x', np.float32),
+    ('target_y', np.float32),
+    ('confidence', np.float32),
+    ('on_target', np.uint8),
+)
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+
+# Formats de l'historique dans le raw_data envoyé par le frontend
+LAYOUT_HISTORY = 'history'        # raw_data["gazeHistory"] = [{x, y, targetX, ...}] (targetDetector.ts)
+LAYOUT_TIMESTAMPS = 'timestamps'  # raw_data["<timestamp>"] = {x, y, confidence} (state.service.ts)
+
+
+class GazeSamples:
+    """Historique du regard stocké en colonnes NumPy
+
+    has_target est faux quand le format d'origine ne donne pas la cible
+    (LAYOUT_TIMESTAMPS) : on_target est alors inconnu, et non « hors cible ».
+    """
+
+    COLUMNS = ('x', 'y', 'target_x', 'target_y', 'on_target', 'timestamp', 'confidence')
+
+    __slots__ = COLUMNS + ('has_target',)
+
+    def __init__(self, x, y, target_x, target_y, on_target, timestamp, confidence, has_target=True):
+        self.has_target = has_target
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.target_x = np.asarray(target_x, dtype=np.float64)
+        self.target_y = np.asarray(target_y, dtype=np.float64)
+        self.on_target = np.asarray(on_target, dtype=bool)
+        self.timestamp = np.asarray(timestamp, dtype=np.float64)
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+
+    @classmethod
+    def from_history(cls, gaze_history: List[Dict[str, Any]], has_target: bool = True) -> 'GazeSamples':
+        """Convertit la liste de points JSON en colonnes (un seul parcours)"""
+        if not gaze_history:
+            return cls.empty()
+
+        rows = np.array([
+            (
+                g.get('x', 0.0),
+                g.get('y', 0.0),
+                g.get('targetX', 0.0),
+                g.get('targetY', 0.0),
+                1.0 if g.get('onTarget', False) else 0.0,
+                g.get('timestamp', 0.0),
+                g.get('confidence', 1.0),
+            )
+            for g in gaze_history
+        ], dtype=np.float64)
+        return cls(*rows.T, has_target=has_target)
+
+    @classmethod
+    def empty(cls) -> 'GazeSamples':
+        return cls(*([] for _ in cls.COLUMNS))
+
+    def to_history(self) -> List[Dict[str, Any]]:
+        """Reconstruit la liste de points au format JSON du frontend"""
+        return [
+            {
+                'x': x, 'y': y, 'targetX': tx, 'targetY': ty,
+                'onTarget': on, 'timestamp': ts, 'confidence': c,
+            }
+            for x, y, tx, ty, on, ts, c in zip(
+                self.x.tolist(), self.y.tolist(), self.target_x.tolist(),
+                self.target_y.tolist(), self.on_target.tolist(),
+                self.timestamp.tolist(), self.confidence.tolist(),
+            )
+        ]
+
+    def pack(self, compress: bool = True) -> bytes:
+        """Encode l'historique en colonnes binaires (float32/uint8, timestamps en float64)"""
+        body = b''.join(
+            np.ascontiguousarray(getattr(self, name), dtype=dtype).tobytes()
+            for name, dtype in PACK_COLUMNS
+        )
+        compression = COMPRESSION_NONE
+        if compress:
+            body = zlib.compress(body)
+            compression = COMPRESSION_ZLIB
+        return PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, compression, len(self)) + body
+
+    @classmethod
+    def unpack(cls, data: bytes, has_target: bool = True) -> 'GazeSamples':
+        """Décode le format de pack() directement en colonnes NumPy"""
+        magic, version, compression, n = PACK_HEADER.unpack_from(data)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f"Format d'historique du regard inconnu ({magic!r}, v{version})")
+
+        body = memoryview(data)[PACK_HEADER.size:]
+        if compression == COMPRESSION_ZLIB:
+            body = zlib.decompress(body)
+
+        columns = {}
+        offset = 0
+        for name, dtype in PACK_COLUMNS:
+            columns[name] = np.frombuffer(body, dtype=dtype, count=n, offset=offset)
+            offset += n * np.dtype(dtype).itemsize
+        return cls(**columns, has_target=has_target)
+
+    def __len__(self):
+        return len(self.x)
+
+
+def split_gaze_history(raw_data: Dict[str, Any]):
+    """Sépare l'historique du regard du reste de raw_data
+
+    Returns:
+        (raw_data sans l'historique, liste de points au format gazeHistory, format d'origine)
+    """
+    rest = dict(raw_data or {})
+    if 'gazeHistory' in rest:
+        return rest, rest.pop('gazeHistory') or [], LAYOUT_HISTORY
+
+    timestamps = [key for key, value in rest.items() if key.isdigit() and isinstance(value, dict)]
+    if not timestamps:
+        return rest, [], LAYOUT_HISTORY
+    history = []
+    for key in timestamps:
+        point = rest.pop(key)
+        history.append({
+            'x': point.get('x', 0.0),
+            'y': point.get('y', 0.0),
+            'timestamp': float(key),
+            'confidence': point.get('confidence', 1.0),
+        })
+    return rest, history, LAYOUT_TIMESTAMPS
+
+
+def layout_has_target(layout: str) -> bool:
+    """Le format d'origine indique-t-il si chaque point est sur la cible ?"""
+    return layout != LAYOUT_TIMESTAMPS
+
+
+def merge_gaze_history(raw_data: Dict[str, Any], samples: GazeSamples, layout: str) -> Dict[str, Any]:
+    """Inverse de split_gaze_history : réintègre l'historique dans raw_data"""
+    merged = dict(raw_data)
+    if layout == LAYOUT_TIMESTAMPS:
+        for x, y, ts, c in zip(samples.x.tolist(), samples.y.tolist(),
+                               samples.timestamp.tolist(), samples.confidence.tolist()):
+            merged[str(int(ts))] = {'x': x, 'y': y, 'confidence': c}
+    else:
+        merged['gazeHistory'] = samples.to_history()
+    return merged
+
+
+def gaze_stability(samples: GazeSamples) -> float:
+    """Stabilité du regard sur la cible (0-1, 1 = très stable)"""
+    if len(samples) < 2 or not samples.has_target:
+        return 0.5
+
+    mask = samples.on_target
+    if np.count_nonzero(mask) < 2:
+        return 0.5
+
+    xs = samples.x[mask]
+    ys = samples.y[mask]
+    variance = np.mean((xs - xs.mean()) ** 2 + (ys - ys.mean()) ** 2)
+    std_dev = np.sqrt(variance)
+
+    return float(max(0.0, 1 - (std_dev / 100)))
+
+
+def gaze_consistency(samples: GazeSamples, window: int = CONSISTENCY_WINDOW) -> float:
+    """Cohérence du suivi : moyenne de la part de points sur la cible par fenêtre glissante"""
+    n = len(samples)
+    if n < window or not samples.has_target:
+        return 0.5
+
+    n_windows = n - window
+    if n_windows == 0:
+        return 0.5
+
+    # Somme glissante par différence de sommes cumulées : O(n)
+    cumsum = np.concatenate(([0], np.cumsum(samples.on_target, dtype=np.int64)))
+    window_sums = cumsum[window:window + n_windows] - cumsum[:n_windows]
+
+    return float(window_sums.mean() / window)
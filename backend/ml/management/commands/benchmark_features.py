@@ -0,0 +1,92 @@
+"""
+Compare l'extraction vectorisée des features du regard (ml.features) à
+l'implémentation historique en boucles Python.
+
+    python manage.py benchmark_features --points 1000
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from ml.features import GazeSamples, gaze_consistency, gaze_stability
+
+
+def legacy_stability(gaze_history):
+    """Implémentation historique de EyeTrackingPredictor._calculate_stability"""
+    if len(gaze_history) < 2:
+        return 0.5
+    on_target_gazes = [g for g in gaze_history if g.get('onTarget', False)]
+    if len(on_target_gazes) < 2:
+        return 0.5
+    xs = [g['x'] for g in on_target_gazes]
+    ys = [g['y'] for g in on_target_gazes]
+    mean_x = np.mean(xs)
+    mean_y = np.mean(ys)
+    variance = np.mean([(x - mean_x)**2 + (y - mean_y)**2 for x, y in zip(xs, ys)])
+    return max(0, 1 - (np.sqrt(variance) / 100))
+
+
+def legacy_consistency(gaze_history):
+    """Implémentation historique de EyeTrackingPredictor._calculate_consistency"""
+    if len(gaze_history) < 10:
+        return 0.5
+    consistency_scores = []
+    window_size = 10
+    for i in range(len(gaze_history) - window_size):
+        window = gaze_history[i:i + window_size]
+        on_target_count = sum(1 for g in window if g.get('onTarget', False))
+        consistency_scores.append(on_target_count / window_size)
+    return float(np.mean(consistency_scores)) if consistency_scores else 0.5
+
+
+def make_history(n_points, rng):
+    """Historique synthétique au format de targetDetector.ts"""
+    return [
+        {
+            'x': float(rng.normal(400, 30)),
+            'y': float(rng.normal(300, 30)),
+            'targetX': 400.0,
+            'targetY': 300.0,
+            'onTarget': bool(rng.random() < 0.7),
+            'timestamp': 16.7 * i,
+        }
+        for i in range(n_points)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark des features du regard : boucles Python vs NumPy vectorisé"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=1000, help="Points par historique")
+        parser.add_argument('--repeat', type=int, default=200, help="Nombre de répétitions")
+
+    def handle(self, *args, **options):
+        history = make_history(options['points'], np.random.default_rng(42))
+        repeat = options['repeat']
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            legacy = (legacy_stability(history), legacy_consistency(history))
+        legacy_seconds = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            samples = GazeSamples.from_history(history)
+        parse_seconds = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            vectorized = (gaze_stability(samples), gaze_consistency(samples))
+        compute_seconds = (time.perf_counter() - start) / repeat
+
+        self.stdout.write(f"Historique de {len(history)} points, {repeat} répétitions")
+        self.stdout.write(f"  boucles Python        : {legacy_seconds * 1e3:8.3f} ms")
+        self.stdout.write(f"  conversion colonnes   : {parse_seconds * 1e3:8.3f} ms")
+        self.stdout.write(f"  features vectorisées  : {compute_seconds * 1e3:8.3f} ms")
+        self.stdout.write(
+            f"  accélération totale   : x{legacy_seconds / (parse_seconds + compute_seconds):.1f}"
+        )
+        diff = max(abs(a - b) for a, b in zip(legacy, vectorized))
+        self.stdout.write(f"  écart maximal         : {diff:.2e}")
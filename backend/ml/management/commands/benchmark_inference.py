@@ -0,0 +1,110 @@
+"""
+Compare les backends d'inférence NumPy et Keras : latence par échantillon,
+débit par lot, mémoire résidente du worker et écart entre les sorties.
+
+    python manage.py benchmark_inference --samples 1000
+"""
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml.predictor import BACKEND_KERAS, BACKEND_NUMPY, N_FEATURES, EyeTrackingPredictor, NumpyClassifier
+from ml.registry import MODEL_FILENAME
+
+
+def current_rss_mb() -> float:
+    """Mémoire résidente actuelle du processus en Mo"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Repli : pic de mémoire (Ko sous Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = "Mesure la latence et la mémoire des backends d'inférence NumPy et Keras"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=1000,
+                            help="Nombre de prédictions unitaires à chronométrer")
+        parser.add_argument('--batch-size', type=int, default=256,
+                            help="Taille des lots pour la mesure de débit")
+        parser.add_argument('--backend', choices=[BACKEND_NUMPY, BACKEND_KERAS],
+                            help="Mesure un seul backend dans ce processus (sortie JSON)")
+
+    def handle(self, *args, **options):
+        model_path = Path(settings.ML_MODELS_LOCATION) / MODEL_FILENAME
+        if not model_path.exists():
+            raise CommandError(f"Aucun modèle entraîné ({model_path}) : lancer `manage.py train_model`")
+        rng = np.random.default_rng(42)
+        X = rng.normal(size=(max(options['samples'], options['batch_size']), N_FEATURES))
+
+        if options['backend']:
+            result = self._measure(options['backend'], model_path, X, options)
+            self.stdout.write(json.dumps(result))
+            return
+
+        # Chaque backend est mesuré dans un processus séparé pour isoler la RSS
+        results = []
+        for backend in (BACKEND_NUMPY, BACKEND_KERAS):
+            output = subprocess.run(
+                [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'benchmark_inference',
+                 '--backend', backend, '--samples', str(options['samples']),
+                 '--batch-size', str(options['batch_size'])],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+        self.stdout.write(f"{'backend':<8} {'chargement':>11} {'latence/éch.':>13} {'débit lot':>14} {'RSS':>9}")
+        for r in results:
+            self.stdout.write(
+                f"{r['backend']:<8} {r['load_seconds']:>10.3f}s {r['latency_us']:>11.1f}µs "
+                f"{r['batch_throughput']:>10.0f} /s {r['rss_mb']:>7.1f}Mo"
+            )
+
+        numpy_predictor = EyeTrackingPredictor(model_path=model_path, backend=BACKEND_NUMPY)
+        keras_predictor = EyeTrackingPredictor(model_path=model_path, backend=BACKEND_KERAS)
+        # Les deux doivent partager les mêmes poids (.npz éventuellement périmé sinon)
+        numpy_predictor.numpy_model = NumpyClassifier.from_keras(keras_predictor.model)
+        diff = np.abs(
+            numpy_predictor.predict_proba(X) - keras_predictor.predict_proba(X)
+        ).max()
+        self.stdout.write(f"Écart maximal des probabilités NumPy/Keras: {diff:.2e}")
+
+    def _measure(self, backend, model_path, X, options):
+        start = time.perf_counter()
+        predictor = EyeTrackingPredictor(model_path=model_path, backend=backend)
+        load_seconds = time.perf_counter() - start
+
+        # Échauffement (traçage du graphe côté Keras)
+        predictor.predict_proba(X[:1])
+
+        n = options['samples']
+        start = time.perf_counter()
+        for i in range(n):
+            predictor.predict_proba(X[i:i + 1])
+        latency = (time.perf_counter() - start) / n
+
+        batch = X[:options['batch_size']]
+        start = time.perf_counter()
+        predictor.predict_proba(batch)
+        batch_seconds = time.perf_counter() - start
+
+        return {
+            'backend': backend,
+            'load_seconds': load_seconds,
+            'latency_us': latency * 1e6,
+            'batch_throughput': len(batch) / batch_seconds,
+            'rss_mb': current_rss_mb(),
+        }
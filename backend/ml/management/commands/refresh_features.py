@@ -0,0 +1,32 @@
+"""
+Recalcul incrémental du feature store
+
+    python manage.py refresh_features
+    python manage.py refresh_features --all
+
+À lancer après une incrémentation de FEATURE_SCHEMA_VERSION : seuls les
+tests sans features ou calculées avec une autre version sont traités.
+"""
+from django.core.management.base import BaseCommand
+
+from ml.feature_store import REFRESH_CHUNK_SIZE, refresh_features
+from ml.features import FEATURE_SCHEMA_VERSION
+from ml.models import TestFeatures
+
+
+class Command(BaseCommand):
+    help = "Calcule les features manquantes ou périmées des tests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Recalcule les features de tous les tests")
+        parser.add_argument('--chunk-size', type=int, default=REFRESH_CHUNK_SIZE,
+                            help="Nombre de tests recalculés par passe")
+
+    def handle(self, *args, **options):
+        if options['all']:
+            TestFeatures.objects.all().delete()
+        refreshed = refresh_features(chunk_size=options['chunk_size'])
+        self.stdout.write(
+            f"{refreshed} test(s) recalculé(s) (schéma v{FEATURE_SCHEMA_VERSION})"
+        )
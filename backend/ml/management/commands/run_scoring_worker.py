@@ -0,0 +1,43 @@
+"""
+Worker de scoring ML dédié (ML_SCORING_MODE=worker)
+
+    python manage.py run_scoring_worker
+    python manage.py run_scoring_worker --once
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ml.registry import get_registry
+from ml.scoring import requeue_stale, score_pending
+
+
+class Command(BaseCommand):
+    help = "Score en continu les tests en attente de prédiction ML"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Vide la file une fois puis s'arrête")
+        parser.add_argument('--batch-size', type=int, default=settings.ML_SCORING_BATCH_SIZE,
+                            help="Nombre de tests prédits par passe")
+        parser.add_argument('--interval', type=float, default=settings.ML_SCORING_POLL_INTERVAL,
+                            help="Secondes entre deux interrogations de la file")
+
+    def handle(self, *args, **options):
+        get_registry().get()
+        self.stdout.write(f"Worker de scoring démarré (modèle {get_registry().version})")
+
+        while True:
+            try:
+                requeue_stale()
+                scored = score_pending(options['batch_size'])
+                if scored:
+                    self.stdout.write(f"{scored} test(s) scoré(s)")
+            finally:
+                close_old_connections()
+
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+"""
+Entraîne le modèle ML au premier plan (cron, déploiement)
+
+    python manage.py train_model --epochs 50
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from ml.models import TrainingJob
+from ml.training import expire_stale_jobs, run_training_job
+
+
+class Command(BaseCommand):
+    help = "Entraîne le modèle ML sur les tests en base et installe les nouveaux artefacts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--epochs', type=int, default=50, help="Nombre d'epochs")
+
+    def handle(self, *args, **options):
+        expire_stale_jobs()
+        if TrainingJob.objects.filter(status__in=TrainingJob.ACTIVE_STATUSES).exists():
+            raise CommandError("Un entraînement est déjà en cours")
+
+        job = TrainingJob.objects.create(epochs=options['epochs'])
+        self.stdout.write(f"Entraînement {job.pk} démarré")
+        job = run_training_job(job.pk)
+
+        if job.status != TrainingJob.SUCCEEDED:
+            raise CommandError(f"Entraînement {job.pk} : {job.status} {job.error}".strip())
+        self.stdout.write(
+            f"Entraînement {job.pk} terminé : {job.n_samples} tests, modèle {job.model_version}"
+        )
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.8 on 2026-10-17 02:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrainingJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "En file"),
+                            ("running", "En cours"),
+                            ("succeeded", "Terminé"),
+                            ("failed", "Échec"),
+                            ("cancelled", "Annulé"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                    ),
+                ),
+                ("epochs", models.IntegerField(default=50)),
+                ("current_epoch", models.IntegerField(default=0)),
+                ("n_samples", models.IntegerField(default=0)),
+                (
+                    "metrics",
+                    models.JSONField(
+                        default=list, help_text="Métriques Keras de chaque epoch"
+                    ),
+                ),
+                ("cancel_requested", models.BooleanField(default=False)),
+                ("error", models.TextField(blank=True, default="")),
+                (
+                    "model_version",
+                    models.CharField(blank=True, default="", max_length=32),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Entraînement ML",
+                "verbose_name_plural": "Entraînements ML",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.8 on 2026-10-17 03:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_eyetrackingtest_ml_status"),
+        ("ml", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TestFeatures",
+            fields=[
+                (
+                    "test",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stored_features",
+                        serialize=False,
+                        to="api.eyetrackingtest",
+                    ),
+                ),
+                ("schema_version", models.PositiveSmallIntegerField(db_index=True)),
+                ("vector", models.BinaryField()),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Features de test",
+                "verbose_name_plural": "Features de tests",
+            },
+        ),
+    ]
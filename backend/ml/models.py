@@ -0,0 +1,70 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class TrainingJob(models.Model):
+    """Entraînement du modèle ML exécuté en arrière-plan"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'En file'),
+        (RUNNING, 'En cours'),
+        (SUCCEEDED, 'Terminé'),
+        (FAILED, 'Échec'),
+        (CANCELLED, 'Annulé'),
+    ]
+
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    # Progression
+    epochs = models.IntegerField(default=50)
+    current_epoch = models.IntegerField(default=0)
+    n_samples = models.IntegerField(default=0)
+    metrics = models.JSONField(default=list, help_text="Métriques Keras de chaque epoch")
+
+    cancel_requested = models.BooleanField(default=False)
+    error = models.TextField(blank=True, default='')
+    model_version = models.CharField(max_length=32, blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Entraînement {self.id} - {self.status}"
+
+    class Meta:
+        verbose_name = 'Entraînement ML'
+        verbose_name_plural = 'Entraînements ML'
+        ordering = ['-created_at']
+
+
+class TestFeatures(models.Model):
+    """Features d'un test calculées une seule fois à l'ingestion (feature store)
+
+    Le vecteur est stocké en float64 brut (8 octets par feature, ordre de
+    ml.features.FEATURE_NAMES) ; schema_version identifie la version du calcul.
+    """
+    test = models.OneToOneField(
+        'api.EyeTrackingTest',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stored_features'
+    )
+    schema_version = models.PositiveSmallIntegerField(db_index=True)
+    vector = models.BinaryField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Features du test {self.test_id} (v{self.schema_version})"
+
+    class Meta:
+        verbose_name = 'Features de test'
+        verbose_name_plural = 'Features de tests'
@@ -1,39 +1,264 @@
 """
 Module de Machine Learning pour la prédiction des tests de suivi oculaire
+
+TensorFlow et scikit-learn ne sont importés qu'au premier appel qui en a
+besoin (entraînement, backend keras, bundle de prétraitement) : importer ce
+module ne coûte que NumPy.
 """
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import IsolationForest
-import tensorflow as tf
-from typing import Dict, List, Any
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Any, Optional
 import os
 from pathlib import Path
 
+from . import features as gaze_features
+from .features import FEATURE_NAMES, GazeSamples
+
+N_FEATURES = 8
+
+# Classes de sortie du classifieur, dans l'ordre des neurones de sortie
+RESULT_CLASSES = ['excellent', 'good', 'acceptable', 'poor']
+
+# Nombre de tests traités par passe avant dans predict_batch
+PREDICTION_CHUNK_SIZE = 256
+
+# Fichier de prétraitement enregistré à côté du modèle .h5
+PREPROCESSING_SUFFIX = '_preprocessing.joblib'
+PREPROCESSING_FORMAT_VERSION = 1
+
+
+def _tensorflow():
+    """Importe TensorFlow à la demande"""
+    import tensorflow as tf
+    return tf
+
+
+def _joblib():
+    """Importe joblib (fourni avec scikit-learn) à la demande"""
+    import joblib
+    return joblib
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List[Any]]:
+    """Découpe un itérable en listes de taille fixe (la dernière peut être plus courte)"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Backends d'inférence disponibles
+BACKEND_NUMPY = 'numpy'
+BACKEND_KERAS = 'keras'
+
+
+def preprocessing_path_for(model_path) -> Path:
+    """Retourne le chemin du bundle de prétraitement associé à un modèle"""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + PREPROCESSING_SUFFIX)
+
+
+def numpy_weights_path_for(model_path) -> Path:
+    """Retourne le chemin des poids .npz exportés pour un modèle"""
+    return Path(model_path).with_suffix('.npz')
+
+
+class NumpyClassifier:
+    """Passe avant du réseau dense exporté depuis Keras, en NumPy pur"""
+    
+    ACTIVATIONS = {
+        'linear': lambda x: x,
+        'relu': lambda x: np.maximum(x, 0),
+        'softmax': None,  # traitée à part pour la stabilité numérique
+    }
+    
+    def __init__(self, weights: List[np.ndarray], biases: List[np.ndarray], activations: List[str]):
+        for activation in activations:
+            if activation not in self.ACTIVATIONS:
+                raise ValueError(f"Activation non supportée: {activation}")
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.activations = list(activations)
+    
+    @classmethod
+    def from_keras(cls, model) -> 'NumpyClassifier':
+        """Extrait les poids des couches Dense (les Dropout sont inactifs à l'inférence)"""
+        weights, biases, activations = [], [], []
+        for layer in model.layers:
+            layer_weights = layer.get_weights()
+            if not layer_weights:
+                continue
+            kernel, bias = layer_weights
+            weights.append(kernel)
+            biases.append(bias)
+            activations.append(layer.get_config().get('activation', 'linear'))
+        return cls(weights, biases, activations)
+    
+    @classmethod
+    def load(cls, path) -> 'NumpyClassifier':
+        """Charge les poids depuis un fichier .npz"""
+        with np.load(path, allow_pickle=False) as data:
+            n_layers = int(data['n_layers'])
+            return cls(
+                [data[f'W{i}'] for i in range(n_layers)],
+                [data[f'b{i}'] for i in range(n_layers)],
+                [str(a) for a in data['activations']],
+            )
+    
+    def save(self, path):
+        """Écrit les poids dans un .npz compact (écriture atomique)"""
+        path = Path(path)
+        arrays = {'n_layers': np.array(len(self.weights)), 'activations': np.array(self.activations)}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f'W{i}'] = w
+            arrays[f'b{i}'] = b
+        tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Retourne les probabilités des classes pour chaque ligne de X"""
+        out = np.asarray(X, dtype=np.float32)
+        for w, b, activation in zip(self.weights, self.biases, self.activations):
+            out = out @ w
+            out += b
+            if activation == 'softmax':
+                out -= out.max(axis=1, keepdims=True)
+                np.exp(out, out=out)
+                out /= out.sum(axis=1, keepdims=True)
+            else:
+                out = self.ACTIVATIONS[activation](out)
+        return out
+
+
+class ModelUnavailable(RuntimeError):
+    """Aucun modèle entraîné n'est disponible pour prédire"""
+
+
 class EyeTrackingPredictor:
     """Classe principale pour les prédictions de suivi oculaire"""
     
-    def __init__(self):
-        self.model = None
-        self.scaler = StandardScaler()
-        self.anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
+    def __init__(self, model_path: Optional[Path] = None, backend: str = BACKEND_NUMPY):
+        if backend not in (BACKEND_NUMPY, BACKEND_KERAS):
+            raise ValueError(f"Backend d'inférence inconnu: {backend}")
+        self.backend = backend
+        self._keras_model = None
+        self.numpy_model = None
+        self.model_path = Path(model_path) if model_path else Path(__file__).parent.parent / 'ml_models' / 'eye_tracking_model.h5'
+        self.scaler = None
+        self.anomaly_detector = None
+        # Statistiques de normalisation (identité tant qu'aucun bundle n'est chargé)
+        self.feature_mean = np.zeros(N_FEATURES)
+        self.feature_scale = np.ones(N_FEATURES)
+        self.preprocessing_version = None
         self.load_model()
     
+    @property
+    def model(self):
+        """Modèle Keras, chargé à la demande (entraînement, export, backend keras)"""
+        if self._keras_model is None:
+            self._keras_model = self._load_keras_model()
+        return self._keras_model
+    
     def load_model(self):
+        """Charge le modèle pour le backend d'inférence configuré"""
+        if self.backend == BACKEND_NUMPY:
+            self.numpy_model = self._load_numpy_model()
+        else:
+            self._keras_model = self._load_keras_model()
+        
+        self.load_preprocessing()
+    
+    def _load_keras_model(self):
         """Charge le modèle TensorFlow"""
-        model_path = Path(__file__).parent.parent / 'ml_models' / 'eye_tracking_model.h5'
+        model_path = self.model_path
         
         if model_path.exists():
             try:
-                self.model = tf.keras.models.load_model(str(model_path))
+                return _tensorflow().keras.models.load_model(str(model_path))
             except Exception as e:
                 print(f"Erreur lors du chargement du modèle: {e}")
-                self.model = self._create_default_model()
+                return self._create_default_model()
         else:
             print("Modèle non trouvé, utilisation du modèle par défaut")
-            self.model = self._create_default_model()
+            return self._create_default_model()
+    
+    def _load_numpy_model(self) -> Optional[NumpyClassifier]:
+        """Charge les poids .npz, en les (ré)exportant depuis le .h5 s'ils sont absents ou périmés
+        
+        None si aucun modèle entraîné n'est lisible : le modèle par défaut (poids
+        aléatoires) n'est jamais utilisé pour prédire et TensorFlow n'est pas
+        importé ; predict_proba lève alors ModelUnavailable.
+        """
+        npz_path = numpy_weights_path_for(self.model_path)
+        h5_mtime = self.model_path.stat().st_mtime if self.model_path.exists() else None
+        
+        if npz_path.exists() and (h5_mtime is None or npz_path.stat().st_mtime >= h5_mtime):
+            try:
+                return NumpyClassifier.load(npz_path)
+            except Exception as e:
+                print(f"Erreur lors du chargement des poids NumPy: {e}")
+        
+        if h5_mtime is None:
+            print("Modèle non trouvé, aucune prédiction avant un entraînement")
+            return None
+        try:
+            keras_model = _tensorflow().keras.models.load_model(str(self.model_path))
+        except Exception as e:
+            print(f"Erreur lors du chargement du modèle: {e}")
+            return None
+        
+        numpy_model = NumpyClassifier.from_keras(keras_model)
+        try:
+            numpy_model.save(npz_path)
+        except OSError as e:
+            print(f"Impossible d'exporter les poids NumPy: {e}")
+        return numpy_model
+    
+    @property
+    def model_available(self) -> bool:
+        """Un modèle entraîné est chargé (backend numpy) ou présent sur le disque (backend keras)"""
+        if self.backend == BACKEND_NUMPY:
+            return self.numpy_model is not None
+        return self.model_path.exists()
+    
+    def predict_proba(self, features_scaled: np.ndarray) -> np.ndarray:
+        """Probabilités des classes pour des features déjà normalisées"""
+        if self.numpy_model is not None:
+            return self.numpy_model.predict(features_scaled)
+        if self.backend == BACKEND_NUMPY:
+            raise ModelUnavailable(f"Aucun modèle entraîné ({self.model_path})")
+        return self.model.predict(features_scaled, verbose=0)
+    
+    def load_preprocessing(self):
+        """Charge le bundle de prétraitement (normalisation + détecteur d'anomalies)"""
+        bundle_path = preprocessing_path_for(self.model_path)
+        if not bundle_path.exists():
+            print("Prétraitement non trouvé, features utilisées sans normalisation")
+            return
+        
+        try:
+            bundle = _joblib().load(bundle_path)
+            if bundle.get('format_version') != PREPROCESSING_FORMAT_VERSION:
+                raise ValueError(f"version de format non supportée: {bundle.get('format_version')}")
+            self.feature_mean = np.asarray(bundle['mean'], dtype=np.float64)
+            self.feature_scale = np.asarray(bundle['scale'], dtype=np.float64)
+            self.anomaly_detector = bundle.get('anomaly_detector')
+            self.preprocessing_version = bundle.get('trained_at')
+        except Exception as e:
+            print(f"Erreur lors du chargement du prétraitement: {e}")
+    
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Applique la normalisation apprise à l'entraînement"""
+        return (np.asarray(X, dtype=np.float64) - self.feature_mean) / self.feature_scale
     
     def _create_default_model(self):
         """Crée un modèle par défaut"""
+        tf = _tensorflow()
         model = tf.keras.Sequential([
             tf.keras.layers.Dense(64, activation='relu', input_shape=(8,)),
             tf.keras.layers.Dropout(0.3),
@@ -49,8 +274,10 @@ class EyeTrackingPredictor:
         )
         return model
     
-    def extract_features(self, test_data: Dict[str, Any]) -> List[float]:
-        """Extrait les features du test"""
+    @staticmethod
+    def extract_features(test_data: Dict[str, Any],
+                         samples: Optional[GazeSamples] = None) -> List[float]:
+        """Extrait les features du test (samples : historique du regard déjà converti)"""
         raw_data = test_data.get('raw_data', {})
         
         # Features principales
@@ -70,8 +297,10 @@ class EyeTrackingPredictor:
         right_eye_open = 1 if eye_status.get('rightEyeOpen', False) else 0
         
         # Historique du regard
-        gaze_history = raw_data.get('gazeHistory', [])
-        gaze_stability = self._calculate_stability(gaze_history) if gaze_history else 0
+        if samples is None:
+            samples = GazeSamples.from_history(raw_data.get('gazeHistory', []))
+        # Sans cible connue (points horodatés), comme sans historique
+        gaze_stability = gaze_features.gaze_stability(samples) if len(samples) and samples.has_target else 0
         
         # Features: [tracking_percentage, fixation_count, avg_fixation, 
         #            left_eye_open, right_eye_open, gaze_stability, duration, gaze_time]
@@ -88,64 +317,103 @@ class EyeTrackingPredictor:
         
         return features
     
-    def _calculate_stability(self, gaze_history: List[Dict]) -> float:
-        """Calcule la stabilité du regard"""
-        if len(gaze_history) < 2:
-            return 0.5
+    def predict(self, test_data) -> Dict[str, Any]:
+        """Effectue une prédiction sur les données du test"""
+        return self.predict_batch([test_data])[0]
+    
+    @classmethod
+    def extract_feature_matrix(cls, tests: List[Any]) -> np.ndarray:
+        """
+        Calcule la matrice des features de chaque test (colonnes : FEATURE_NAMES)
         
-        on_target_gazes = [g for g in gaze_history if g.get('onTarget', False)]
-        if len(on_target_gazes) < 2:
-            return 0.5
+        Ne dépend pas du modèle chargé. L'historique du regard de chaque test
+        n'est converti qu'une fois.
+        """
+        matrix = np.empty((len(tests), len(FEATURE_NAMES)), dtype=np.float64)
+        for i, test_data in enumerate(tests):
+            samples = getattr(test_data, 'gaze_samples', None)
+            if samples is None:
+                samples = GazeSamples.from_history(test_data.raw_data.get('gazeHistory', []))
+            matrix[i, :N_FEATURES] = cls.extract_features({
+                'duration': test_data.duration,
+                'gaze_time': test_data.gaze_time,
+                'fixation_count': test_data.fixation_count,
+                'raw_data': test_data.raw_data
+            }, samples=samples)
+            matrix[i, N_FEATURES] = gaze_features.gaze_consistency(samples)
+        return matrix
+    
+    def predict_batch(self, tests: Iterable, chunk_size: int = PREDICTION_CHUNK_SIZE) -> List[Dict[str, Any]]:
+        """
+        Effectue les prédictions d'un ensemble de tests
         
-        xs = [g['x'] for g in on_target_gazes]
-        ys = [g['y'] for g in on_target_gazes]
+        Les features sont regroupées en matrice et le classifieur comme le
+        détecteur d'anomalies traitent des blocs de chunk_size lignes.
         
-        mean_x = np.mean(xs)
-        mean_y = np.mean(ys)
+        Returns:
+            Les prédictions, dans l'ordre des tests fournis
+        """
+        results = []
+        for chunk in chunked(tests, chunk_size):
+            results.extend(self._predict_chunk(self.extract_feature_matrix(chunk)))
+        return results
+    
+    def predict_features(self, matrix: np.ndarray, chunk_size: int = PREDICTION_CHUNK_SIZE) -> List[Dict[str, Any]]:
+        """
+        Effectue les prédictions à partir de features déjà calculées
         
-        variance = np.mean([(x - mean_x)**2 + (y - mean_y)**2 for x, y in zip(xs, ys)])
-        std_dev = np.sqrt(variance)
+        Args:
+            matrix: Matrice (n, len(FEATURE_NAMES)), par exemple lue dans le feature store
         
-        # Normalise la stabilité (0-1, 1 = très stable)
-        return max(0, 1 - (std_dev / 100))
+        Returns:
+            Les prédictions, dans l'ordre des lignes
+        """
+        results = []
+        for start in range(0, len(matrix), chunk_size):
+            results.extend(self._predict_chunk(matrix[start:start + chunk_size]))
+        return results
     
-    def predict(self, test_data) -> Dict[str, Any]:
-        """Effectue une prédiction sur les données du test"""
-        # Extrait les features
-        features = self.extract_features({
-            'duration': test_data.duration,
-            'gaze_time': test_data.gaze_time,
-            'fixation_count': test_data.fixation_count,
-            'raw_data': test_data.raw_data
-        })
-        
-        # Normalise les features
-        features_array = np.array(features).reshape(1, -1)
-        features_scaled = self.scaler.fit_transform(features_array)
+    def _predict_chunk(self, matrix: np.ndarray) -> List[Dict[str, Any]]:
+        # Normalise les features avec les statistiques d'entraînement
+        features_scaled = self.transform(matrix[:, :N_FEATURES])
         
         # Prédiction du modèle
-        prediction = self.model.predict(features_scaled, verbose=0)
-        predicted_class = np.argmax(prediction[0])
-        confidence_score = float(np.max(prediction[0]))
+        probabilities = self.predict_proba(features_scaled)
+        predicted_classes = np.argmax(probabilities, axis=1)
+        confidence_scores = np.max(probabilities, axis=1)
         
-        # Détection d'anomalies
-        anomaly_score = float(self.anomaly_detector.decision_function(features_scaled)[0])
-        anomaly_detected = self.anomaly_detector.predict(features_scaled)[0] == -1
+        # Détection d'anomalies (uniquement si un détecteur entraîné est disponible)
+        if self.anomaly_detector is not None:
+            anomaly_scores = self.anomaly_detector.decision_function(features_scaled)
+        else:
+            anomaly_scores = np.zeros(len(matrix))
         
-        # Résultat
-        result_map = ['excellent', 'good', 'acceptable', 'poor']
-        result = result_map[predicted_class]
+        return [
+            self._build_result(
+                row, predicted_class, confidence_score, anomaly_score,
+                self.anomaly_detector is not None and anomaly_score < 0
+            )
+            for row, predicted_class, confidence_score, anomaly_score in zip(
+                matrix, predicted_classes, confidence_scores, anomaly_scores
+            )
+        ]
+    
+    def _build_result(self, row: np.ndarray, predicted_class: int, confidence_score: float,
+                      anomaly_score: float, anomaly_detected: bool) -> Dict[str, Any]:
+        """Construit le résultat d'une prédiction à partir d'une ligne de features"""
+        result = RESULT_CLASSES[int(predicted_class)]
         
         # Calcul du pourcentage de suivi
-        tracking_percentage = features[0]
-        gaze_stability = features[5]
-        gaze_consistency = self._calculate_consistency(test_data.raw_data.get('gazeHistory', []))
+        tracking_percentage = float(row[0])
+        fixation_count = int(row[1])
+        gaze_stability = float(row[5])
+        gaze_consistency = float(row[N_FEATURES])
         
         # Évaluation clinique
         clinical_evaluation = self._generate_clinical_evaluation(
             tracking_percentage,
             gaze_stability,
-            test_data.fixation_count
+            fixation_count
         )
         
         # Recommandation de suivi
@@ -153,17 +421,17 @@ class EyeTrackingPredictor:
         
         return {
             'result': result,
-            'confidence': confidence_score,
+            'confidence': float(confidence_score),
             'features': {
-                'tracking_percentage': features[0],
-                'fixation_count': features[1],
-                'avg_fixation': features[2],
-                'left_eye_open': features[3],
-                'right_eye_open': features[4],
-                'gaze_stability': features[5]
+                'tracking_percentage': tracking_percentage,
+                'fixation_count': fixation_count,
+                'avg_fixation': float(row[2]),
+                'left_eye_open': int(row[3]),
+                'right_eye_open': int(row[4]),
+                'gaze_stability': gaze_stability
             },
             'anomaly_detected': bool(anomaly_detected),
-            'anomaly_score': anomaly_score,
+            'anomaly_score': float(anomaly_score),
             'tracking_percentage': tracking_percentage,
             'gaze_stability': gaze_stability,
             'gaze_consistency': gaze_consistency,
@@ -171,21 +439,6 @@ class EyeTrackingPredictor:
             'recommended_follow_up': recommended_follow_up
         }
     
-    def _calculate_consistency(self, gaze_history: List[Dict]) -> float:
-        """Calcule la cohérence du suivi"""
-        if len(gaze_history) < 10:
-            return 0.5
-        
-        consistency_scores = []
-        window_size = 10
-        
-        for i in range(len(gaze_history) - window_size):
-            window = gaze_history[i:i + window_size]
-            on_target_count = sum(1 for g in window if g.get('onTarget', False))
-            consistency_scores.append(on_target_count / window_size)
-        
-        return float(np.mean(consistency_scores)) if consistency_scores else 0.5
-    
     def _generate_clinical_evaluation(self, tracking_percentage: float, 
                                      gaze_stability: float, 
                                      fixation_count: int) -> str:
@@ -217,19 +470,48 @@ class EyeTrackingPredictor:
         return ' | '.join(evaluation)
     
     def train_model(self, X_train: np.ndarray, y_train: np.ndarray, 
-                   epochs: int = 50, batch_size: int = 32):
-        """Entraîne le modèle sur de nouvelles données"""
+                   epochs: int = 50, batch_size: int = 32, callbacks: Optional[List[Any]] = None,
+                   verbose: int = 1):
+        """Entraîne le modèle sur de nouvelles données (callbacks : callbacks Keras)"""
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.ensemble import IsolationForest
+        
+        self.scaler = StandardScaler()
         X_scaled = self.scaler.fit_transform(X_train)
+        self.feature_mean = self.scaler.mean_
+        self.feature_scale = self.scaler.scale_
+        
+        # Le détecteur d'anomalies est ajusté sur les mêmes features normalisées
+        self.anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
+        self.anomaly_detector.fit(X_scaled)
+        self.preprocessing_version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
         
         self.model.fit(
             X_scaled, y_train,
             epochs=epochs,
             batch_size=batch_size,
             validation_split=0.2,
-            verbose=1
+            callbacks=callbacks,
+            verbose=verbose
         )
+        
+        if self.backend == BACKEND_NUMPY:
+            self.numpy_model = NumpyClassifier.from_keras(self.model)
     
     def save_model(self, path: str):
-        """Sauvegarde le modèle"""
+        """Sauvegarde le modèle, ses poids NumPy et son bundle de prétraitement"""
         self.model.save(path)
+        NumpyClassifier.from_keras(self.model).save(numpy_weights_path_for(path))
+        self.save_preprocessing(preprocessing_path_for(path))
         print(f"Modèle sauvegardé à {path}")
+    
+    def save_preprocessing(self, path):
+        """Sauvegarde la normalisation et le détecteur d'anomalies dans un bundle versionné"""
+        _joblib().dump({
+            'format_version': PREPROCESSING_FORMAT_VERSION,
+            'trained_at': self.preprocessing_version,
+            'n_features': N_FEATURES,
+            'mean': self.feature_mean,
+            'scale': self.feature_scale,
+            'anomaly_detector': self.anomaly_detector,
+        }, path)
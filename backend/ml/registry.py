@@ -0,0 +1,193 @@
+"""
+Registre des modèles ML partagé par processus
+
+Charge l'EyeTrackingPredictor une seule fois par worker gunicorn, le met à
+disposition de tous les threads et le recharge en arrière-plan lorsque le
+fichier du modèle ou son bundle de prétraitement change sur le disque.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILENAME = 'eye_tracking_model.h5'
+
+
+class ModelRegistry:
+    """Registre thread-safe détenant l'instance partagée du prédicteur"""
+
+    def __init__(self, model_path: Optional[Path] = None, reload_interval: Optional[float] = None):
+        self.model_path = Path(model_path or Path(settings.ML_MODELS_LOCATION) / MODEL_FILENAME)
+        if reload_interval is None:
+            reload_interval = getattr(settings, 'ML_MODEL_RELOAD_INTERVAL', 30)
+        self.reload_interval = reload_interval
+        self.backend = getattr(settings, 'ML_INFERENCE_BACKEND', 'numpy')
+
+        self._lock = threading.Lock()
+        self._predictor = None
+        self._fingerprint = None
+        self._loaded_at = None
+        self._load_time = None
+        self._pid = None
+        self._watcher = None
+        self._stop = threading.Event()
+
+    @property
+    def artifact_paths(self):
+        """Fichiers dont la modification déclenche un rechargement"""
+        from .predictor import numpy_weights_path_for, preprocessing_path_for
+
+        return [
+            self.model_path,
+            numpy_weights_path_for(self.model_path),
+            preprocessing_path_for(self.model_path),
+        ]
+
+    def _current_fingerprint(self):
+        """Retourne (mtime_ns, taille) des artefacts du modèle, ou None si aucun n'existe"""
+        fingerprint = []
+        for path in self.artifact_paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                fingerprint.append(None)
+                continue
+            fingerprint.append((stat.st_mtime_ns, stat.st_size))
+        if not any(fingerprint):
+            return None
+        return tuple(fingerprint)
+
+    def _check_process(self):
+        """Réinitialise l'état hérité d'un fork (gunicorn --preload)"""
+        pid = os.getpid()
+        if self._pid != pid:
+            self._pid = pid
+            self._predictor = None
+            self._watcher = None
+            self._stop = threading.Event()
+
+    def _load(self):
+        """Charge un nouveau prédicteur sans toucher à l'instance partagée"""
+        from .predictor import EyeTrackingPredictor
+
+        start = time.perf_counter()
+        predictor = EyeTrackingPredictor(model_path=self.model_path, backend=self.backend)
+        load_time = time.perf_counter() - start
+        # Empreinte relevée après le chargement : le prédicteur peut exporter
+        # lui-même les poids .npz, ce qui ne doit pas déclencher de rechargement
+        fingerprint = self._current_fingerprint()
+        return predictor, fingerprint, load_time
+
+    def _swap(self, predictor, fingerprint, load_time):
+        self._predictor = predictor
+        self._fingerprint = fingerprint
+        self._load_time = load_time
+        self._loaded_at = datetime.now(timezone.utc)
+        logger.info(
+            "Modèle ML chargé (version %s) en %.3fs", self.version, load_time
+        )
+
+    def get(self):
+        """Retourne le prédicteur partagé, en le chargeant au premier appel"""
+        predictor = self._predictor
+        if predictor is not None and self._pid == os.getpid():
+            return predictor
+
+        with self._lock:
+            self._check_process()
+            if self._predictor is None:
+                self._swap(*self._load())
+                self._start_watcher()
+            return self._predictor
+
+    def reload(self):
+        """Recharge le modèle depuis le disque et remplace l'instance partagée"""
+        predictor, fingerprint, load_time = self._load()
+        with self._lock:
+            self._check_process()
+            self._swap(predictor, fingerprint, load_time)
+            self._start_watcher()
+        return predictor
+
+    def warm_up(self):
+        """Charge le modèle dans un thread d'arrière-plan"""
+        thread = threading.Thread(target=self.get, name='ml-registry-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def _start_watcher(self):
+        if self._watcher is not None or not self.reload_interval:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, name='ml-registry-watcher', daemon=True
+        )
+        self._watcher.start()
+
+    def _watch(self):
+        """Surveille le fichier du modèle et recharge à chaque modification"""
+        stop = self._stop
+        while not stop.wait(self.reload_interval):
+            fingerprint = self._current_fingerprint()
+            if fingerprint == self._fingerprint:
+                continue
+            try:
+                self.reload()
+            except Exception:
+                logger.exception("Échec du rechargement du modèle ML, conservation de la version courante")
+                # Évite de retenter en boucle sur un fichier corrompu
+                self._fingerprint = fingerprint
+
+    def stop(self):
+        """Arrête la surveillance du fichier du modèle"""
+        self._stop.set()
+
+    @property
+    def version(self) -> str:
+        """Version du modèle chargé (date de modification la plus récente des artefacts)"""
+        if self._predictor is None:
+            return None
+        if self._fingerprint is None:
+            return 'default'
+        mtime_ns = max(entry[0] for entry in self._fingerprint if entry)
+        mtime = datetime.fromtimestamp(mtime_ns / 1e9, tz=timezone.utc)
+        return mtime.strftime('%Y%m%dT%H%M%SZ')
+
+    def status(self) -> Dict[str, Any]:
+        """Retourne l'état du modèle chargé dans ce worker"""
+        return {
+            'loaded': self._predictor is not None,
+            'model_available': getattr(self._predictor, 'model_available', False),
+            'version': self.version,
+            'model_path': str(self.model_path),
+            'loaded_at': self._loaded_at.isoformat() if self._loaded_at else None,
+            'load_time_seconds': round(self._load_time, 4) if self._load_time is not None else None,
+            'preprocessing_version': getattr(self._predictor, 'preprocessing_version', None),
+            'backend': self.backend,
+            'pid': os.getpid(),
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Retourne le registre de modèles du processus"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+
+def get_predictor():
+    """Raccourci vers le prédicteur partagé du processus"""
+    return get_registry().get()
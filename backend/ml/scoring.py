@@ -0,0 +1,261 @@
+"""
+File d'attente de scoring ML
+
+Les tests sont enregistrés avec le statut « pending » ; le scoring est fait
+hors de la requête HTTP par un pool de threads du processus (mode 'thread')
+ou par `python manage.py run_scoring_worker` (mode 'worker'). La base de
+données sert de file : chaque worker réclame un lot de tests en attente,
+les prédit en une passe (predict_batch) puis écrit les MLPrediction.
+"""
+import logging
+import os
+import threading
+import uuid
+from datetime import timedelta
+from typing import List
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from api.models import EyeTrackingTest, MLPrediction
+from api.response_cache import invalidate_patients
+from .feature_store import features_for
+from .registry import get_predictor
+
+logger = logging.getLogger(__name__)
+
+SCORING_MODE_THREAD = 'thread'
+SCORING_MODE_WORKER = 'worker'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def requeue_stale(stale_after: float = None) -> int:
+    """Remet en attente les tests réclamés par un worker qui n'a jamais terminé"""
+    if stale_after is None:
+        stale_after = _setting('ML_SCORING_STALE_AFTER', 600)
+    deadline = timezone.now() - timedelta(seconds=stale_after)
+    stale = EyeTrackingTest.objects.filter(
+        ml_status=EyeTrackingTest.ML_PROCESSING,
+        ml_claimed_at__lt=deadline,
+    )
+    patient_ids = set(stale.values_list('patient_id', flat=True))
+    if not patient_ids:
+        return 0
+    requeued = stale.update(ml_status=EyeTrackingTest.ML_PENDING, ml_claimed_at=None, ml_claim_token=None)
+    # QuerySet.update n'émet pas de signal : les réponses en cache ne doivent
+    # plus afficher « processing »
+    invalidate_patients(patient_ids)
+    return requeued
+
+
+def _pending_ids(limit: int) -> List[int]:
+    """Tests en attente les plus anciens (à appeler dans une transaction)"""
+    pending = EyeTrackingTest.objects.filter(
+        ml_status=EyeTrackingTest.ML_PENDING
+    ).order_by('created_at')
+    if connection.features.has_select_for_update_skip_locked:
+        # PostgreSQL : plusieurs workers se partagent la file sans se bloquer
+        pending = pending.select_for_update(skip_locked=True)
+    return list(pending.values_list('id', flat=True)[:limit])
+
+
+def claim_pending(limit: int) -> List[EyeTrackingTest]:
+    """Réclame au plus `limit` tests en attente pour ce worker
+
+    La réclamation est un UPDATE conditionnel (statut toujours « pending »)
+    qui pose un jeton propre à l'appel ; seuls les tests portant ce jeton
+    sont retournés. Deux workers qui lisent les mêmes tests en attente (SQLite,
+    sans SELECT ... FOR UPDATE SKIP LOCKED) ne scorent donc jamais deux fois
+    le même test.
+    """
+    token = uuid.uuid4()
+    with transaction.atomic():
+        ids = _pending_ids(limit)
+        if not ids:
+            return []
+        claimed = EyeTrackingTest.objects.filter(
+            id__in=ids, ml_status=EyeTrackingTest.ML_PENDING
+        ).update(
+            ml_status=EyeTrackingTest.ML_PROCESSING,
+            ml_claimed_at=timezone.now(),
+            ml_claim_token=token,
+        )
+    if not claimed:
+        return []
+
+    # Les features sont lues dans le feature store : raw_data n'est chargé
+    # qu'à la demande, pour un test dont les features manqueraient
+    tests = list(
+        EyeTrackingTest.objects.filter(id__in=ids, ml_claim_token=token)
+        .defer('raw_data')
+        .order_by('created_at')
+    )
+    # QuerySet.update n'émet pas de signal : le statut « processing » doit
+    # apparaître dans les réponses en cache
+    invalidate_patients({test.patient_id for test in tests})
+    return tests
+
+
+def _save_prediction(test: EyeTrackingTest, prediction):
+    """Écrit la MLPrediction et met à jour le test"""
+    with transaction.atomic():
+        MLPrediction.objects.update_or_create(
+            test=test,
+            defaults={
+                'predicted_result': prediction['result'],
+                'confidence_score': prediction['confidence'],
+                'features': prediction.get('features', {}),
+                'anomaly_detected': prediction.get('anomaly_detected', False),
+                'anomaly_score': prediction.get('anomaly_score', 0.0),
+            }
+        )
+
+        test.result = prediction['result']
+        test.clinical_evaluation = prediction['clinical_evaluation']
+        test.recommended_follow_up = prediction['recommended_follow_up']
+        test.tracking_percentage = prediction.get('tracking_percentage', 0)
+        test.gaze_stability = prediction.get('gaze_stability', 0)
+        test.gaze_consistency = prediction.get('gaze_consistency', 0)
+        test.ml_status = EyeTrackingTest.ML_SCORED
+        test.ml_error = ''
+        test.save(update_fields=[
+            'result', 'clinical_evaluation', 'recommended_follow_up',
+            'tracking_percentage', 'gaze_stability', 'gaze_consistency',
+            'ml_status', 'ml_error', 'updated_at',
+        ])
+
+
+def _mark_failed(test: EyeTrackingTest, error: Exception):
+    logger.error("Échec du scoring ML du test %s: %s", test.pk, error)
+    test.ml_status = EyeTrackingTest.ML_FAILED
+    test.ml_error = str(error)[:1000]
+    test.save(update_fields=['ml_status', 'ml_error', 'updated_at'])
+
+
+def score_tests(tests: List[EyeTrackingTest]) -> int:
+    """Prédit un lot de tests en une passe et enregistre les résultats
+
+    Returns:
+        Le nombre de tests scorés avec succès
+    """
+    if not tests:
+        return 0
+
+    predictor = get_predictor()
+    try:
+        predictions = predictor.predict_features(features_for(tests))
+    except Exception:
+        # Un test invalide ne doit pas faire échouer tout le lot : repli test par test
+        logger.exception("Échec de la prédiction par lot, repli test par test")
+        predictions = []
+        for test in tests:
+            try:
+                predictions.append(predictor.predict(test))
+            except Exception as e:
+                predictions.append(e)
+
+    scored = 0
+    for test, prediction in zip(tests, predictions):
+        if isinstance(prediction, Exception):
+            _mark_failed(test, prediction)
+            continue
+        try:
+            _save_prediction(test, prediction)
+            scored += 1
+        except Exception as e:
+            logger.exception("Échec de l'enregistrement de la prédiction du test %s", test.pk)
+            _mark_failed(test, e)
+    return scored
+
+
+def score_pending(batch_size: int = None) -> int:
+    """Score tous les tests en attente, lot par lot
+
+    Returns:
+        Le nombre de tests scorés avec succès
+    """
+    batch_size = batch_size or _setting('ML_SCORING_BATCH_SIZE', 64)
+    if not get_predictor().model_available:
+        # Sans modèle entraîné, les tests restent en attente : le registre
+        # recharge le prédicteur dès qu'un entraînement écrit le modèle
+        logger.debug("Aucun modèle ML entraîné, scoring différé")
+        return 0
+    scored = 0
+    while True:
+        tests = claim_pending(batch_size)
+        if not tests:
+            return scored
+        scored += score_tests(tests)
+
+
+class ScoringQueue:
+    """Pool de threads du processus qui vide la file des tests en attente"""
+
+    def __init__(self, threads: int = None, poll_interval: float = None):
+        self.threads = threads or _setting('ML_SCORING_THREADS', 1)
+        self.poll_interval = poll_interval or _setting('ML_SCORING_POLL_INTERVAL', 5.0)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._pid = None
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._workers:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._workers:
+                return
+            # Nouveau processus (fork gunicorn) : les threads du parent n'existent plus
+            self._pid = os.getpid()
+            self._wakeup = threading.Event()
+            self._workers = [
+                threading.Thread(target=self._run, name=f'ml-scoring-{i}', daemon=True)
+                for i in range(self.threads)
+            ]
+            for worker in self._workers:
+                worker.start()
+
+    def notify(self):
+        """Signale que des tests attendent d'être scorés"""
+        self._ensure_started()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                requeue_stale()
+                score_pending()
+            except Exception:
+                logger.exception("Erreur dans le worker de scoring ML")
+            finally:
+                close_old_connections()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> ScoringQueue:
+    """Retourne le pool de scoring du processus"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = ScoringQueue()
+    return _queue
+
+
+def enqueue_scoring():
+    """Planifie le scoring des tests en attente
+
+    Les tests sont déjà marqués « pending » en base ; en mode 'worker', le
+    processus `run_scoring_worker` les prendra à sa prochaine interrogation.
+    """
+    if _setting('ML_SCORING_MODE', SCORING_MODE_THREAD) == SCORING_MODE_THREAD:
+        get_queue().notify()
@@ -0,0 +1,29 @@
+from rest_framework import serializers
+from .models import TrainingJob
+
+
+class TrainingJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TrainingJob
+        fields = [
+            'id',
+            'status',
+            'epochs',
+            'current_epoch',
+            'progress',
+            'n_samples',
+            'metrics',
+            'cancel_requested',
+            'error',
+            'model_version',
+            'created_at',
+            'started_at',
+            'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        """Avancement en pourcentage des epochs"""
+        return round(obj.current_epoch / obj.epochs * 100, 1) if obj.epochs else 0
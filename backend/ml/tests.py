@@ -0,0 +1,133 @@
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from api.ingestion import test_fields
+from api.models import EyeTrackingTest, Patient
+
+from .feature_store import load_feature_matrix
+from .features import (
+    FEATURE_NAMES, LAYOUT_TIMESTAMPS, GazeSamples, layout_has_target, split_gaze_history
+)
+from .predictor import N_FEATURES, RESULT_CLASSES, EyeTrackingPredictor, ModelUnavailable
+from .scoring import claim_pending
+from .training import load_training_data, training_queryset
+
+
+def timestamp_payload(n_points=217):
+    """raw_data au format de state.service.ts : points horodatés, sans cible"""
+    raw_data = {
+        str(1700000000000 + 50 * i): {'x': 400.0 + i % 7, 'y': 300.0 - i % 5, 'confidence': 0.9}
+        for i in range(n_points)
+    }
+    raw_data['eyeStatus'] = {'leftEyeOpen': True, 'rightEyeOpen': True}
+    return raw_data
+
+
+class TimestampLayoutFeaturesTest(SimpleTestCase):
+    """Les points horodatés n'indiquent pas la cible : features neutres, comme sans historique"""
+
+    def features(self, samples, raw_data):
+        test = SimpleNamespace(
+            duration=17.8, gaze_time=0.0, fixation_count=0, raw_data=raw_data, gaze_samples=samples
+        )
+        return dict(zip(FEATURE_NAMES, EyeTrackingPredictor.extract_feature_matrix([test])[0]))
+
+    def test_split_keeps_every_point(self):
+        rest, history, layout = split_gaze_history(timestamp_payload())
+        self.assertEqual(layout, LAYOUT_TIMESTAMPS)
+        self.assertEqual(len(history), 217)
+        self.assertEqual(rest, {'eyeStatus': {'leftEyeOpen': True, 'rightEyeOpen': True}})
+
+    def test_features_match_payload_without_history(self):
+        rest, history, layout = split_gaze_history(timestamp_payload())
+        samples = GazeSamples.from_history(history, has_target=layout_has_target(layout))
+        stored = GazeSamples.unpack(samples.pack(), has_target=layout_has_target(layout))
+
+        expected = self.features(GazeSamples.empty(), rest)
+        self.assertEqual(expected['gaze_stability'], 0.0)
+        self.assertEqual(expected['gaze_consistency'], 0.5)
+        for candidate in (samples, stored):
+            self.assertFalse(candidate.has_target)
+            self.assertEqual(self.features(candidate, rest), expected)
+
+    def test_history_layout_still_uses_on_target(self):
+        history = [
+            {'x': 400.0, 'y': 300.0, 'onTarget': i < 30, 'timestamp': float(i)}
+            for i in range(40)
+        ]
+        features = self.features(GazeSamples.from_history(history), {})
+        self.assertAlmostEqual(features['gaze_consistency'], 0.85)
+        self.assertEqual(features['gaze_stability'], 1.0)
+
+
+class ClaimPendingTest(TestCase):
+    """Un test en attente n'est réclamé que par un seul worker"""
+
+    def setUp(self):
+        user = User.objects.create_user('claim', 'claim@example.com', 'secret-pass')
+        patient = Patient.objects.create(user=user)
+        self.tests = [
+            EyeTrackingTest.objects.create(patient=patient, **test_fields({'duration': 10})[0])
+            for _ in range(3)
+        ]
+
+    def test_claims_oldest_pending_tests(self):
+        claimed = claim_pending(2)
+        self.assertEqual([t.id for t in claimed], [t.id for t in self.tests[:2]])
+        self.assertTrue(all(t.ml_status == EyeTrackingTest.ML_PROCESSING for t in claimed))
+
+    def test_concurrent_worker_keeps_only_its_own_claims(self):
+        first = claim_pending(2)
+        # Un second worker a lu la file avant la réclamation du premier
+        ids = [t.id for t in self.tests]
+        with mock.patch('ml.scoring._pending_ids', return_value=ids):
+            second = claim_pending(3)
+        self.assertEqual([t.id for t in second], [self.tests[2].id])
+        tokens = EyeTrackingTest.objects.filter(id__in=[t.id for t in first]).values_list(
+            'ml_claim_token', flat=True
+        )
+        self.assertEqual(len(set(tokens)), 1)
+        self.assertNotIn(second[0].ml_claim_token, set(tokens))
+
+
+class LoadTrainingDataTest(TestCase):
+    """X et y remplis bloc par bloc sont identiques à la lecture en une requête"""
+
+    def setUp(self):
+        user = User.objects.create_user('training', 'training@example.com')
+        patient = Patient.objects.create(user=user)
+        results = ['excellent', 'good', 'acceptable', 'poor', 'good']
+        for i, result in enumerate(results):
+            fields = test_fields({'duration': 10 + i, 'gaze_time': i, 'fixation_count': i})[0]
+            EyeTrackingTest.objects.create(
+                patient=patient, **{**fields, 'result': result, 'ml_status': EyeTrackingTest.ML_SCORED}
+            )
+        # Exclu : pas encore scoré
+        EyeTrackingTest.objects.create(patient=patient, **test_fields({'duration': 99})[0])
+
+    def test_chunks_fill_preallocated_arrays(self):
+        X, y = load_training_data(chunk_size=2)
+        matrix, rows = load_feature_matrix(training_queryset(), fields=('result',))
+        self.assertEqual(X.shape, (5, N_FEATURES))
+        self.assertTrue((X == matrix[:, :N_FEATURES]).all())
+        self.assertEqual([RESULT_CLASSES[i] for i in y.argmax(axis=1)], [result for _, result in rows])
+        self.assertTrue((y.sum(axis=1) == 1).all())
+
+
+class MissingModelTest(SimpleTestCase):
+    """Sans modèle entraîné, aucune prédiction n'est faite avec le modèle par défaut"""
+
+    def test_numpy_backend_reports_unavailable_model(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('ml.predictor._tensorflow') as tensorflow:
+            predictor = EyeTrackingPredictor(model_path=Path(directory) / 'eye_tracking_model.h5')
+            self.assertFalse(predictor.model_available)
+            with self.assertRaises(ModelUnavailable):
+                predictor.predict_features(np.zeros((2, len(FEATURE_NAMES))))
+        tensorflow.assert_not_called()
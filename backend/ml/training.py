@@ -0,0 +1,202 @@
+"""
+Entraînement du modèle ML en arrière-plan
+
+Un TrainingJob est exécuté dans un thread du processus (ou au premier plan
+via `python manage.py train_model`) : les features sont lues dans le feature
+store par blocs, dans des tableaux alloués une fois, la progression de chaque epoch est enregistrée sur le job, et les
+artefacts produits remplacent atomiquement ceux de ML_MODELS_LOCATION.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import EyeTrackingTest
+from .feature_store import VECTOR_DTYPE, count_features, iter_feature_matrix, refresh_features
+from .models import TrainingJob
+from .predictor import (
+    BACKEND_KERAS, N_FEATURES, RESULT_CLASSES, EyeTrackingPredictor,
+    numpy_weights_path_for, preprocessing_path_for,
+)
+from .registry import get_registry
+
+logger = logging.getLogger(__name__)
+
+# Nombre minimal de tests pour entraîner le modèle
+MIN_TRAINING_SAMPLES = 10
+# Vecteurs de features lus par requête
+TRAINING_CHUNK_SIZE = 1000
+
+
+class TrainingCancelled(Exception):
+    """Levée lorsque l'annulation du job est demandée"""
+
+
+def training_queryset():
+    """Tests utilisables pour l'entraînement (résultat définitif)"""
+    return EyeTrackingTest.objects.exclude(
+        ml_status__in=[EyeTrackingTest.ML_PENDING, EyeTrackingTest.ML_PROCESSING]
+    )
+
+
+def expire_stale_jobs(timeout: float = None) -> int:
+    """Marque en échec les entraînements restés actifs au-delà de ML_TRAINING_JOB_TIMEOUT
+
+    Le thread d'un job disparaît avec son processus (redémarrage) : le job
+    resterait sinon actif et bloquerait tout nouvel entraînement.
+    """
+    if timeout is None:
+        timeout = settings.ML_TRAINING_JOB_TIMEOUT
+    deadline = timezone.now() - timedelta(seconds=timeout)
+    return TrainingJob.objects.filter(status__in=TrainingJob.ACTIVE_STATUSES).filter(
+        Q(started_at__lt=deadline) | Q(started_at__isnull=True, created_at__lt=deadline)
+    ).update(
+        status=TrainingJob.FAILED,
+        error="Délai dépassé : entraînement interrompu",
+        finished_at=timezone.now(),
+    )
+
+
+def load_training_data(job: TrainingJob = None, chunk_size: int = TRAINING_CHUNK_SIZE):
+    """Construit X (features) et y (one-hot) à partir du feature store
+
+    Les features manquantes ou périmées sont d'abord recalculées. X et y sont
+    alloués d'après le nombre de vecteurs, puis remplis bloc par bloc
+    (iter_feature_matrix) : seuls chunk_size vecteurs bruts sont en mémoire
+    en plus des tableaux finaux. Les tests ajoutés pendant la lecture sont
+    ignorés.
+    """
+    refresh_features()
+    if job is not None:
+        _check_cancelled(job)
+
+    tests = training_queryset()
+    capacity = count_features(tests)
+    X = np.empty((capacity, N_FEATURES), dtype=VECTOR_DTYPE)
+    y = np.zeros((capacity, len(RESULT_CLASSES)), dtype=VECTOR_DTYPE)
+    class_index = {name: i for i, name in enumerate(RESULT_CLASSES)}
+    n = 0
+    for matrix, rows in iter_feature_matrix(tests, fields=('result',), chunk_size=chunk_size):
+        size = min(len(rows), capacity - n)
+        X[n:n + size] = matrix[:size, :N_FEATURES]
+        labels = [class_index.get(result, class_index['poor']) for _, result in rows[:size]]
+        y[np.arange(n, n + size), labels] = 1.0
+        n += size
+        if n == capacity:
+            break
+        if job is not None:
+            _check_cancelled(job)
+
+    # Tests supprimés pendant la lecture
+    return X[:n], y[:n]
+
+
+def _check_cancelled(job: TrainingJob):
+    if TrainingJob.objects.filter(pk=job.pk, cancel_requested=True).exists():
+        raise TrainingCancelled()
+
+
+def _progress_callback(job: TrainingJob):
+    """Callback Keras qui enregistre la progression et applique l'annulation"""
+    import tensorflow as tf
+
+    class JobProgressCallback(tf.keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            job.current_epoch = epoch + 1
+            job.metrics = job.metrics + [
+                {'epoch': epoch + 1, **{k: float(v) for k, v in (logs or {}).items()}}
+            ]
+            job.save(update_fields=['current_epoch', 'metrics'])
+            if TrainingJob.objects.filter(pk=job.pk, cancel_requested=True).exists():
+                job.cancel_requested = True
+                self.model.stop_training = True
+
+    return JobProgressCallback()
+
+
+def install_artifacts(predictor: EyeTrackingPredictor, model_path: Path):
+    """Sauvegarde le modèle puis remplace atomiquement les artefacts en place
+
+    Les fichiers sont écrits dans un répertoire temporaire du même système de
+    fichiers puis déplacés par os.replace ; le bundle de prétraitement est
+    installé en dernier.
+    """
+    model_path = Path(model_path)
+    model_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix='.training-', dir=model_path.parent))
+    try:
+        tmp_model = tmp_dir / model_path.name
+        predictor.save_model(str(tmp_model))
+        for source, target in (
+            (tmp_model, model_path),
+            (numpy_weights_path_for(tmp_model), numpy_weights_path_for(model_path)),
+            (preprocessing_path_for(tmp_model), preprocessing_path_for(model_path)),
+        ):
+            os.replace(source, target)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def run_training_job(job_id: int):
+    """Exécute un job d'entraînement jusqu'à son terme"""
+    job = TrainingJob.objects.get(pk=job_id)
+    job.status = TrainingJob.RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    try:
+        registry = get_registry()
+        predictor = EyeTrackingPredictor(model_path=registry.model_path, backend=BACKEND_KERAS)
+
+        X, y = load_training_data(job)
+        job.n_samples = len(X)
+        job.save(update_fields=['n_samples'])
+        if len(X) < MIN_TRAINING_SAMPLES:
+            raise ValueError(
+                f'Au moins {MIN_TRAINING_SAMPLES} tests sont nécessaires pour entraîner le modèle'
+            )
+
+        predictor.train_model(
+            X, y, epochs=job.epochs, callbacks=[_progress_callback(job)], verbose=0
+        )
+        if job.cancel_requested:
+            raise TrainingCancelled()
+
+        install_artifacts(predictor, registry.model_path)
+        registry.reload()
+
+        job.status = TrainingJob.SUCCEEDED
+        job.model_version = registry.version or ''
+    except TrainingCancelled:
+        job.status = TrainingJob.CANCELLED
+    except Exception as e:
+        logger.exception("Échec de l'entraînement %s", job_id)
+        job.status = TrainingJob.FAILED
+        job.error = str(e)
+    finally:
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'model_version', 'finished_at'])
+
+    return job
+
+
+def start_training_job(job: TrainingJob) -> threading.Thread:
+    """Lance le job dans un thread d'arrière-plan"""
+    def target():
+        try:
+            run_training_job(job.pk)
+        finally:
+            close_old_connections()
+
+    thread = threading.Thread(target=target, name=f'ml-training-{job.pk}', daemon=True)
+    thread.start()
+    return thread
@@ -3,6 +3,9 @@ from . import views
 
 urlpatterns = [
     path('train/', views.TrainModelView.as_view(), name='train_model'),
+    path('train/<int:job_id>/', views.TrainingJobView.as_view(), name='training_job'),
+    path('train/<int:job_id>/cancel/', views.CancelTrainingJobView.as_view(), name='cancel_training_job'),
     path('evaluate/', views.EvaluateModelView.as_view(), name='evaluate_model'),
     path('export/', views.ExportModelView.as_view(), name='export_model'),
+    path('status/', views.ModelStatusView.as_view(), name='model_status'),
 ]
@@ -2,57 +2,58 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser
-from api.models import EyeTrackingTest
-from .predictor import EyeTrackingPredictor
-import numpy as np
-from sklearn.preprocessing import label_binarize
+from django.conf import settings
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from .feature_store import iter_feature_matrix
+from .models import TrainingJob
+from .registry import get_registry, get_predictor
+from .serializers import TrainingJobSerializer
+from .training import MIN_TRAINING_SAMPLES, expire_stale_jobs, start_training_job, training_queryset
+import os
+
+# Nombre de tests lus en base et prédits ensemble lors de l'évaluation
+EVALUATION_CHUNK_SIZE = 1000
+
 
 class TrainModelView(APIView):
-    """Vue pour entraîner le modèle ML"""
+    """Vue pour lancer l'entraînement du modèle ML en arrière-plan"""
     permission_classes = [IsAdminUser]
     
     def post(self, request):
         try:
-            # Récupère tous les tests
-            tests = EyeTrackingTest.objects.all()
-            
-            if tests.count() < 10:
+            epochs = int(request.data.get('epochs', 50))
+        except (TypeError, ValueError):
+            epochs = 0
+        if epochs < 1:
+            return Response(
+                {'epochs': ['Entier positif attendu']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            if training_queryset().count() < MIN_TRAINING_SAMPLES:
                 return Response(
-                    {'error': 'Au moins 10 tests sont nécessaires pour entraîner le modèle'},
+                    {'error': f'Au moins {MIN_TRAINING_SAMPLES} tests sont nécessaires pour entraîner le modèle'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Prépare les données
-            predictor = EyeTrackingPredictor()
-            
-            X = []
-            y = []
-            
-            result_map = {'excellent': 0, 'good': 1, 'acceptable': 2, 'poor': 3}
-            
-            for test in tests:
-                features = predictor.extract_features({
-                    'duration': test.duration,
-                    'gaze_time': test.gaze_time,
-                    'fixation_count': test.fixation_count,
-                    'raw_data': test.raw_data
-                })
-                X.append(features)
-                y.append(result_map.get(test.result, 3))
-            
-            X = np.array(X)
-            y = label_binarize(y, classes=[0, 1, 2, 3])
-            
-            # Entraîne le modèle
-            predictor.train_model(X, y, epochs=50)
+            # Un job resté actif après un redémarrage ne bloque pas indéfiniment
+            expire_stale_jobs()
+            with transaction.atomic():
+                if TrainingJob.objects.select_for_update().filter(status__in=TrainingJob.ACTIVE_STATUSES).exists():
+                    return Response(
+                        {'error': 'Un entraînement est déjà en cours'},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                job = TrainingJob.objects.create(
+                    epochs=epochs,
+                    created_by=request.user
+                )
             
-            # Sauvegarde le modèle
-            predictor.save_model('/app/ml_models/eye_tracking_model.h5')
+            transaction.on_commit(lambda: start_training_job(job))
             
-            return Response(
-                {'message': 'Modèle entraîné avec succès'},
-                status=status.HTTP_200_OK
-            )
+            return Response(TrainingJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -60,23 +61,63 @@ class TrainModelView(APIView):
             )
 
 
+class TrainingJobView(APIView):
+    """Vue pour suivre la progression d'un entraînement"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request, job_id):
+        job = get_object_or_404(TrainingJob, pk=job_id)
+        return Response(TrainingJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+class CancelTrainingJobView(APIView):
+    """Vue pour annuler un entraînement en cours"""
+    permission_classes = [IsAdminUser]
+    
+    def post(self, request, job_id):
+        job = get_object_or_404(TrainingJob, pk=job_id)
+        if job.status not in TrainingJob.ACTIVE_STATUSES:
+            return Response(
+                {'error': 'Cet entraînement est déjà terminé'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        TrainingJob.objects.filter(pk=job.pk).update(cancel_requested=True)
+        job.refresh_from_db()
+        return Response(TrainingJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+def _model_unavailable():
+    """503 : aucun modèle entraîné (le modèle par défaut n'est jamais utilisé pour prédire)"""
+    return Response(
+        {'error': 'Aucun modèle entraîné : lancer un entraînement (POST /ml/train/)'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
 class EvaluateModelView(APIView):
     """Vue pour évaluer le modèle ML"""
     permission_classes = [IsAdminUser]
     
     def get(self, request):
         try:
-            predictor = EyeTrackingPredictor()
-            tests = EyeTrackingTest.objects.all()
-            
+            predictor = get_predictor()
+            if not predictor.model_available:
+                return _model_unavailable()
+            # Features lues dans le feature store par blocs, sans raw_data, pour
+            # les seuls tests au résultat définitif. Les features manquantes ou
+            # périmées sont calculées par le scoring ou refresh_features, pas ici.
             correct_predictions = 0
             total_predictions = 0
-            
-            for test in tests:
-                prediction = predictor.predict(test)
-                if prediction['result'] == test.result:
-                    correct_predictions += 1
-                total_predictions += 1
+            for matrix, rows in iter_feature_matrix(
+                training_queryset(), fields=('result',), chunk_size=EVALUATION_CHUNK_SIZE
+            ):
+                predictions = predictor.predict_features(matrix)
+                correct_predictions += sum(
+                    1 for (_, result), prediction in zip(rows, predictions)
+                    if prediction['result'] == result
+                )
+                total_predictions += len(predictions)
             
             accuracy = (correct_predictions / total_predictions * 100) if total_predictions > 0 else 0
             
@@ -101,8 +142,12 @@ class ExportModelView(APIView):
     
     def post(self, request):
         try:
-            predictor = EyeTrackingPredictor()
-            export_path = request.data.get('path', '/app/ml_models/eye_tracking_model_export.h5')
+            predictor = get_predictor()
+            if not predictor.model_available:
+                return _model_unavailable()
+            export_path = request.data.get(
+                'path', os.path.join(settings.ML_MODELS_LOCATION, 'eye_tracking_model_export.h5')
+            )
             predictor.save_model(export_path)
             
             return Response(
@@ -114,3 +159,11 @@ class ExportModelView(APIView):
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class ModelStatusView(APIView):
+    """Vue pour consulter l'état du modèle chargé dans le worker"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(get_registry().status(), status=status.HTTP_200_OK)
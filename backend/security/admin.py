@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import UserIdentity
+
+
+@admin.register(UserIdentity)
+class UserIdentityAdmin(admin.ModelAdmin):
+    list_display = ('user', 'updated_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'username_index', 'email_index', 'updated_at')
@@ -5,3 +5,6 @@ class SecurityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'security'
     verbose_name = 'Sécurité'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -6,19 +6,19 @@ import jwt
 from django.conf import settings
 from datetime import datetime, timedelta
 
+from .identity import find_user
+from .security_manager import get_security_manager
+
 User = get_user_model()
 
 
 class SecureJWTAuthentication(BaseAuthentication):
     """Authentification JWT sécurisée avec Tink"""
     
-    def __init__(self):
-        # Import retardé pour éviter les problèmes de démarrage
-        try:
-            from .security_manager import TinkSecurityManager
-            self.security_manager = TinkSecurityManager()
-        except Exception:
-            self.security_manager = None
+    @property
+    def security_manager(self):
+        # Instancié par DRF à chaque requête : gestionnaire partagé du processus
+        return get_security_manager()
     
     def authenticate(self, request):
         auth_header = request.META.get('HTTP_AUTHORIZATION', '')
@@ -61,20 +61,16 @@ class SecureJWTAuthentication(BaseAuthentication):
 class SecureUserBackend(ModelBackend):
     """Backend d'authentification sécurisé"""
     
-    def __init__(self):
-        super().__init__()
-        # Import retardé
-        try:
-            from .security_manager import TinkSecurityManager
-            self.security_manager = TinkSecurityManager()
-        except Exception:
-            self.security_manager = None
+    @property
+    def security_manager(self):
+        # Instancié par django.contrib.auth à chaque authentification
+        return get_security_manager()
     
     def authenticate(self, request, username=None, password=None, **kwargs):
         """Authentifie l'utilisateur de manière sécurisée"""
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
+        # Recherche par index aveugle (security.identity)
+        user = find_user(username)
+        if user is None:
             # Logging sécurisé
             return None
         
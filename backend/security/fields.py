@@ -0,0 +1,170 @@
+"""
+Champs de modèle chiffrés au repos avec Tink
+
+EncryptedJSONField stocke un objet JSON chiffré (AEAD, voir
+TinkSecurityManager.encrypt_many) dans une colonne binaire. Les données
+associées sont le modèle et le champ (« api.EyeTrackingTest.raw_data ») : un
+ciphertext copié dans une autre colonne ne se déchiffre pas. Avec bind_to,
+elles comprennent aussi un identifiant stable de la ligne (un UUID fixé à la
+construction de l'instance, connu avant l'insertion contrairement à la clé
+primaire) : un ciphertext copié dans une autre ligne ne se déchiffre pas non
+plus.
+
+Le déchiffrement est paresseux : une instance lue en base garde le
+ciphertext (Ciphertext) et ne le déchiffre qu'au premier accès à l'attribut.
+Une instance enregistrée sans que le champ ait été lu réécrit le même
+ciphertext. Pour un lot d'instances, decrypt_fields et encrypt_fields font
+un seul appel à decrypt_many / encrypt_many.
+"""
+import json
+from typing import Iterable
+
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+from .security_manager import require_security_manager
+
+
+class Ciphertext(bytes):
+    """Valeur chiffrée d'un champ, avec son clair s'il est déjà connu"""
+    plaintext = None
+
+
+class EncryptedAttribute(DeferredAttribute):
+    """Attribut du champ chiffré : déchiffre le ciphertext au premier accès"""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, Ciphertext):
+            value = self.field.decrypt(value, instance)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # Descripteur de données : __get__ est appelé même quand la valeur est
+        # dans instance.__dict__
+        instance.__dict__[self.field.attname] = value
+
+
+class EncryptedJSONField(models.BinaryField):
+    """Objet JSON chiffré au repos, déchiffré à la demande
+
+    Args:
+        bind_to: Champ du modèle identifiant la ligne (valeur stable, fixée
+            avant l'insertion), inclus dans les données associées
+    """
+    descriptor_class = EncryptedAttribute
+
+    def __init__(self, *args, bind_to: str = None, **kwargs):
+        self.bind_to = bind_to
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.bind_to is not None:
+            kwargs['bind_to'] = self.bind_to
+        return name, path, args, kwargs
+
+    def associated_data(self, instance: models.Model = None) -> bytes:
+        ad = f'{self.model._meta.label}.{self.name}'
+        if self.bind_to is not None:
+            if instance is None:
+                raise ValueError(f"{ad} est lié à sa ligne : chiffrement possible seulement depuis une instance")
+            ad = f'{ad}:{getattr(instance, self.bind_to)}'
+        return ad.encode()
+
+    def decrypt(self, ciphertext: Ciphertext, instance: models.Model = None):
+        if ciphertext.plaintext is not None:
+            return ciphertext.plaintext
+        return require_security_manager().decrypt_many([ciphertext], self.associated_data(instance))[0]
+
+    def encrypt(self, value, instance: models.Model = None) -> Ciphertext:
+        ciphertext = Ciphertext(require_security_manager().encrypt_many([value], self.associated_data(instance))[0])
+        ciphertext.plaintext = value
+        return ciphertext
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Ciphertext(value)
+
+    def to_python(self, value):
+        # Désérialisation (loaddata) : JSON produit par value_to_string
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+    def value_to_string(self, obj):
+        return json.dumps(self.value_from_object(obj))
+
+    def pre_save(self, model_instance, add):
+        # Valeur brute : un ciphertext jamais lu n'est ni déchiffré ni rechiffré
+        if self.attname in model_instance.__dict__:
+            value = model_instance.__dict__[self.attname]
+        else:
+            value = super().pre_save(model_instance, add)
+        if value is None or isinstance(value, Ciphertext):
+            return value
+        return self.encrypt(value, model_instance)
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, Ciphertext):
+            return value
+        if self.bind_to is not None:
+            # Sans instance (défaut du schéma, QuerySet.update, bulk_update sans
+            # encrypt_fields), le chiffrement ne peut pas être lié à la ligne :
+            # NULL, refusé par la colonne NOT NULL plutôt qu'un ciphertext délié
+            return None
+        return self.encrypt(value)
+
+
+def _encrypted_field(model, field_name: str) -> EncryptedJSONField:
+    field = model._meta.get_field(field_name)
+    if not isinstance(field, EncryptedJSONField):
+        raise TypeError(f"{model._meta.label}.{field_name} n'est pas un champ chiffré")
+    return field
+
+
+def decrypt_fields(instances: Iterable[models.Model], field_name: str):
+    """Déchiffre en un seul lot le champ de toutes les instances qui ne l'ont pas encore été"""
+    instances = list(instances)
+    if not instances:
+        return instances
+    field = _encrypted_field(type(instances[0]), field_name)
+    pending = [
+        instance for instance in instances
+        if isinstance(instance.__dict__.get(field.attname), Ciphertext)
+    ]
+    values = require_security_manager().decrypt_many(
+        [instance.__dict__[field.attname] for instance in pending],
+        [field.associated_data(instance) for instance in pending],
+    )
+    for instance, value in zip(pending, values):
+        instance.__dict__[field.attname] = value
+    return instances
+
+
+def encrypt_fields(instances: Iterable[models.Model], field_name: str):
+    """Chiffre en un seul lot le champ des instances, avant bulk_create ou bulk_update
+
+    Le clair reste disponible : la lecture de l'attribut ne déchiffre pas.
+    """
+    instances = list(instances)
+    if not instances:
+        return instances
+    field = _encrypted_field(type(instances[0]), field_name)
+    pending = [
+        instance for instance in instances
+        if not isinstance(instance.__dict__.get(field.attname), (Ciphertext, type(None)))
+    ]
+    plaintexts = [instance.__dict__[field.attname] for instance in pending]
+    ciphertexts = require_security_manager().encrypt_many(
+        plaintexts, [field.associated_data(instance) for instance in pending]
+    )
+    for instance, plaintext, ciphertext in zip(pending, plaintexts, ciphertexts):
+        ciphertext = Ciphertext(ciphertext)
+        ciphertext.plaintext = plaintext
+        instance.__dict__[field.attname] = ciphertext
+    return instances
@@ -0,0 +1,99 @@
+"""
+Recherche des utilisateurs par index aveugle
+
+Chaque utilisateur a une UserIdentity : HMAC-SHA256 (clé Tink, voir
+TinkSecurityManager.blind_index) de son nom d'utilisateur et de son email,
+dans des colonnes indexées. L'inscription et la connexion cherchent un
+identifiant par égalité sur ces index : la recherche reste un parcours
+d'index (O(log n)) même si l'identifiant n'est plus lisible en base, alors
+que auth_user.email n'est pas indexé.
+
+Les index sont tenus à jour à chaque enregistrement d'un utilisateur
+(security.signals) ; `manage.py index_identities` les recalcule tous.
+"""
+from typing import Iterable, Optional
+
+from django.contrib.auth.models import User
+
+from .models import UserIdentity
+from .security_manager import require_security_manager
+
+USERNAME = 'username'
+EMAIL = 'email'
+
+
+def username_index(username: str) -> str:
+    # Comme ModelBackend : nom d'utilisateur comparé tel quel
+    return require_security_manager().blind_index(username, USERNAME)
+
+
+def email_index(email: str) -> str:
+    # Même normalisation que User.objects.create_user
+    return require_security_manager().blind_index(User.objects.normalize_email(email or ''), EMAIL)
+
+
+def identity_for(user: User) -> UserIdentity:
+    return UserIdentity(
+        user=user,
+        username_index=username_index(user.username),
+        email_index=email_index(user.email),
+    )
+
+
+def index_user(user: User, using: str = None):
+    """Crée ou met à jour les index de l'utilisateur"""
+    identity = identity_for(user)
+    UserIdentity.objects.using(using).update_or_create(
+        user=user,
+        defaults={'username_index': identity.username_index, 'email_index': identity.email_index},
+    )
+
+
+def index_users(users: Iterable[User], batch_size: int = 1000) -> int:
+    """Recalcule en masse les index d'utilisateurs
+
+    Returns:
+        Le nombre d'utilisateurs indexés
+    """
+    identities = [identity_for(user) for user in users]
+    UserIdentity.objects.bulk_create(
+        identities,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['username_index', 'email_index'],
+    )
+    return len(identities)
+
+
+def _unindexed(username: str):
+    # auth_user.username est unique, donc indexé : recherche directe
+    return User.objects.filter(username=username, identity__isnull=True)
+
+
+def find_user(username: str) -> Optional[User]:
+    """Utilisateur de ce nom, par son index aveugle
+
+    Un utilisateur sans UserIdentity (créé par QuerySet.bulk_create, une
+    migration ou avant l'ajout des index) est retrouvé par son nom
+    d'utilisateur, et son index est créé au passage.
+    """
+    if not username:
+        return None
+    user = User.objects.filter(identity__username_index=username_index(username)).first()
+    if user is None:
+        user = _unindexed(username).first()
+        if user is not None:
+            index_user(user)
+    return user
+
+
+def username_exists(username: str) -> bool:
+    return (
+        UserIdentity.objects.filter(username_index=username_index(username)).exists()
+        or _unindexed(username).exists()
+    )
+
+
+def email_exists(email: str) -> bool:
+    return UserIdentity.objects.filter(email_index=email_index(email)).exists()
@@ -0,0 +1,29 @@
+"""
+Recalcule les index aveugles de tous les utilisateurs (security.identity),
+par exemple après une rotation de la clé PRF ou un import direct en base.
+
+    python manage.py index_identities
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from security.identity import index_users
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Recalcule les index aveugles des identifiants utilisateurs"
+
+    def handle(self, *args, **options):
+        users = User.objects.only('id', 'username', 'email').order_by('id')
+        indexed = 0
+        batch = []
+        for user in users.iterator(chunk_size=BATCH_SIZE):
+            batch.append(user)
+            if len(batch) == BATCH_SIZE:
+                indexed += index_users(batch, batch_size=BATCH_SIZE)
+                batch = []
+        if batch:
+            indexed += index_users(batch, batch_size=BATCH_SIZE)
+        self.stdout.write(self.style.SUCCESS(f"{indexed} utilisateurs indexés"))
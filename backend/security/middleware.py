@@ -3,6 +3,8 @@ Middleware de sécurité
 """
 import logging
 
+from .security_manager import get_security_manager
+
 security_logger = logging.getLogger('security')
 
 
@@ -30,12 +32,12 @@ class AuditLoggingMiddleware:
     
     def __init__(self, get_response):
         self.get_response = get_response
-        # Import retardé pour éviter les problèmes de démarrage
-        try:
-            from .security_manager import TinkSecurityManager
-            self.security_manager = TinkSecurityManager()
-        except Exception:
-            self.security_manager = None
+    
+    @property
+    def security_manager(self):
+        # Gestionnaire partagé, relu à chaque accès : un échec de chargement
+        # au démarrage n'est pas figé dans le middleware
+        return get_security_manager()
     
     def __call__(self, request):
         # Log du début de la requête
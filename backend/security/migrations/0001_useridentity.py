@@ -0,0 +1,65 @@
+# Generated by Django 4.2.8 on 2026-10-17 03:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.contrib.auth.base_user import BaseUserManager
+
+from security.security_manager import require_security_manager
+
+BATCH_SIZE = 1000
+
+
+def index_existing_users(apps, schema_editor):
+    """Calcule les index aveugles des utilisateurs existants"""
+    User = apps.get_model("auth", "User")
+    UserIdentity = apps.get_model("security", "UserIdentity")
+    manager = require_security_manager()
+    identities = [
+        UserIdentity(
+            user_id=user_id,
+            username_index=manager.blind_index(username, "username"),
+            email_index=manager.blind_index(
+                BaseUserManager.normalize_email(email or ""), "email"
+            ),
+        )
+        for user_id, username, email in User.objects.values_list(
+            "id", "username", "email"
+        ).iterator()
+    ]
+    UserIdentity.objects.bulk_create(identities, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserIdentity",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="identity",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("username_index", models.CharField(max_length=32, unique=True)),
+                ("email_index", models.CharField(db_index=True, max_length=32)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Identité utilisateur",
+                "verbose_name_plural": "Identités utilisateurs",
+            },
+        ),
+        migrations.RunPython(index_existing_users, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class UserIdentity(models.Model):
+    """Index aveugles des identifiants d'un utilisateur (voir security.identity)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='identity')
+    username_index = models.CharField(max_length=32, unique=True)
+    email_index = models.CharField(max_length=32, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Identité {self.user_id}"
+
+    class Meta:
+        verbose_name = 'Identité utilisateur'
+        verbose_name_plural = 'Identités utilisateurs'
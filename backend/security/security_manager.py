@@ -1,73 +1,107 @@
 """
 Module de sécurité avec Tink
 Gère le chiffrement et la signature des données sensibles
+
+Un seul gestionnaire par processus (get_security_manager) : les keysets sont
+lus, et créés s'ils n'existent pas, une seule fois, et les primitives AEAD /
+DAEAD sont construites au chargement puis partagées entre threads. Le
+gestionnaire est chargé au démarrage (config/wsgi.py) : les requêtes ne
+touchent jamais au disque.
 """
-import tink
-from tink import aead, daead
+import base64
+import hashlib
+import json
+import logging
 import os
+import tempfile
+import threading
+import time
+from itertools import repeat
 from pathlib import Path
-import json
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+import tink
+from tink import aead, daead, json_proto_keyset_format, prf, secret_key_access
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEYSET_PATH = Path(__file__).parent.parent / 'keys'
+
+# Longueur (octets) d'un index aveugle
+BLIND_INDEX_LENGTH = 16
+
+# JSON compact des données chiffrées en lot
+_json_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+
+def _each(associated_data):
+    """Données associées d'un lot : les mêmes pour tous (bytes) ou une par élément"""
+    if isinstance(associated_data, (bytes, bytearray)):
+        return repeat(associated_data)
+    return associated_data
 
 
 class TinkSecurityManager:
     """Gestionnaire de sécurité utilisant Tink"""
     
-    def __init__(self):
-        # Initialise Tink
-        try:
-            tink.experimental_enable_insecure_keyset_access()
-        except AttributeError:
-            # Version plus récente de Tink
-            os.environ['TINK_ALLOW_INSECURE_KEYSET_ACCESS'] = '1'
+    def __init__(self, keyset_path=None):
+        # Initialise Tink (enregistrement idempotent des primitives)
+        aead.register()
+        daead.register()
+        prf.register()
         
-        self.keyset_path = Path(__file__).parent.parent / 'keys'
+        self.keyset_path = Path(keyset_path or DEFAULT_KEYSET_PATH)
         self.keyset_path.mkdir(exist_ok=True)
         
         self.aead_keyset_file = self.keyset_path / 'aead_keyset.json'
         self.daead_keyset_file = self.keyset_path / 'daead_keyset.json'
+        self.prf_keyset_file = self.keyset_path / 'prf_keyset.json'
         
         # Initialise les clés
         self._init_aead_keyset()
         self._init_daead_keyset()
+        self._init_prf_keyset()
     
-    def _init_aead_keyset(self):
-        """Initialise la clé AEAD (chiffrement symétrique)"""
-        if not self.aead_keyset_file.exists():
-            # Crée une nouvelle clé
-            keyset_handle = tink.new_keyset_handle(aead.aead_key_templates.AES256_GCM)
-            
-            # Sauvegarde la clé de manière sécurisée
-            with open(self.aead_keyset_file, 'w') as f:
-                keyset_json = tink.json_keyset_io.JsonKeysetWriter(
-                    self.aead_keyset_file
-                ).write(keyset_handle)
+    def _load_keyset(self, keyset_file: Path, key_template) -> tink.KeysetHandle:
+        """Charge un keyset, en le créant s'il n'existe pas"""
+        if not keyset_file.exists():
+            # Crée une nouvelle clé, écrite dans un fichier temporaire puis
+            # liée sous son nom : si plusieurs processus démarrent en même
+            # temps, un seul keyset est conservé et tous le relisent
+            keyset_handle = tink.new_keyset_handle(key_template)
+            fd, tmp_path = tempfile.mkstemp(dir=self.keyset_path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(json_proto_keyset_format.serialize(keyset_handle, secret_key_access.TOKEN))
+                os.link(tmp_path, keyset_file)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(tmp_path)
         
         # Charge la clé existante
-        with open(self.aead_keyset_file, 'r') as f:
-            self.aead_handle = tink.json_keyset_io.JsonKeysetReader(
-                f.read()
-            ).read()
+        with open(keyset_file, 'r') as f:
+            return json_proto_keyset_format.parse(f.read(), secret_key_access.TOKEN)
+    
+    def _init_aead_keyset(self):
+        """Initialise la clé AEAD (chiffrement symétrique) et sa primitive"""
+        self.aead_handle = self._load_keyset(self.aead_keyset_file, aead.aead_key_templates.AES256_GCM)
+        self._aead = self.aead_handle.primitive(aead.Aead)
     
     def _init_daead_keyset(self):
-        """Initialise la clé DAEAD (chiffrement déterministe)"""
-        if not self.daead_keyset_file.exists():
-            # Crée une nouvelle clé
-            keyset_handle = tink.new_keyset_handle(
-                daead.deterministic_aead_key_templates.AES256_SIV
-            )
-            
-            # Sauvegarde la clé
-            with open(self.daead_keyset_file, 'w') as f:
-                keyset_json = tink.json_keyset_io.JsonKeysetWriter(
-                    self.daead_keyset_file
-                ).write(keyset_handle)
-        
-        # Charge la clé existante
-        with open(self.daead_keyset_file, 'r') as f:
-            self.daead_handle = tink.json_keyset_io.JsonKeysetReader(
-                f.read()
-            ).read()
+        """Initialise la clé DAEAD (chiffrement déterministe) et sa primitive"""
+        self.daead_handle = self._load_keyset(
+            self.daead_keyset_file, daead.deterministic_aead_key_templates.AES256_SIV
+        )
+        self._daead = self.daead_handle.primitive(daead.DeterministicAead)
+    
+    def _init_prf_keyset(self):
+        """Initialise la clé PRF (HMAC-SHA256) des index aveugles"""
+        self.prf_handle = self._load_keyset(self.prf_keyset_file, prf.prf_key_templates.HMAC_SHA256)
+        self._prf = self.prf_handle.primitive(prf.PrfSet).primary()
     
     def encrypt_data(self, data: Dict[str, Any], associated_data: str = "") -> str:
         """
@@ -81,7 +115,7 @@ class TinkSecurityManager:
             Les données chiffrées encodées en base64
         """
         try:
-            cipher = self.aead_handle.primitive(aead.Aead)
+            cipher = self._aead
             plaintext = json.dumps(data).encode('utf-8')
             
             ciphertext = cipher.encrypt(
@@ -89,7 +123,6 @@ class TinkSecurityManager:
                 associated_data.encode('utf-8') if associated_data else b""
             )
             
-            import base64
             return base64.b64encode(ciphertext).decode('utf-8')
         except Exception as e:
             raise ValueError(f"Erreur de chiffrement: {str(e)}")
@@ -106,9 +139,8 @@ class TinkSecurityManager:
             Les données déchiffrées
         """
         try:
-            cipher = self.aead_handle.primitive(aead.Aead)
+            cipher = self._aead
             
-            import base64
             ciphertext = base64.b64decode(encrypted_data)
             
             plaintext = cipher.decrypt(
@@ -120,6 +152,50 @@ class TinkSecurityManager:
         except Exception as e:
             raise ValueError(f"Erreur de déchiffrement: {str(e)}")
     
+    def encrypt_many(self, records: Iterable[Any],
+                     associated_data: Union[bytes, Iterable[bytes]] = b"") -> List[bytes]:
+        """
+        Chiffre une liste d'objets JSON avec AEAD, pour le stockage au repos
+        
+        Args:
+            records: Objets sérialisables en JSON
+            associated_data: Données associées, communes au lot ou une par objet
+        
+        Returns:
+            Les ciphertexts binaires (sans base64), dans l'ordre des objets
+        """
+        encrypt = self._aead.encrypt
+        encode = _json_encoder.encode
+        try:
+            return [
+                encrypt(encode(record).encode('utf-8'), ad)
+                for record, ad in zip(records, _each(associated_data))
+            ]
+        except Exception as e:
+            raise ValueError(f"Erreur de chiffrement: {str(e)}")
+    
+    def decrypt_many(self, ciphertexts: Iterable[bytes],
+                     associated_data: Union[bytes, Iterable[bytes]] = b"") -> List[Any]:
+        """
+        Déchiffre une liste de ciphertexts produits par encrypt_many
+        
+        Args:
+            ciphertexts: Ciphertexts binaires (bytes ou memoryview)
+            associated_data: Données associées utilisées au chiffrement, communes ou une par ciphertext
+        
+        Returns:
+            Les objets déchiffrés, dans le même ordre
+        """
+        decrypt = self._aead.decrypt
+        loads = json.loads
+        try:
+            return [
+                loads(decrypt(bytes(ciphertext), ad))
+                for ciphertext, ad in zip(ciphertexts, _each(associated_data))
+            ]
+        except Exception as e:
+            raise ValueError(f"Erreur de déchiffrement: {str(e)}")
+    
     def encrypt_deterministic(self, data: str) -> str:
         """
         Chiffre les données de manière déterministe
@@ -132,12 +208,11 @@ class TinkSecurityManager:
             Les données chiffrées (même sortie pour même entrée)
         """
         try:
-            cipher = self.daead_handle.primitive(daead.DeterministicAead)
+            cipher = self._daead
             plaintext = data.encode('utf-8')
             
             ciphertext = cipher.encrypt_deterministically(plaintext, b"")
             
-            import base64
             return base64.b64encode(ciphertext).decode('utf-8')
         except Exception as e:
             raise ValueError(f"Erreur de chiffrement déterministe: {str(e)}")
@@ -153,9 +228,8 @@ class TinkSecurityManager:
             Les données déchiffrées
         """
         try:
-            cipher = self.daead_handle.primitive(daead.DeterministicAead)
+            cipher = self._daead
             
-            import base64
             ciphertext = base64.b64decode(encrypted_data)
             
             plaintext = cipher.decrypt_deterministically(ciphertext, b"")
@@ -164,27 +238,74 @@ class TinkSecurityManager:
         except Exception as e:
             raise ValueError(f"Erreur de déchiffrement déterministe: {str(e)}")
     
+    def blind_index(self, data: str, context: str) -> str:
+        """
+        Index aveugle d'un identifiant : HMAC-SHA256 avec une clé secrète
+        
+        Permet une recherche par égalité sur une colonne indexée sans stocker
+        l'identifiant en clair ; sans la clé, l'index ne permet pas de tester
+        des valeurs candidates (contrairement à hash_data).
+        
+        Args:
+            data: L'identifiant, déjà normalisé
+            context: Nature de l'identifiant ('username', 'email'...) : deux
+                identifiants égaux de natures différentes ont des index différents
+        
+        Returns:
+            L'index en hexadécimal (2 * BLIND_INDEX_LENGTH caractères)
+        """
+        try:
+            return self._prf.compute(f'{context}\x00{data}'.encode('utf-8'), BLIND_INDEX_LENGTH).hex()
+        except Exception as e:
+            raise ValueError(f"Erreur de calcul de l'index aveugle: {str(e)}")
+    
     def hash_data(self, data: str) -> str:
         """Hash les données avec SHA256"""
-        import hashlib
         return hashlib.sha256(data.encode('utf-8')).hexdigest()
 
 
-class SecureDataField:
-    """Descripteur pour les champs de données sensibles"""
-    
-    def __init__(self):
-        self.security_manager = TinkSecurityManager()
-        self.data = {}
-    
-    def __get__(self, obj, objtype=None):
-        if obj is None:
-            return self
-        return self.data.get(id(obj), None)
+# Délai (secondes) avant de retenter le chargement des keysets après un échec,
+# doublé à chaque échec consécutif jusqu'à SECURITY_MANAGER_MAX_RETRY_DELAY
+SECURITY_MANAGER_RETRY_DELAY = 1.0
+SECURITY_MANAGER_MAX_RETRY_DELAY = 60.0
+
+_manager = None
+_manager_lock = threading.Lock()
+# Échecs consécutifs du chargement et instant (time.monotonic) du prochain essai
+_manager_failures = 0
+_manager_retry_at = 0.0
+
+
+def get_security_manager() -> Optional[TinkSecurityManager]:
+    """
+    Retourne le gestionnaire de sécurité du processus, chargé au premier appel
     
-    def __set__(self, obj, value):
-        if isinstance(value, dict):
-            encrypted = self.security_manager.encrypt_data(value)
-            self.data[id(obj)] = encrypted
-        else:
-            raise ValueError("Seules les données JSON sont acceptées")
+    None si les keysets n'ont pas pu être chargés. Seul un chargement réussi
+    est conservé : après un échec (keysets pas encore montés, disque
+    indisponible), le chargement est retenté au premier appel qui suit un
+    délai croissant, et non à chaque requête.
+    """
+    global _manager, _manager_failures, _manager_retry_at
+    if _manager is None and time.monotonic() >= _manager_retry_at:
+        with _manager_lock:
+            if _manager is None and time.monotonic() >= _manager_retry_at:
+                try:
+                    _manager = TinkSecurityManager(getattr(settings, 'TINK_KEYSET_LOCATION', None))
+                    _manager_failures = 0
+                except Exception:
+                    delay = min(
+                        SECURITY_MANAGER_RETRY_DELAY * 2 ** _manager_failures,
+                        SECURITY_MANAGER_MAX_RETRY_DELAY,
+                    )
+                    _manager_failures += 1
+                    _manager_retry_at = time.monotonic() + delay
+                    logger.exception("Impossible de charger les keysets Tink (nouvel essai dans %.0f s)", delay)
+    return _manager
+
+
+def require_security_manager() -> TinkSecurityManager:
+    """Comme get_security_manager, mais lève une erreur si les keysets sont indisponibles"""
+    manager = get_security_manager()
+    if manager is None:
+        raise ImproperlyConfigured("Keysets Tink indisponibles : chiffrement au repos impossible")
+    return manager
@@ -0,0 +1,18 @@
+"""
+Mise à jour des index aveugles des utilisateurs (security.identity)
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .identity import index_user
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, using=None, **kwargs):
+    # last_login, mot de passe... : les identifiants n'ont pas changé
+    if update_fields is not None and not {'username', 'email'} & set(update_fields):
+        return
+    # Y compris les enregistrements bruts (loaddata) : l'index ne dépend que
+    # du nom d'utilisateur et de l'email, sans autre ligne à lire
+    index_user(instance, using=using)
@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from . import security_manager as module
+from .identity import username_exists
+from .models import UserIdentity
+
+
+class GetSecurityManagerTest(SimpleTestCase):
+    """Un échec de chargement des keysets n'est pas conservé"""
+
+    def setUp(self):
+        state = {'_manager': None, '_manager_failures': 0, '_manager_retry_at': 0.0}
+        patcher = mock.patch.multiple(module, **state)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = 1000.0
+        clock = mock.patch.object(module.time, 'monotonic', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_retries_after_backoff_and_keeps_success(self):
+        manager = object()
+        loader = mock.Mock(side_effect=[OSError('keysets absents'), OSError('keysets absents'), manager])
+        with mock.patch.object(module, 'TinkSecurityManager', loader), self.assertLogs(module.logger, 'ERROR'):
+            self.assertIsNone(module.get_security_manager())
+            # Pas de nouvel essai avant le délai
+            self.assertIsNone(module.get_security_manager())
+            self.assertEqual(loader.call_count, 1)
+
+            self.now += module.SECURITY_MANAGER_RETRY_DELAY
+            self.assertIsNone(module.get_security_manager())
+            self.assertEqual(loader.call_count, 2)
+
+            # Délai doublé après le second échec
+            self.now += module.SECURITY_MANAGER_RETRY_DELAY
+            self.assertIsNone(module.get_security_manager())
+            self.assertEqual(loader.call_count, 2)
+            self.now += module.SECURITY_MANAGER_RETRY_DELAY
+            self.assertIs(module.get_security_manager(), manager)
+
+            self.now += module.SECURITY_MANAGER_MAX_RETRY_DELAY
+            self.assertIs(module.get_security_manager(), manager)
+            self.assertEqual(loader.call_count, 3)
+
+
+class UnindexedUserLoginTest(TestCase):
+    """Un utilisateur sans UserIdentity peut se connecter ; son index est alors créé"""
+
+    def setUp(self):
+        # bulk_create n'émet pas post_save : aucun index aveugle
+        self.user = User.objects.bulk_create([
+            User(username='legacy', email='legacy@example.com', password=make_password('secret-pass'))
+        ])[0]
+        self.assertFalse(UserIdentity.objects.filter(user_id=self.user.id).exists())
+
+    def test_login_backfills_identity(self):
+        self.assertTrue(username_exists('legacy'))
+        self.assertIsNone(authenticate(username='legacy', password='wrong-pass'))
+        self.assertTrue(UserIdentity.objects.filter(user_id=self.user.id).exists())
+        self.assertEqual(authenticate(username='legacy', password='secret-pass').id, self.user.id)
+
+    def test_unknown_user_is_rejected(self):
+        self.assertIsNone(authenticate(username='nobody', password='secret-pass'))
+        self.assertFalse(username_exists('nobody'))